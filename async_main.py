@@ -0,0 +1,79 @@
+"""
+Асинхронная точка входа бота: AsyncTeleBot + асинхронный пул подключений к БД
+
+Все обработчики работают в одном event loop, поэтому медленный запрос
+одного пользователя не задерживает обработку сообщений остальных.
+"""
+import asyncio
+import sys
+
+from telebot.async_telebot import AsyncTeleBot
+from telebot import asyncio_filters
+
+from config import BOT_TOKEN
+from bot.async_handlers import register_handlers
+from bot.storage import create_async_state_storage
+from database.async_db import open_async_pool, close_async_pool
+from database.async_models import AsyncWordManager
+from database.db_config import close_pool
+from database.answers import answer_log
+from database.prefetch import question_prefetcher
+from database.registration import user_registry
+from metrics import instrument_handlers, start_metrics
+import logging
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Основная функция запуска асинхронного бота"""
+    state_storage = None
+    try:
+        print("🔍 Открываем пул подключений к базе данных...")
+        await open_async_pool()
+        print("✅ База данных подключена успешно!")
+
+        # Заготовки вопросов - задачами этого event loop через асинхронный пул
+        question_prefetcher.use_event_loop(AsyncWordManager.get_random_word_with_options)
+
+        # Создаем бота с хранилищем состояний (см. STATE_STORAGE в config.py)
+        state_storage = create_async_state_storage()
+        bot = AsyncTeleBot(BOT_TOKEN, state_storage=state_storage)
+
+        # Регистрируем обработчики
+        register_handlers(bot)
+        instrument_handlers(bot)  # Замер времени каждого обработчика
+
+        # Добавляем фильтр состояний
+        bot.add_custom_filter(asyncio_filters.StateFilter(bot))
+
+        logger.info("🤖 Асинхронный бот запущен!")
+        print("🤖 EnglishCard бот (asyncio) запущен! Нажмите Ctrl+C для остановки.")
+
+        start_metrics()
+        await bot.infinity_polling(skip_pending=True)
+
+    except Exception as e:
+        logger.error(f"Ошибка запуска бота: {e}")
+        print(f"❌ Подробная ошибка: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        if hasattr(state_storage, 'close'):
+            state_storage.close()
+        user_registry.close()  # Буферы регистрации и журнала ответов пишут через синхронный пул
+        answer_log.close()
+        close_pool()
+        await close_async_pool()
+
+
+if __name__ == "__main__":
+    # psycopg 3 не работает с ProactorEventLoop, который в Windows используется по умолчанию
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""
+Бенчмарк импорта словаря: COPY + слияние множествами против add_user_word по одному слову
+
+Нужна рабочая БД из config.py. Слова пишутся от имени временного пользователя,
+который в конце удаляется вместе со своими словами.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_import --rows 100000 --single-rows 2000
+"""
+import argparse
+import io
+import time
+
+from database.bulk import import_words
+from database.db_config import Database, close_pool
+from database.models import WordManager
+
+BENCH_USER_ID = -424242  # Отрицательных ID в Telegram нет
+
+
+def make_csv(prefix, count):
+    lines = ["english,russian"]
+    lines.extend(f"{prefix}{number},перевод{number}" for number in range(count))
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def setup():
+    with Database() as db:
+        db.cursor.execute(
+            "INSERT INTO users (user_id, first_name) VALUES (%s, 'bench') ON CONFLICT DO NOTHING",
+            (BENCH_USER_ID,)
+        )
+
+
+def cleanup():
+    with Database() as db:
+        db.cursor.execute("DELETE FROM user_words WHERE user_id = %s", (BENCH_USER_ID,))
+        db.cursor.execute("DELETE FROM words WHERE created_by = %s", (BENCH_USER_ID,))
+        db.cursor.execute("DELETE FROM users WHERE user_id = %s", (BENCH_USER_ID,))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000, help="строк для COPY-импорта")
+    parser.add_argument('--single-rows', type=int, default=2000, help="строк для импорта по одной")
+    args = parser.parse_args()
+
+    setup()
+    try:
+        started = time.perf_counter()
+        for number in range(args.single_rows):
+            WordManager.add_user_word(BENCH_USER_ID, f"Benchsingle{number}", f"перевод{number}")
+        single_seconds = time.perf_counter() - started
+        single_rate = args.single_rows / single_seconds
+
+        content = make_csv('benchcopy', args.rows)
+        started = time.perf_counter()
+        stats = import_words(io.BytesIO(content), BENCH_USER_ID)
+        copy_seconds = time.perf_counter() - started
+        copy_rate = args.rows / copy_seconds
+
+        print(f"add_user_word по одному: {args.single_rows} слов за {single_seconds:.2f} с "
+              f"({single_rate:,.0f} слов/с)")
+        print(f"COPY-импорт:             {stats['links_added']} слов за {copy_seconds:.2f} с "
+              f"({copy_rate:,.0f} слов/с)")
+        print(f"Ускорение: x{copy_rate / single_rate:.1f}")
+    finally:
+        cleanup()
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
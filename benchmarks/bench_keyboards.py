@@ -0,0 +1,81 @@
+"""
+Бенчмарк сериализации клавиатур: ReplyKeyboardMarkup на каждое сообщение против bot.keyboards
+
+Замеряется то, что происходит при отправке одного сообщения: построение
+клавиатуры и ее превращение в JSON (telebot вызывает to_json()).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_keyboards
+"""
+import random
+import timeit
+
+from telebot import types
+
+from config import Command
+from bot.keyboards import create_main_keyboard, create_game_keyboard, create_cancel_keyboard
+
+NUMBER = 20000
+REPEAT = 5
+VOCABULARY_SIZE = 1000
+
+
+def legacy_main_keyboard():
+    """Как до bot.keyboards: новый объект на каждое сообщение"""
+    keyboard = types.ReplyKeyboardMarkup(resize_keyboard=True, row_width=1)
+    keyboard.add(
+        types.KeyboardButton(Command.NEXT),
+        types.KeyboardButton(Command.ADD_WORD),
+        types.KeyboardButton(Command.DELETE_WORD)
+    )
+    return keyboard
+
+
+def legacy_game_keyboard(options):
+    keyboard = types.ReplyKeyboardMarkup(resize_keyboard=True, row_width=2)
+    keyboard.add(*[types.KeyboardButton(option['english_word']) for option in options])
+    keyboard.add(
+        types.KeyboardButton(Command.NEXT),
+        types.KeyboardButton(Command.ADD_WORD),
+        types.KeyboardButton(Command.DELETE_WORD)
+    )
+    return keyboard
+
+
+def legacy_cancel_keyboard():
+    keyboard = types.ReplyKeyboardMarkup(resize_keyboard=True, row_width=1)
+    keyboard.add(types.KeyboardButton('Отмена'))
+    return keyboard
+
+
+def per_call_us(func):
+    best = min(timeit.repeat(func, number=NUMBER, repeat=REPEAT))
+    return best / NUMBER * 1e6
+
+
+def main():
+    words = [{'english_word': f"Word{number}"} for number in range(VOCABULARY_SIZE)]
+    rng = random.Random(1)
+    questions = [rng.sample(words, 4) for _ in range(NUMBER)]
+    questions_iter = iter(questions * (REPEAT + 1) * 2)
+
+    cases = [
+        ('основная', lambda: legacy_main_keyboard().to_json(), lambda: create_main_keyboard().to_json()),
+        ('отмена', lambda: legacy_cancel_keyboard().to_json(), lambda: create_cancel_keyboard().to_json()),
+        (
+            'игровая',
+            lambda: legacy_game_keyboard(next(questions_iter)).to_json(),
+            lambda: create_game_keyboard(next(questions_iter)).to_json()
+        ),
+    ]
+
+    print(f"{'клавиатура':>10} | {'было, мкс':>10} | {'стало, мкс':>10} | {'ускорение':>9}")
+    print("-" * 50)
+    for name, legacy, rendered in cases:
+        before = per_call_us(legacy)
+        after = per_call_us(rendered)
+        print(f"{name:>10} | {before:>10.2f} | {after:>10.2f} | {before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
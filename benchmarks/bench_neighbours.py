@@ -0,0 +1,58 @@
+"""
+Бенчмарк расчета похожих слов (database/neighbours.py) на синтетическом словаре
+
+Показывает, сколько занимает полный пересчет по размеру словаря и примеры
+найденных соседей. Нужен numpy. Запуск из корня проекта:
+    python -m benchmarks.bench_neighbours
+"""
+import random
+import time
+
+import numpy as np
+
+from config import NEIGHBOURS_TOP_K, NEIGHBOURS_BLOCK_SIZE
+from database.neighbours import WordFeatures, top_neighbours
+
+SIZES = [1000, 5000, 20000]
+SAMPLE_BLOCKS = 20  # На больших словарях считаем часть блоков и экстраполируем
+SYLLABLES = ['ca', 'co', 'ta', 'te', 'ri', 'ro', 'ne', 'no', 'st', 'er', 'in', 'on', 'ar', 'ly', 'sh']
+
+
+def make_words(count, rng):
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 5))))
+    return [
+        {'word_id': word_id, 'english_word': word, 'russian_word': f"слово{word_id}",
+         'is_default': True, 'created_by': None}
+        for word_id, word in enumerate(sorted(words), start=1)
+    ]
+
+
+def main():
+    rng = random.Random(1)
+    print(f"{'слов':>8} | {'признаки, с':>11} | {'пересчет, с':>11} | {'на слово, мс':>12}")
+    for size in SIZES:
+        words = make_words(size, rng)
+        started = time.perf_counter()
+        features = WordFeatures(words)
+        prepared = time.perf_counter() - started
+
+        blocks = list(range(0, size, NEIGHBOURS_BLOCK_SIZE))
+        sampled = blocks[:SAMPLE_BLOCKS]
+        started = time.perf_counter()
+        for start in sampled:
+            rows = np.arange(start, min(start + NEIGHBOURS_BLOCK_SIZE, size))
+            top_neighbours(features, rows, features.similarity(rows), NEIGHBOURS_TOP_K)
+        per_block = (time.perf_counter() - started) / len(sampled)
+        total = per_block * len(blocks)
+        print(f"{size:>8} | {prepared:>11.3f} | {total:>11.1f} | {total / size * 1000:>12.3f}")
+
+    rows = np.arange(5)
+    by_id = {word['word_id']: word['english_word'] for word in words}
+    for word_id, neighbour_id, score in top_neighbours(features, rows, features.similarity(rows), 3):
+        print(f"  {by_id[word_id]:>12} -> {by_id[neighbour_id]:<12} {score:.2f}")
+
+
+if __name__ == "__main__":
+    main()
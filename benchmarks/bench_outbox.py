@@ -0,0 +1,183 @@
+"""
+Бенчмарк отправки через bot.outbox против прямых вызовов send_message
+
+Поднимает локальный фейковый Bot API (HTTP/1.1 с keep-alive) с задержкой ответа
+и лимитами как у Telegram: на превышение отвечает 429 с retry_after.
+Обработчики (потоки) шлют по несколько сообщений в разные чаты:
+    прямо   - telebot.TeleBot, каждый поток ждет ответа и сам получает 429;
+    outbox  - QueuedTeleBot, потоки только ставят сообщения в очередь.
+
+Отчет: сколько обработчик занят одним сообщением, за сколько доставлено все,
+сколько ответов 429 вернул сервер и сколько сообщений потеряно.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_outbox --chats 100 --per-chat 3 --threads 16
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit, parse_qs
+
+import telebot
+from telebot import apihelper
+
+from bot.outbox import Outbox, QueuedTeleBot, TokenBucket
+
+TOKEN = '1:bench'
+
+
+class FakeBotApi:
+    """Фейковый Bot API: sendMessage с задержкой и лимитами Telegram"""
+
+    def __init__(self, latency, global_rate, chat_rate, chat_burst):
+        self.latency = latency
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._global = TokenBucket(global_rate, global_rate)
+        self._message_ids = itertools.count(1)
+        self.delivered = 0
+        self.rejected = 0
+
+    def allow(self, chat_id):
+        """Пропустить сообщение или вернуть retry_after (без ожидания, как сервер)"""
+        with self._lock:
+            bucket = self._buckets.get(chat_id)
+            if bucket is None:
+                bucket = self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            for limit in (bucket, self._global):
+                wait = limit.reserve()
+                if wait:
+                    limit.tokens += 1  # Отказ не расходует токен
+                    self.rejected += 1
+                    return max(1, round(wait))
+            self.delivered += 1
+            return None
+
+    def serve(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                url = urlsplit(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                chat_id = int(params.get('chat_id', 0))
+                time.sleep(api.latency)
+
+                retry_after = api.allow(chat_id)
+                if retry_after is not None:
+                    self._reply(429, {
+                        'ok': False,
+                        'error_code': 429,
+                        'description': f"Too Many Requests: retry after {retry_after}",
+                        'parameters': {'retry_after': retry_after}
+                    })
+                    return
+                self._reply(200, {'ok': True, 'result': {
+                    'message_id': next(api._message_ids),
+                    'date': int(time.time()),
+                    'chat': {'id': chat_id, 'type': 'private'},
+                    'text': params.get('text', '')
+                }})
+
+            do_GET = do_POST
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def run(bot, jobs, threads):
+    """Каждое задание - один обработчик, отправляющий сообщение; вернуть время занятости"""
+    def handle(job):
+        chat_id, text = job
+        started = time.perf_counter()
+        try:
+            bot.send_message(chat_id, text)
+        except Exception:
+            pass  # Прямой вызов на 429 падает - так обработчик и теряет сообщение
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(handle, jobs))
+
+
+def report(name, api, busy, elapsed, total):
+    print(
+        f"{name:>7} | {statistics.fmean(busy) * 1000:>10.2f} | {max(busy) * 1000:>10.1f} | "
+        f"{elapsed:>9.2f} | {api.rejected:>5} | {total - api.delivered:>8}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chats', type=int, default=100)
+    parser.add_argument('--per-chat', type=int, default=3, help="сообщений в каждый чат подряд")
+    parser.add_argument('--threads', type=int, default=16, help="параллельных обработчиков")
+    parser.add_argument('--workers', type=int, default=8, help="потоков-отправителей outbox")
+    parser.add_argument('--latency', type=float, default=0.05, help="задержка ответа Bot API, с")
+    parser.add_argument('--global-rate', type=float, default=30)
+    parser.add_argument('--chat-rate', type=float, default=1.0)
+    parser.add_argument('--chat-burst', type=int, default=3)
+    args = parser.parse_args()
+
+    # Сообщения одного чата идут подряд, как ответы на одно обновление
+    jobs = [
+        (chat_id, f"Сообщение {number}")
+        for chat_id in range(1, args.chats + 1)
+        for number in range(args.per_chat)
+    ]
+    limits = (args.latency, args.global_rate, args.chat_rate, args.chat_burst)
+
+    print(f"Сообщений: {len(jobs)}, чатов: {args.chats}, обработчиков: {args.threads}")
+    print(f"{'режим':>7} | {'занят, мс':>10} | {'макс, мс':>10} | {'всего, с':>9} | {'429':>5} | {'потеряно':>8}")
+    print("-" * 64)
+
+    api = FakeBotApi(*limits)
+    server = api.serve()
+    apihelper.API_URL = f"http://127.0.0.1:{server.server_address[1]}/bot{{0}}/{{1}}"
+    started = time.perf_counter()
+    busy = run(telebot.TeleBot(TOKEN, threaded=False), jobs, args.threads)
+    report('прямо', api, busy, time.perf_counter() - started, len(jobs))
+    server.shutdown()
+
+    # Ведра сервера и outbox начинают полными - сравнение честное
+    api = FakeBotApi(*limits)
+    server = api.serve()
+    apihelper.API_URL = f"http://127.0.0.1:{server.server_address[1]}/bot{{0}}/{{1}}"
+    outbox = Outbox(
+        workers=args.workers, global_rate=args.global_rate,
+        chat_rate=args.chat_rate, chat_burst=args.chat_burst
+    )
+    outbox.start()
+    started = time.perf_counter()
+    busy = run(QueuedTeleBot(TOKEN, threaded=False, outbox=outbox), jobs, args.threads)
+    outbox.close()
+    report('outbox', api, busy, time.perf_counter() - started, len(jobs))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
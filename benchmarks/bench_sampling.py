@@ -0,0 +1,66 @@
+"""
+Бенчмарк выбора вопроса: старый способ (копия списка) против WordIndex
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_sampling
+"""
+import random
+import timeit
+
+from database.sampling import WordIndex, WordList, sample_question
+
+DEFAULT_WORDS_COUNT = 15
+SIZES = [15, 100, 1000, 10000, 100000]
+REPEAT = 5
+
+
+def make_words(start, count, is_default):
+    return WordList(
+        {
+            'word_id': word_id,
+            'english_word': f"word{word_id}",
+            'russian_word': f"слово{word_id}",
+            'is_default': is_default
+        }
+        for word_id in range(start, start + count)
+    )
+
+
+def legacy_question(available_words):
+    """Алгоритм до появления WordIndex: список всех слов + отфильтрованная копия"""
+    correct_word = random.choice(available_words)
+    other_words = [w for w in available_words if w['word_id'] != correct_word['word_id']]
+    wrong_options = random.sample(other_words, min(3, len(other_words)))
+    all_options = [correct_word] + wrong_options
+    random.shuffle(all_options)
+    return {
+        'correct_word': correct_word,
+        'all_options': all_options,
+        'russian_word': correct_word['russian_word']
+    }
+
+
+def per_call_us(func, number):
+    best = min(timeit.repeat(func, number=number, repeat=REPEAT))
+    return best / number * 1e6
+
+
+def main():
+    default_words = make_words(1, DEFAULT_WORDS_COUNT, True)
+    print(f"{'слов':>8} | {'старый, мкс':>12} | {'WordIndex, мкс':>14}")
+    print("-" * 42)
+    for size in SIZES:
+        user_words = make_words(DEFAULT_WORDS_COUNT + 1, size - DEFAULT_WORDS_COUNT, False)
+        number = max(10, 200000 // size)
+
+        # Старый путь получал из БД новый список на каждый вопрос
+        legacy = per_call_us(lambda: legacy_question(list(default_words) + list(user_words)), number)
+        engine = per_call_us(
+            lambda: sample_question(WordIndex(default_words, user_words)),
+            2000
+        )
+        print(f"{size:>8} | {legacy:>12.2f} | {engine:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
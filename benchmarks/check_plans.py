@@ -0,0 +1,127 @@
+"""
+Проверка планов запросов словаря на большой таблице
+
+Создает временную схему plan_check с той же структурой, применяет к ней
+миграцию sql/migrations/001_covering_indexes.sql, заполняет 1 000 000 слов
+и проверяет через EXPLAIN, что запросы словаря читают таблицы только через
+Index Only Scan. В конце схема удаляется; основные таблицы не затрагиваются.
+
+Нужна рабочая БД из config.py. Запуск из корня проекта:
+    python -m benchmarks.check_plans --words 1000000
+"""
+import argparse
+import json
+import os
+import sys
+
+import psycopg2
+
+from config import DATABASE_CONFIG
+from database.migrations import MIGRATIONS_DIR
+from database import queries
+
+SCHEMA = 'plan_check'
+MIGRATION = os.path.join(MIGRATIONS_DIR, '001_covering_indexes.sql')
+USERS_COUNT = 10000
+DEFAULT_WORDS_COUNT = 10000
+
+CREATE_TABLES = """
+    CREATE TABLE words (
+        word_id SERIAL PRIMARY KEY,
+        english_word VARCHAR(255) NOT NULL UNIQUE,
+        russian_word VARCHAR(255) NOT NULL,
+        is_default BOOLEAN DEFAULT FALSE,
+        created_by BIGINT
+    );
+    CREATE TABLE user_words (
+        id SERIAL PRIMARY KEY,
+        user_id BIGINT NOT NULL,
+        word_id INTEGER NOT NULL,
+        UNIQUE (user_id, word_id)
+    );
+    CREATE TABLE word_reviews (
+        user_id BIGINT NOT NULL,
+        word_id INTEGER NOT NULL,
+        due_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, word_id)
+    );
+"""
+
+FILL_TABLES = """
+    INSERT INTO words (english_word, russian_word, is_default, created_by)
+    SELECT 'word' || n, 'слово' || n, n <= %(defaults)s,
+           CASE WHEN n <= %(defaults)s THEN NULL ELSE n %% %(users)s END
+    FROM generate_series(1, %(words)s) AS n;
+
+    INSERT INTO user_words (user_id, word_id)
+    SELECT created_by, word_id FROM words WHERE is_default = FALSE;
+
+    INSERT INTO word_reviews (user_id, word_id, due_at)
+    SELECT word_id %% %(users)s, word_id, NOW() + (word_id %% 100) * INTERVAL '1 hour'
+    FROM words;
+"""
+
+# Запрос -> параметры для EXPLAIN
+CHECKED_QUERIES = {
+    'SELECT_DEFAULT_WORDS': (queries.SELECT_DEFAULT_WORDS, None),
+    'SELECT_USER_EXTRA_WORDS': (queries.SELECT_USER_EXTRA_WORDS, (42,)),
+    'SELECT_AVAILABLE_WORDS': (queries.SELECT_AVAILABLE_WORDS, (42,)),
+    'SELECT_DUE_WORD': (queries.SELECT_DUE_WORD, (42,)),
+}
+
+
+def table_scans(plan):
+    """Все узлы плана, читающие таблицу или индекс: (тип узла, таблица, индекс)"""
+    scans = []
+    if 'Relation Name' in plan:
+        scans.append((plan['Node Type'], plan['Relation Name'], plan.get('Index Name')))
+    for child in plan.get('Plans', []):
+        scans.extend(table_scans(child))
+    return scans
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--words', type=int, default=1000000, help="сколько слов сгенерировать")
+    parser.add_argument('--keep', action='store_true', help="не удалять схему plan_check")
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(**DATABASE_CONFIG)
+    connection.autocommit = True  # VACUUM не работает внутри транзакции
+    cursor = connection.cursor()
+    failed = False
+    try:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+        cursor.execute(f"SET search_path TO {SCHEMA}")
+        cursor.execute(CREATE_TABLES)
+        with open(MIGRATION, encoding='utf-8') as migration_file:
+            cursor.execute(migration_file.read())
+
+        print(f"Заполняем {args.words} слов...")
+        cursor.execute(FILL_TABLES, {'words': args.words, 'defaults': DEFAULT_WORDS_COUNT, 'users': USERS_COUNT})
+        # Карта видимости нужна, чтобы Index Only Scan не ходил в таблицу
+        cursor.execute("VACUUM ANALYZE words, user_words, word_reviews")
+
+        for name, (query, params) in CHECKED_QUERIES.items():
+            cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scans = table_scans(plan[0]['Plan'])
+            bad = [scan for scan in scans if scan[0] != 'Index Only Scan']
+            failed = failed or bool(bad) or not scans
+            mark = '❌' if bad or not scans else '✅'
+            print(f"{mark} {name}")
+            for node_type, relation, index in scans:
+                print(f"     {node_type} on {relation}" + (f" using {index}" if index else ""))
+    finally:
+        if not args.keep:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        connection.close()
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
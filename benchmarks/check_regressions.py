@@ -0,0 +1,138 @@
+"""
+Проверка исправленных ошибок на рабочей БД
+
+Каждая проверка выполняется в своей транзакции от имени выдуманных
+пользователей (отрицательные user_id) и в конце откатывается - данные
+бота не меняются. Запросы идут через курсор пула (TimedCursor), то есть
+так же, как в боте: подготовленными, если DB_PREPARED_STATEMENTS включен.
+
+Нужна рабочая БД из config.py со всеми миграциями. Запуск из корня проекта:
+    python -m benchmarks.check_regressions
+"""
+import sys
+
+import psycopg2
+
+from config import DATABASE_CONFIG, DB_PREPARED_STATEMENTS
+from database.db_config import TimedCursor
+from database.statements import PreparingConnection
+from database import queries
+
+FIRST_USER = -9000000001
+SECOND_USER = -9000000002
+WORD = 'Regressioncheckword'
+
+
+def create_users(cursor, *user_ids):
+    for user_id in user_ids:
+        cursor.execute(
+            "INSERT INTO users (user_id, username, first_name) VALUES (%s, NULL, 'check')",
+            (user_id,)
+        )
+
+
+def add_word(cursor, user_id, english_word=WORD, russian_word='проверка'):
+    cursor.execute(queries.ADD_USER_WORD, {
+        'english_word': english_word, 'russian_word': russian_word, 'user_id': user_id
+    })
+    return cursor.fetchone()
+
+
+def due_word_id(cursor, user_id):
+    cursor.execute(queries.SELECT_DUE_WORD, (user_id,))
+    row = cursor.fetchone()
+    return row['word_id'] if row else None
+
+
+def check_removed_shared_word_is_not_due(cursor):
+    """Удаленное из словаря общее с другим пользователем слово не выдается на повторение"""
+    create_users(cursor, FIRST_USER, SECOND_USER)
+    word = add_word(cursor, FIRST_USER)
+    add_word(cursor, SECOND_USER)
+    cursor.execute(queries.UPSERT_REVIEW, queries.review_params(SECOND_USER, word['word_id'], False))
+    cursor.execute(
+        "UPDATE word_reviews SET due_at = NOW() - INTERVAL '1 minute' WHERE user_id = %s",
+        (SECOND_USER,)
+    )
+    assert due_word_id(cursor, SECOND_USER) == word['word_id'], "слово не выдано на повторение"
+
+    cursor.execute(queries.REMOVE_USER_WORD, {'user_id': SECOND_USER, 'word_id': word['word_id']})
+    cursor.execute("SELECT 1 FROM words WHERE word_id = %s", (word['word_id'],))
+    assert cursor.fetchone(), "удалено слово, которое есть в словаре другого пользователя"
+    cursor.execute("SELECT 1 FROM word_reviews WHERE user_id = %s", (SECOND_USER,))
+    assert not cursor.fetchone(), "осталось состояние повторения удаленного слова"
+
+    # Строка, оставшаяся от прежних версий, тоже не выдается
+    cursor.execute(
+        "INSERT INTO word_reviews (user_id, word_id, due_at) VALUES (%s, %s, NOW() - INTERVAL '1 minute')",
+        (SECOND_USER, word['word_id'])
+    )
+    assert due_word_id(cursor, SECOND_USER) is None, "выдано на повторение удаленное слово"
+
+
+def check_linked_word_is_listed_for_removal(cursor):
+    """Слово, добавленное раньше другим пользователем, видно в списке удаления и в ответе на добавление"""
+    create_users(cursor, FIRST_USER, SECOND_USER)
+    word = add_word(cursor, FIRST_USER)
+    linked = add_word(cursor, SECOND_USER, russian_word='другой перевод')
+    assert linked['word_id'] == word['word_id'] and linked['linked'], "слово не добавлено в словарь"
+    assert linked['russian_word'] == 'проверка', "возвращен введенный перевод вместо сохраненного"
+
+    for query in (queries.SELECT_PERSONAL_WORDS_AFTER, queries.SELECT_PERSONAL_WORDS_BEFORE):
+        cursor.execute(query, queries.personal_page_params(SECOND_USER, WORD[:5], None, 10))
+        assert word['word_id'] in [row['word_id'] for row in cursor.fetchall()], \
+            "слово из словаря пользователя не попало в список удаления"
+
+
+def check_prepared_statement_survives_discard_all(cursor):
+    """Подготовленный запрос выполняется и после сброса сессии сервером (DISCARD ALL, как у pgbouncer)"""
+    connection = cursor.connection
+    cursor.execute(queries.SELECT_DUE_WORD, (FIRST_USER,))
+    if DB_PREPARED_STATEMENTS:
+        assert 'ec_select_due_word' in connection.prepared, "запрос не подготовлен"
+    connection.commit()
+    connection.autocommit = True  # DISCARD ALL не выполняется внутри транзакции
+    try:
+        cursor.execute("DISCARD ALL")
+    finally:
+        connection.autocommit = False
+
+    try:
+        cursor.execute(queries.SELECT_DUE_WORD, (FIRST_USER,))
+    except psycopg2.errors.InvalidSqlStatementName:
+        raise AssertionError("запрос не подготовлен заново после DISCARD ALL")
+    assert cursor.fetchall() == [], "неожиданный результат после повторной подготовки"
+
+
+# Название -> проверка(курсор); AssertionError - проверка не прошла
+CHECKS = {
+    'removed shared word is not due': check_removed_shared_word_is_not_due,
+    'linked word is listed for removal': check_linked_word_is_listed_for_removal,
+    'prepared statement survives DISCARD ALL': check_prepared_statement_survives_discard_all,
+}
+
+
+def main():
+    connection = psycopg2.connect(
+        **DATABASE_CONFIG, connection_factory=PreparingConnection, cursor_factory=TimedCursor
+    )
+    failed = False
+    try:
+        for name, check in CHECKS.items():
+            try:
+                with connection.cursor() as cursor:
+                    check(cursor)
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failed = True
+                print(f"❌ {name}: {e}")
+            finally:
+                connection.rollback()
+    finally:
+        connection.close()
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Нагрузочный тест обработчиков бота
+
+Симулирует N пользователей, которые жмут «Дальше», отвечают, добавляют и удаляют слова.
+Обновления Telegram собираются в памяти и передаются в bot.process_new_updates,
+а Telegram API подменяется заглушкой, поэтому сеть и токен не нужны.
+Все запросы к БД настоящие - нужна локальная БД из config.py.
+
+Отчет: сообщений в секунду, перцентили задержки обработки одного обновления,
+SQL-запросов и вызовов Telegram API на одно обновление.
+
+Запуск из корня проекта:
+    python -m benchmarks.load_test --users 50 --steps 40 --threads 8
+"""
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import json
+import random
+import statistics
+import threading
+import time
+
+from telebot import apihelper, types
+from telebot.storage import StateMemoryStorage
+
+from config import Command
+from main import create_bot
+from bot.storage import create_state_storage
+from database.db_config import Database, close_pool
+from database.answers import answer_log
+from database.registration import user_registry
+from metrics import registry
+
+# Отрицательные ID не пересекаются с настоящими пользователями Telegram
+LOAD_USER_BASE = -2000000
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'EnglishCard', 'username': 'englishcard_load_bot'}
+
+# Действие пользователя -> вес
+ACTIONS = {
+    'next': 4,
+    'answer': 4,
+    'add': 1,
+    'delete': 1
+}
+COMMANDS = {Command.NEXT, Command.ADD_WORD, Command.DELETE_WORD}
+
+
+class FakeTelegram:
+    """Заглушка apihelper._make_request: отвечает как Telegram и запоминает клавиатуры"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._message_ids = itertools.count(1)
+        self.calls = Counter()
+        self.markups = {}  # chat_id -> последняя отправленная клавиатура
+
+    def __call__(self, token, method_name, method='get', params=None, files=None):
+        params = params or {}
+        with self._lock:
+            self.calls[method_name] += 1
+            message_id = next(self._message_ids)
+        if method_name == 'getMe':
+            return BOT_USER
+        if method_name in ('answerCallbackQuery', 'deleteMessage', 'setMyCommands'):
+            return True
+
+        chat_id = int(params.get('chat_id', 0))
+        if params.get('reply_markup'):
+            self.markups[chat_id] = json.loads(params['reply_markup'])
+        return {
+            'message_id': params.get('message_id', message_id),
+            'from': BOT_USER,
+            'chat': {'id': chat_id, 'type': 'private'},
+            'date': int(time.time()),
+            'text': params.get('text', '')
+        }
+
+
+class SimulatedUser:
+    """Пользователь, отправляющий боту обновления по очереди"""
+
+    _update_ids = itertools.count(1)
+
+    def __init__(self, bot, telegram, user_id, rng):
+        self.bot = bot
+        self.telegram = telegram
+        self.user_id = user_id
+        self.rng = rng
+        self.user = {'id': user_id, 'is_bot': False, 'first_name': f'Load{-user_id}', 'username': f'load{-user_id}'}
+        self.latencies = []
+        self.added = 0
+
+    def run(self, steps):
+        self.send_text('/start')
+        for _ in range(steps):
+            action = self.rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+            getattr(self, f'do_{action}')()
+        return self.latencies
+
+    def do_next(self):
+        self.send_text(Command.NEXT)
+
+    def do_answer(self):
+        options = [
+            button['text']
+            for row in self.markup().get('keyboard', [])
+            for button in row
+            if button['text'] not in COMMANDS
+        ]
+        self.send_text(self.rng.choice(options) if options else Command.NEXT)
+
+    def do_add(self):
+        self.added += 1
+        self.send_text(Command.ADD_WORD)
+        self.send_text(f"Load{-self.user_id}w{self.added}")
+        self.send_text("перевод")
+
+    def do_delete(self):
+        self.send_text(Command.DELETE_WORD)
+        buttons = [
+            button
+            for row in self.markup().get('inline_keyboard', [])
+            for button in row
+            if button.get('callback_data', '').startswith('delete_word_')
+        ]
+        if buttons:
+            self.send_callback(self.rng.choice(buttons)['callback_data'])
+
+    def markup(self):
+        return self.telegram.markups.get(self.user_id) or {}
+
+    def send_text(self, text):
+        message = {
+            'message_id': next(self._update_ids),
+            'from': self.user,
+            'chat': {'id': self.user_id, 'type': 'private'},
+            'date': int(time.time()),
+            'text': text
+        }
+        if text.startswith('/'):
+            message['entities'] = [{'offset': 0, 'length': len(text), 'type': 'bot_command'}]
+        self.process({'update_id': next(self._update_ids), 'message': message})
+
+    def send_callback(self, data):
+        self.process({
+            'update_id': next(self._update_ids),
+            'callback_query': {
+                'id': str(next(self._update_ids)),
+                'from': self.user,
+                'chat_instance': str(self.user_id),
+                'data': data,
+                'message': {
+                    'message_id': next(self._update_ids),
+                    'from': BOT_USER,
+                    'chat': {'id': self.user_id, 'type': 'private'},
+                    'date': int(time.time()),
+                    'text': ''
+                }
+            }
+        })
+
+    def process(self, update):
+        started = time.perf_counter()
+        self.bot.process_new_updates([types.Update.de_json(update)])
+        self.latencies.append(time.perf_counter() - started)
+
+
+def cleanup(users):
+    """Удалить пользователей теста вместе со словами и состояниями"""
+    user_ids = [LOAD_USER_BASE - number for number in range(users)]
+    with Database() as db:
+        db.cursor.execute("DELETE FROM user_words WHERE user_id = ANY(%s)", (user_ids,))
+        db.cursor.execute("DELETE FROM words WHERE created_by = ANY(%s)", (user_ids,))
+        db.cursor.execute("DELETE FROM bot_states WHERE user_id = ANY(%s)", (user_ids,))
+        db.cursor.execute("DELETE FROM answers WHERE user_id = ANY(%s)", (user_ids,))
+        db.cursor.execute("DELETE FROM user_word_stats WHERE user_id = ANY(%s)", (user_ids,))
+        db.cursor.execute("DELETE FROM user_stats WHERE user_id = ANY(%s)", (user_ids,))
+        db.cursor.execute("DELETE FROM users WHERE user_id = ANY(%s)", (user_ids,))
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=50, help="сколько пользователей симулировать")
+    parser.add_argument('--steps', type=int, default=40, help="действий каждого пользователя")
+    parser.add_argument('--threads', type=int, default=8, help="сколько пользователей обслуживать параллельно")
+    parser.add_argument('--memory-state', action='store_true',
+                        help="состояния диалогов в памяти вместо STATE_STORAGE")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    telegram = FakeTelegram()
+    apihelper._make_request = telegram
+    state_storage = StateMemoryStorage() if args.memory_state else create_state_storage()
+    bot = create_bot(state_storage, threaded=False)
+
+    seed = random.Random(args.seed)
+    users = [
+        SimulatedUser(bot, telegram, LOAD_USER_BASE - number, random.Random(seed.random()))
+        for number in range(args.users)
+    ]
+
+    sql_before = registry.total('sql_seconds')
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            results = list(executor.map(lambda user: user.run(args.steps), users))
+        # Отложенные записи (состояния, регистрация) - тоже часть нагрузки
+        if hasattr(state_storage, 'flush'):
+            state_storage.flush()
+        user_registry.flush()
+        answer_log.flush()
+        elapsed = time.perf_counter() - started
+        sql_count = registry.total('sql_seconds') - sql_before
+    finally:
+        if hasattr(state_storage, 'close'):
+            state_storage.close()
+        user_registry.flush()
+        answer_log.flush()
+        cleanup(args.users)
+        close_pool()
+
+    latencies = sorted(itertools.chain.from_iterable(results))
+    updates = len(latencies)
+    print(f"Пользователей: {args.users}, потоков: {args.threads}, обновлений: {updates}")
+    print(f"Пропускная способность: {updates / elapsed:,.0f} сообщений/с")
+    print(
+        f"Задержка: p50={percentile(latencies, 0.5) * 1000:.1f} мс, "
+        f"p90={percentile(latencies, 0.9) * 1000:.1f} мс, "
+        f"p99={percentile(latencies, 0.99) * 1000:.1f} мс, "
+        f"среднее={statistics.fmean(latencies) * 1000:.1f} мс"
+    )
+    print(f"SQL-запросов на сообщение: {sql_count / updates:.2f}")
+    print(f"Вызовов Telegram API на сообщение: {sum(telegram.calls.values()) / updates:.2f}")
+    print("По обработчикам:")
+    for line in registry.summary():
+        if line.startswith(('handler_seconds', 'function_seconds')):
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
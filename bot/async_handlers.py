@@ -0,0 +1,450 @@
+"""
+Асинхронные обработчики команд и сообщений бота (AsyncTeleBot)
+
+Логика та же, что в bot.handlers, но все обращения к Telegram и БД
+выполняются через await и не блокируют event loop.
+"""
+import asyncio
+import io
+
+from telebot.asyncio_handler_backends import State, StatesGroup
+
+from config import Command, WELCOME_MESSAGE, IMPORT_MAX_FILE_SIZE
+from database.async_models import AsyncUserManager, AsyncWordManager, AsyncReviewManager, AsyncStatsManager
+from database.bulk import import_words, export_words, detect_format
+from database.matching import check_answer, EXACT, TYPO
+from metrics import timed_function
+from bot.questions import question_text, correct_text, wrong_text, answered_text, mode_text, reminders_text
+from bot.stats import format_stats
+from bot.keyboards import (
+    create_main_keyboard, create_game_keyboard,
+    create_cancel_keyboard, create_delete_words_keyboard
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Глобальная переменная для бота (будет установлена в async_main.py)
+bot_instance = None
+
+
+# Состояния бота (для AsyncTeleBot нужны классы из asyncio_handler_backends)
+class BotStates(StatesGroup):
+    waiting_english_word = State()  # Ожидаем английское слово
+    waiting_russian_word = State()  # Ожидаем русский перевод
+    playing_game = State()  # Игра в угадывание
+    waiting_import_file = State()  # Ожидаем файл со словами для импорта
+    choosing_word_to_delete = State()  # Листаем список слов для удаления или ищем по началу слова
+
+
+def register_handlers(bot):
+    """Регистрация всех обработчиков"""
+    global bot_instance
+    bot_instance = bot
+
+    @bot.message_handler(commands=['start', 'cards'])
+    async def start_command(message):
+        """Обработчик команды /start"""
+        user_id = message.from_user.id
+        username = message.from_user.username
+        first_name = message.from_user.first_name
+
+        # Регистрируем пользователя в БД
+        await AsyncUserManager.create_user(user_id, username, first_name)
+
+        # Отправляем приветственное сообщение
+        await bot.send_message(message.chat.id, WELCOME_MESSAGE)
+
+        # Запускаем первую игру
+        await start_new_game(message)
+
+    @bot.message_handler(commands=['stats'])
+    async def stats_command(message):
+        """Обработчик команды /stats - точность, серии и трудные слова"""
+        result = await AsyncStatsManager.get_user_stats(message.from_user.id)
+        await bot.send_message(message.chat.id, format_stats(result))
+
+    @bot.message_handler(commands=['typing'])
+    async def typing_command(message):
+        """Обработчик команды /typing - переключить ответ вводом текста и выбор из вариантов"""
+        user_id = message.from_user.id
+        typed_answers = not await AsyncUserManager.get_typed_answers(user_id)
+        if not await AsyncUserManager.set_typed_answers(user_id, typed_answers):
+            await bot.send_message(message.chat.id, "❌ Не удалось сменить режим. Попробуйте позже.")
+            return
+
+        await bot.set_state(user_id, BotStates.playing_game, message.chat.id)
+        async with bot.retrieve_data(user_id, message.chat.id) as data:
+            data['typed_answers'] = typed_answers
+        await bot.send_message(message.chat.id, mode_text(typed_answers))
+        await start_new_game(message)
+
+    @bot.message_handler(commands=['reminders'])
+    async def reminders_command(message):
+        """Обработчик команды /reminders - включить или выключить ежедневные напоминания"""
+        enabled = await AsyncUserManager.toggle_reminders(message.from_user.id)
+        await bot.send_message(message.chat.id, reminders_text(enabled))
+
+    @bot.message_handler(commands=['export'])
+    async def export_command(message):
+        """Обработчик команды /export - выгрузка словаря в CSV"""
+        target = io.BytesIO()
+        try:
+            # COPY работает через psycopg2, поэтому выполняем его в отдельном потоке
+            rows = await asyncio.to_thread(export_words, target, message.from_user.id)
+        except Exception as e:
+            logger.error(f"Ошибка экспорта словаря: {e}")
+            await bot.send_message(message.chat.id, "❌ Не удалось выгрузить словарь.")
+            return
+
+        target.seek(0)
+        await bot.send_document(
+            message.chat.id,
+            target,
+            visible_file_name='englishcard_words.csv',
+            caption=f"📤 Ваш словарь: {rows} слов"
+        )
+
+    @bot.message_handler(commands=['import'])
+    async def import_command(message):
+        """Обработчик команды /import - ожидание файла со словами"""
+        await bot.send_message(
+            message.chat.id,
+            "📥 Отправьте CSV или TSV файл: английское слово и перевод в каждой строке, "
+            "первая строка - заголовок.",
+            reply_markup=create_cancel_keyboard()
+        )
+        await bot.set_state(message.from_user.id, BotStates.waiting_import_file, message.chat.id)
+
+    @bot.message_handler(func=lambda message: message.text == Command.NEXT)
+    async def next_word_handler(message):
+        """Обработчик кнопки 'Дальше'"""
+        await start_new_game(message)
+
+    @bot.message_handler(func=lambda message: message.text == Command.ADD_WORD)
+    async def add_word_handler(message):
+        """Обработчик кнопки 'Добавить слово'"""
+        await bot.send_message(
+            message.chat.id,
+            "📝 Введите английское слово, которое хотите добавить:",
+            reply_markup=create_cancel_keyboard()
+        )
+        await bot.set_state(message.from_user.id, BotStates.waiting_english_word, message.chat.id)
+
+    async def send_delete_picker(chat_id, user_id, prefix=''):
+        """Первая страница слов для удаления (начинающихся с prefix)"""
+        page = await AsyncWordManager.get_personal_words_page(user_id, prefix)
+
+        if not page['words']:
+            if prefix:
+                await bot.send_message(
+                    chat_id,
+                    f"🔎 Нет ваших слов, начинающихся на «{prefix}». Отправьте другое начало слова."
+                )
+            else:
+                await bot.send_message(
+                    chat_id,
+                    "❌ У вас нет персональных слов для удаления.",
+                    reply_markup=create_main_keyboard()
+                )
+            return
+
+        await bot.set_state(user_id, BotStates.choosing_word_to_delete, chat_id)
+        async with bot.retrieve_data(user_id, chat_id) as data:
+            data['delete_prefix'] = prefix
+
+        title = f"🗑 Ваши слова на «{prefix}»:" if prefix else "🗑 Выберите слово для удаления:"
+        await bot.send_message(
+            chat_id,
+            f"{title}\n🔎 Для поиска отправьте начало слова.",
+            reply_markup=create_delete_words_keyboard(page)
+        )
+
+    @bot.message_handler(func=lambda message: message.text == Command.DELETE_WORD)
+    async def delete_word_handler(message):
+        """Обработчик кнопки 'Удалить слово'"""
+        await send_delete_picker(message.chat.id, message.from_user.id)
+
+    @bot.message_handler(state=BotStates.waiting_import_file, content_types=['document'])
+    async def process_import_file(message):
+        """Обработчик файла для импорта"""
+        document = message.document
+        if document.file_size and document.file_size > IMPORT_MAX_FILE_SIZE:
+            await bot.send_message(message.chat.id, "❌ Файл слишком большой.")
+            return
+
+        status = await bot.send_message(message.chat.id, "⏳ Загружаем слова...")
+        try:
+            file_info = await bot.get_file(document.file_id)
+            content = await bot.download_file(file_info.file_path)
+            stats = await asyncio.to_thread(
+                import_words,
+                io.BytesIO(content),
+                message.from_user.id,
+                detect_format(document.file_name)
+            )
+        except Exception as e:
+            logger.error(f"Ошибка импорта словаря: {e}")
+            await bot.edit_message_text(
+                "❌ Не удалось импортировать файл. Проверьте формат.",
+                message.chat.id,
+                status.message_id
+            )
+            return
+
+        await bot.delete_state(message.from_user.id, message.chat.id)
+        await bot.edit_message_text(
+            f"✅ Импорт завершен!\n"
+            f"📄 Строк в файле: {stats['rows_read']}\n"
+            f"➕ Добавлено в ваш словарь: {stats['links_added']}",
+            message.chat.id,
+            status.message_id
+        )
+        await start_new_game(message)
+
+    @bot.message_handler(state=BotStates.waiting_import_file)
+    async def process_import_text(message):
+        """Обработчик текста вместо файла для импорта"""
+        if message.text and message.text.lower() == 'отмена':
+            await bot.send_message(message.chat.id, "❌ Импорт отменен.")
+            await bot.delete_state(message.from_user.id, message.chat.id)
+            await start_new_game(message)
+            return
+        await bot.send_message(message.chat.id, "📎 Отправьте файл CSV/TSV или нажмите «Отмена».")
+
+    @bot.message_handler(state=BotStates.waiting_english_word)
+    async def process_english_word(message):
+        """Обработчик ввода английского слова"""
+        if message.text.lower() == 'отмена':
+            await bot.send_message(message.chat.id, "❌ Добавление слова отменено.")
+            await bot.delete_state(message.from_user.id, message.chat.id)
+            await start_new_game(message)
+            return
+
+        english_word = message.text.strip().title()
+
+        await bot.set_state(message.from_user.id, BotStates.waiting_russian_word, message.chat.id)
+        async with bot.retrieve_data(message.from_user.id, message.chat.id) as data:
+            data['english_word'] = english_word
+
+        await bot.send_message(
+            message.chat.id,
+            f"✅ Английское слово: {english_word}\n"
+            f"📝 Теперь введите русский перевод:",
+            reply_markup=create_cancel_keyboard()
+        )
+
+    @bot.message_handler(state=BotStates.waiting_russian_word)
+    async def process_russian_word(message):
+        """Обработчик ввода русского перевода"""
+        if message.text.lower() == 'отмена':
+            await bot.send_message(message.chat.id, "❌ Добавление слова отменено.")
+            await bot.delete_state(message.from_user.id, message.chat.id)
+            await start_new_game(message)
+            return
+
+        user_id = message.from_user.id
+        russian_word = message.text.strip().title()
+
+        async with bot.retrieve_data(message.from_user.id, message.chat.id) as data:
+            english_word = data.get('english_word', '') if data else ''
+
+        if not english_word:
+            await bot.send_message(message.chat.id, "❌ Ошибка: не найдено английское слово. Попробуйте снова.")
+            await start_new_game(message)
+            return
+
+        word = await AsyncWordManager.add_user_word(user_id, english_word, russian_word)
+
+        if word:
+            words_count = await AsyncUserManager.get_user_words_count(user_id)
+            await bot.send_message(
+                message.chat.id,
+                f"🎉 Слово добавлено!\n"
+                f"🇬🇧 {word['english_word']} - 🇷🇺 {word['russian_word']}\n"
+                f"📚 У вас теперь {words_count} слов для изучения"
+            )
+        else:
+            await bot.send_message(
+                message.chat.id,
+                "❌ Ошибка при добавлении слова. Возможно, такое слово уже существует."
+            )
+
+        await bot.delete_state(message.from_user.id, message.chat.id)
+        await start_new_game(message)
+
+    @bot.message_handler(state=BotStates.choosing_word_to_delete)
+    async def process_delete_search(message):
+        """Обработчик поиска слова для удаления по началу слова
+
+        Кнопки команд сюда не доходят: их обработчики зарегистрированы раньше.
+        """
+        if message.text.lower() == 'отмена':
+            await bot.delete_state(message.from_user.id, message.chat.id)
+            await start_new_game(message)
+            return
+
+        # Под списком слов остаются кнопки вариантов последнего вопроса: их нажатие - ответ, а не поиск
+        options = []
+        async with bot.retrieve_data(message.from_user.id, message.chat.id) as data:
+            if data:
+                options = data.get('all_options', [])
+        if any(option['english_word'] == message.text for option in options):
+            await bot.set_state(message.from_user.id, BotStates.playing_game, message.chat.id)
+            await handle_game_answer(message)
+            return
+
+        await send_delete_picker(message.chat.id, message.from_user.id, message.text.strip().title())
+
+    @bot.callback_query_handler(func=lambda call: call.data.startswith('delete_page_'))
+    async def delete_page_callback(call):
+        """Обработчик листания списка слов для удаления"""
+        _, _, direction, word_id = call.data.split('_')
+        user_id = call.from_user.id
+
+        prefix = ''
+        try:
+            async with bot.retrieve_data(user_id, call.message.chat.id) as data:
+                if data:
+                    prefix = data.get('delete_prefix', '')
+        except Exception:
+            pass
+
+        if direction == 'next':
+            page = await AsyncWordManager.get_personal_words_page(user_id, prefix, after_id=int(word_id))
+        else:
+            page = await AsyncWordManager.get_personal_words_page(user_id, prefix, before_id=int(word_id))
+
+        await bot.answer_callback_query(call.id)
+        if not page['words']:
+            return
+        await bot.edit_message_reply_markup(
+            call.message.chat.id,
+            call.message.message_id,
+            reply_markup=create_delete_words_keyboard(page)
+        )
+
+    @bot.callback_query_handler(func=lambda call: call.data.startswith('delete_word_'))
+    async def delete_word_callback(call):
+        """Обработчик удаления слова"""
+        word_id = int(call.data.split('_')[2])
+        user_id = call.from_user.id
+
+        success = await AsyncWordManager.delete_user_word(user_id, word_id)
+
+        if success:
+            words_count = await AsyncUserManager.get_user_words_count(user_id)
+            await bot.answer_callback_query(call.id, "✅ Слово удалено!")
+            await bot.edit_message_text(
+                f"🗑 Слово удалено из вашего словаря!\n"
+                f"📚 У вас осталось {words_count} слов для изучения",
+                call.message.chat.id,
+                call.message.message_id
+            )
+        else:
+            await bot.answer_callback_query(call.id, "❌ Ошибка удаления!")
+
+        # Возвращаемся к игре (call.message отправлен ботом, поэтому пользователь - из call)
+        await start_new_game(call.message, user_id)
+
+    @bot.message_handler(func=lambda message: True, content_types=['text'])
+    async def handle_game_answer(message):
+        """Обработчик ответов в игре (кнопкой или, в режиме /typing, текстом)"""
+        user_id = message.from_user.id
+
+        try:
+            correct_word = None
+            options = []
+            typed_answers = False
+            answered = False
+            verdict = word = None
+            # Индекс словаря читается до блокировки состояния, чтобы не держать ее на запросе к БД
+            index = await AsyncWordManager.get_word_index(user_id)
+            async with bot.retrieve_data(message.from_user.id, message.chat.id) as data:
+                if data:
+                    correct_word = data.get('correct_word')
+                    options = data.get('all_options', [])
+                    typed_answers = data.get('typed_answers', False)
+                    answered = data.get('answered', False)
+                if correct_word:
+                    # Проверка ответа - чистая функция, в памяти
+                    verdict, word = check_answer(message.text, correct_word, index)
+                    if verdict in (EXACT, TYPO):
+                        # Вопрос закрыт: повторное нажатие верной кнопки не засчитывается еще раз
+                        del data['correct_word']
+                        data['answered'] = True
+
+            if verdict is None:
+                # Нет вопроса - начинаем новый; вопрос уже отвечен верно - повтор не засчитывается,
+                # но пользователь видит, что делать дальше
+                if answered:
+                    await bot.send_message(message.chat.id, answered_text(), reply_markup=create_main_keyboard())
+                else:
+                    await start_new_game(message)
+                return
+
+            # Запоминаем ответ для интервального повторения
+            is_correct = verdict in (EXACT, TYPO)
+            await AsyncReviewManager.record_answer(user_id, correct_word['word_id'], is_correct)
+
+            if is_correct:
+                words_count = await AsyncUserManager.get_user_words_count(user_id)
+                response = correct_text(verdict, correct_word, words_count)
+                await bot.send_message(message.chat.id, response, reply_markup=create_main_keyboard())
+            elif typed_answers:
+                await bot.send_message(message.chat.id, wrong_text(verdict, word, correct_word),
+                                       reply_markup=create_main_keyboard())
+            elif options:
+                await bot.send_message(message.chat.id, wrong_text(verdict, word, correct_word),
+                                       reply_markup=create_game_keyboard(options))
+            else:
+                await start_new_game(message)
+
+        except Exception:
+            logger.exception("Ошибка обработки ответа")
+            await start_new_game(message)
+
+
+@timed_function('start_new_game')
+async def start_new_game(message, user_id=None):
+    """Запуск новой игры
+
+    user_id нужен, когда message - сообщение самого бота (например, из callback).
+    """
+    if user_id is None:
+        user_id = message.from_user.id
+
+    # Готовый вопрос из заготовок, иначе подбираем сейчас
+    game_data = await AsyncWordManager.next_question(user_id)
+
+    if not game_data:
+        await bot_instance.send_message(
+            message.chat.id,
+            "❌ Недостаточно слов для игры!\n"
+            "В базе должно быть минимум 4 слова.\n"
+            "Добавьте персональные слова или проверьте базовые слова в БД.",
+            reply_markup=create_main_keyboard()
+        )
+        return
+
+    typed_answers = False
+    try:
+        await bot_instance.set_state(user_id, BotStates.playing_game, message.chat.id)
+        async with bot_instance.retrieve_data(user_id, message.chat.id) as data:
+            # Режим ответа читается из БД один раз за сессию
+            typed_answers = data.get('typed_answers')
+            if typed_answers is None:
+                typed_answers = data['typed_answers'] = await AsyncUserManager.get_typed_answers(user_id)
+            data['correct_word'] = game_data['correct_word']
+            data['all_options'] = game_data['all_options']
+            data.pop('answered', None)
+    except Exception as e:
+        logger.error(f"Ошибка сохранения игровых данных: {e}")
+
+    if typed_answers:
+        keyboard = create_main_keyboard()
+    else:
+        keyboard = create_game_keyboard(game_data['all_options'])
+
+    question = question_text(game_data['russian_word'], typed_answers)
+    await bot_instance.send_message(message.chat.id, question, reply_markup=keyboard)
@@ -0,0 +1,136 @@
+"""
+Ежедневные напоминания о словах к повторению
+
+Рассылка идет отдельным процессом (broadcast_cli.py), а не внутри бота:
+получатели читаются пачками серверным курсором (database/broadcasts.py),
+сообщения уходят через собственный Outbox с лимитом BROADCAST_RATE.
+После того как Telegram ответил на все сообщения пачки, сохраняется
+контрольная точка - последний user_id пачки. Прерванная рассылка (падение,
+перезапуск, ошибка БД) продолжается с нее; повторно сообщение может получить
+только пачка, отправлявшаяся в момент сбоя.
+
+Пользователи, заблокировавшие бота (ответ 403), больше напоминаний не получают.
+"""
+from datetime import date, datetime, timedelta
+import threading
+import time
+
+from telebot.apihelper import ApiTelegramException
+
+from config import BROADCAST_HOUR, BROADCAST_RETRY_DELAY, Command
+from database.broadcasts import (
+    FIRST_USER_ID, start_broadcast, save_checkpoint, finish_broadcast,
+    disable_reminders, iter_reminder_recipients
+)
+from metrics import registry
+import logging
+
+logger = logging.getLogger(__name__)
+
+REMINDER_KIND = 'due_reminder'
+
+
+def reminder_text(due_count):
+    """Текст напоминания"""
+    return (
+        f"⏰ Слов к повторению сегодня: {due_count}\n"
+        f"Нажмите «{Command.NEXT}», чтобы начать!\n"
+        f"🔕 /reminders - отключить напоминания"
+    )
+
+
+class _ChunkResults:
+    """Итоги отправки одной пачки: ждет, пока Outbox ответит на все ее сообщения"""
+
+    def __init__(self, pending):
+        self._condition = threading.Condition()
+        self._pending = pending
+        self.sent = 0
+        self.failed = 0
+        self.blocked = []
+
+    def done(self, user_id, error):
+        with self._condition:
+            if error is None:
+                self.sent += 1
+            else:
+                self.failed += 1
+                if isinstance(error, ApiTelegramException) and error.error_code == 403:
+                    self.blocked.append(user_id)
+            self._pending -= 1
+            if not self._pending:
+                self._condition.notify_all()
+
+    def wait(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending <= 0)
+
+
+class Broadcaster:
+    """Рассылка напоминаний с контрольными точками"""
+
+    def __init__(self, bot, outbox):
+        """bot - обычный telebot.TeleBot, outbox - запущенный Outbox с лимитом рассылки"""
+        self._bot = bot
+        self._outbox = outbox
+
+    def run(self, run_date=None):
+        """Разослать напоминания за run_date (по умолчанию - сегодня) или продолжить рассылку
+
+        Возвращает итоги всей рассылки: {'sent': ..., 'failed': ...}.
+        """
+        run_date = run_date or date.today()
+        broadcast = start_broadcast(REMINDER_KIND, run_date)
+        if broadcast['finished_at'] is not None:
+            logger.info(f"Рассылка за {run_date} уже закончена")
+            return {'sent': broadcast['sent'], 'failed': broadcast['failed']}
+
+        last_user_id = broadcast['last_user_id']
+        sent, failed = broadcast['sent'], broadcast['failed']
+        if last_user_id is not None:
+            logger.info(f"Продолжаем рассылку за {run_date} после пользователя {last_user_id}")
+
+        after_user_id = FIRST_USER_ID if last_user_id is None else last_user_id
+        for chunk in iter_reminder_recipients(after_user_id, run_date):
+            results = _ChunkResults(len(chunk))
+            for recipient in chunk:
+                self._submit(recipient, results)
+            results.wait()
+
+            disable_reminders(results.blocked)
+            sent += results.sent
+            failed += results.failed
+            registry.counter('broadcast_sent_total', "Отправленные напоминания").inc(results.sent)
+            registry.counter('broadcast_failed_total', "Неотправленные напоминания").inc(results.failed)
+            save_checkpoint(broadcast['broadcast_id'], chunk[-1]['user_id'], sent, failed)
+            logger.info(f"Рассылка за {run_date}: отправлено {sent}, ошибок {failed}")
+
+        finish_broadcast(broadcast['broadcast_id'])
+        logger.info(f"Рассылка за {run_date} закончена: отправлено {sent}, ошибок {failed}")
+        return {'sent': sent, 'failed': failed}
+
+    def _submit(self, recipient, results):
+        user_id = recipient['user_id']  # Личный чат с ботом: chat_id = user_id
+        submitted = self._outbox.submit(
+            user_id, self._bot.send_message, user_id, reminder_text(recipient['due_count']),
+            done=lambda error: results.done(user_id, error)
+        )
+        if not submitted:
+            results.done(user_id, RuntimeError("очередь отправки переполнена"))
+
+    def run_forever(self, hour=BROADCAST_HOUR, retry_delay=BROADCAST_RETRY_DELAY):
+        """Каждый день в hour часов рассылать напоминания; после ошибки - продолжать через retry_delay"""
+        while True:
+            now = datetime.now()
+            starts_at = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+            if now < starts_at:
+                time.sleep((starts_at - now).total_seconds())
+                continue
+            try:
+                self.run(now.date())
+            except Exception as e:
+                logger.error(f"Ошибка рассылки, продолжим через {retry_delay} с: {e}")
+                time.sleep(retry_delay)
+                continue
+            tomorrow = starts_at + timedelta(days=1)
+            time.sleep(max(0.0, (tomorrow - datetime.now()).total_seconds()))
@@ -1,12 +1,22 @@
 """
 Обработчики команд и сообщений бота
 """
+import io
+
 import telebot
-from telebot import types
 from telebot.handler_backends import State, StatesGroup
 
-from config import Command, WELCOME_MESSAGE, CORRECT_ANSWER, WRONG_ANSWER
-from database.models import UserManager, WordManager
+from config import Command, WELCOME_MESSAGE, IMPORT_MAX_FILE_SIZE
+from database.models import UserManager, WordManager, ReviewManager, StatsManager
+from database.bulk import import_words, export_words, detect_format
+from database.matching import check_answer, EXACT, TYPO
+from bot.questions import question_text, correct_text, wrong_text, answered_text, mode_text, reminders_text
+from bot.stats import format_stats
+from bot.keyboards import (
+    create_main_keyboard, create_game_keyboard,
+    create_cancel_keyboard, create_delete_words_keyboard
+)
+from metrics import timed_function
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,6 +30,8 @@ class BotStates(StatesGroup):
     waiting_english_word = State()  # Ожидаем английское слово
     waiting_russian_word = State()  # Ожидаем русский перевод
     playing_game = State()  # Игра в угадывание
+    waiting_import_file = State()  # Ожидаем файл со словами для импорта
+    choosing_word_to_delete = State()  # Листаем список слов для удаления или ищем по началу слова
 
 
 def register_handlers(bot):
@@ -43,6 +55,63 @@ def register_handlers(bot):
         # Запускаем первую игру
         start_new_game(message)
 
+    @bot.message_handler(commands=['stats'])
+    def stats_command(message):
+        """Обработчик команды /stats - точность, серии и трудные слова"""
+        result = StatsManager.get_user_stats(message.from_user.id)
+        bot.send_message(message.chat.id, format_stats(result))
+
+    @bot.message_handler(commands=['typing'])
+    def typing_command(message):
+        """Обработчик команды /typing - переключить ответ вводом текста и выбор из вариантов"""
+        user_id = message.from_user.id
+        typed_answers = not UserManager.get_typed_answers(user_id)
+        if not UserManager.set_typed_answers(user_id, typed_answers):
+            bot.send_message(message.chat.id, "❌ Не удалось сменить режим. Попробуйте позже.")
+            return
+
+        bot.set_state(user_id, BotStates.playing_game, message.chat.id)
+        with bot.retrieve_data(user_id, message.chat.id) as data:
+            data['typed_answers'] = typed_answers
+        bot.send_message(message.chat.id, mode_text(typed_answers))
+        start_new_game(message)
+
+    @bot.message_handler(commands=['reminders'])
+    def reminders_command(message):
+        """Обработчик команды /reminders - включить или выключить ежедневные напоминания"""
+        enabled = UserManager.toggle_reminders(message.from_user.id)
+        bot.send_message(message.chat.id, reminders_text(enabled))
+
+    @bot.message_handler(commands=['export'])
+    def export_command(message):
+        """Обработчик команды /export - выгрузка словаря в CSV"""
+        target = io.BytesIO()
+        try:
+            rows = export_words(target, message.from_user.id)
+        except Exception as e:
+            logger.error(f"Ошибка экспорта словаря: {e}")
+            bot.send_message(message.chat.id, "❌ Не удалось выгрузить словарь.")
+            return
+
+        target.seek(0)
+        bot.send_document(
+            message.chat.id,
+            target,
+            visible_file_name='englishcard_words.csv',
+            caption=f"📤 Ваш словарь: {rows} слов"
+        )
+
+    @bot.message_handler(commands=['import'])
+    def import_command(message):
+        """Обработчик команды /import - ожидание файла со словами"""
+        bot.send_message(
+            message.chat.id,
+            "📥 Отправьте CSV или TSV файл: английское слово и перевод в каждой строке, "
+            "первая строка - заголовок.",
+            reply_markup=create_cancel_keyboard()
+        )
+        bot.set_state(message.from_user.id, BotStates.waiting_import_file, message.chat.id)
+
     @bot.message_handler(func=lambda message: message.text == Command.NEXT)
     def next_word_handler(message):
         """Обработчик кнопки 'Дальше'"""
@@ -58,27 +127,82 @@ def register_handlers(bot):
         )
         bot.set_state(message.from_user.id, BotStates.waiting_english_word, message.chat.id)
 
+    def send_delete_picker(chat_id, user_id, prefix=''):
+        """Первая страница слов для удаления (начинающихся с prefix)"""
+        page = WordManager.get_personal_words_page(user_id, prefix)
+
+        if not page['words']:
+            if prefix:
+                bot.send_message(
+                    chat_id,
+                    f"🔎 Нет ваших слов, начинающихся на «{prefix}». Отправьте другое начало слова."
+                )
+            else:
+                bot.send_message(
+                    chat_id,
+                    "❌ У вас нет персональных слов для удаления.",
+                    reply_markup=create_main_keyboard()
+                )
+            return
+
+        # Префикс поиска нужен при листании страниц
+        bot.set_state(user_id, BotStates.choosing_word_to_delete, chat_id)
+        with bot.retrieve_data(user_id, chat_id) as data:
+            data['delete_prefix'] = prefix
+
+        title = f"🗑 Ваши слова на «{prefix}»:" if prefix else "🗑 Выберите слово для удаления:"
+        bot.send_message(
+            chat_id,
+            f"{title}\n🔎 Для поиска отправьте начало слова.",
+            reply_markup=create_delete_words_keyboard(page)
+        )
+
     @bot.message_handler(func=lambda message: message.text == Command.DELETE_WORD)
     def delete_word_handler(message):
         """Обработчик кнопки 'Удалить слово'"""
-        user_id = message.from_user.id
-        personal_words = WordManager.get_user_personal_words(user_id)
+        send_delete_picker(message.chat.id, message.from_user.id)
+
+    @bot.message_handler(state=BotStates.waiting_import_file, content_types=['document'])
+    def process_import_file(message):
+        """Обработчик файла для импорта"""
+        document = message.document
+        if document.file_size and document.file_size > IMPORT_MAX_FILE_SIZE:
+            bot.send_message(message.chat.id, "❌ Файл слишком большой.")
+            return
 
-        if not personal_words:
-            bot.send_message(
-                message.chat.id,
-                "❌ У вас нет персональных слов для удаления.",
-                reply_markup=create_main_keyboard()
+        # Ответ с message_id не ждем: при очереди отправки (bot/outbox.py) его нет
+        bot.send_message(message.chat.id, "⏳ Загружаем слова...")
+        try:
+            file_info = bot.get_file(document.file_id)
+            content = bot.download_file(file_info.file_path)
+            stats = import_words(
+                io.BytesIO(content),
+                message.from_user.id,
+                detect_format(document.file_name)
             )
+        except Exception as e:
+            logger.error(f"Ошибка импорта словаря: {e}")
+            bot.send_message(message.chat.id, "❌ Не удалось импортировать файл. Проверьте формат.")
             return
 
-        # Создаем клавиатуру с персональными словами
-        keyboard = create_delete_words_keyboard(personal_words)
+        bot.delete_state(message.from_user.id, message.chat.id)
         bot.send_message(
             message.chat.id,
-            "🗑 Выберите слово для удаления:",
-            reply_markup=keyboard
+            f"✅ Импорт завершен!\n"
+            f"📄 Строк в файле: {stats['rows_read']}\n"
+            f"➕ Добавлено в ваш словарь: {stats['links_added']}"
         )
+        start_new_game(message)
+
+    @bot.message_handler(state=BotStates.waiting_import_file)
+    def process_import_text(message):
+        """Обработчик текста вместо файла для импорта"""
+        if message.text and message.text.lower() == 'отмена':
+            bot.send_message(message.chat.id, "❌ Импорт отменен.")
+            bot.delete_state(message.from_user.id, message.chat.id)
+            start_new_game(message)
+            return
+        bot.send_message(message.chat.id, "📎 Отправьте файл CSV/TSV или нажмите «Отмена».")
 
     @bot.message_handler(state=BotStates.waiting_english_word)
     def process_english_word(message):
@@ -91,26 +215,10 @@ def register_handlers(bot):
 
         english_word = message.text.strip().title()
 
-        # Инициализируем данные пользователя
-        try:
-            with bot.retrieve_data(message.from_user.id, message.chat.id) as data:
-                if data is None:
-                    data = {}
-                data['english_word'] = english_word
-        except:
-            # Если ошибка с состояниями, используем альтернативный подход
-            bot.send_message(
-                message.chat.id,
-                f"✅ Английское слово: {english_word}\n"
-                f"📝 Теперь введите русский перевод:",
-                reply_markup=create_cancel_keyboard()
-            )
-            bot.set_state(message.from_user.id, BotStates.waiting_russian_word, message.chat.id)
-            # Сохраняем во временном хранилище
-            if not hasattr(bot, '_temp_data'):
-                bot._temp_data = {}
-            bot._temp_data[message.from_user.id] = {'english_word': english_word}
-            return
+        # Сохраняем слово в данных сессии до ввода перевода
+        bot.set_state(message.from_user.id, BotStates.waiting_russian_word, message.chat.id)
+        with bot.retrieve_data(message.from_user.id, message.chat.id) as data:
+            data['english_word'] = english_word
 
         bot.send_message(
             message.chat.id,
@@ -118,7 +226,6 @@ def register_handlers(bot):
             f"📝 Теперь введите русский перевод:",
             reply_markup=create_cancel_keyboard()
         )
-        bot.set_state(message.from_user.id, BotStates.waiting_russian_word, message.chat.id)
 
     @bot.message_handler(state=BotStates.waiting_russian_word)
     def process_russian_word(message):
@@ -131,18 +238,10 @@ def register_handlers(bot):
 
         user_id = message.from_user.id
         russian_word = message.text.strip().title()
-        english_word = ""
 
         # Получаем английское слово
-        try:
-            with bot.retrieve_data(message.from_user.id, message.chat.id) as data:
-                if data:
-                    english_word = data.get('english_word', '')
-        except:
-            # Альтернативный способ
-            if hasattr(bot, '_temp_data') and user_id in bot._temp_data:
-                english_word = bot._temp_data[user_id].get('english_word', '')
-                del bot._temp_data[user_id]
+        with bot.retrieve_data(message.from_user.id, message.chat.id) as data:
+            english_word = data.get('english_word', '') if data else ''
 
         if not english_word:
             bot.send_message(message.chat.id, "❌ Ошибка: не найдено английское слово. Попробуйте снова.")
@@ -150,14 +249,14 @@ def register_handlers(bot):
             return
 
         # Добавляем слово в БД
-        success = WordManager.add_user_word(user_id, english_word, russian_word)
+        word = WordManager.add_user_word(user_id, english_word, russian_word)
 
-        if success:
+        if word:
             words_count = UserManager.get_user_words_count(user_id)
             bot.send_message(
                 message.chat.id,
                 f"🎉 Слово добавлено!\n"
-                f"🇬🇧 {english_word} - 🇷🇺 {russian_word}\n"
+                f"🇬🇧 {word['english_word']} - 🇷🇺 {word['russian_word']}\n"
                 f"📚 У вас теперь {words_count} слов для изучения"
             )
         else:
@@ -169,6 +268,58 @@ def register_handlers(bot):
         bot.delete_state(message.from_user.id, message.chat.id)
         start_new_game(message)
 
+    @bot.message_handler(state=BotStates.choosing_word_to_delete)
+    def process_delete_search(message):
+        """Обработчик поиска слова для удаления по началу слова
+
+        Кнопки команд сюда не доходят: их обработчики зарегистрированы раньше.
+        """
+        if message.text.lower() == 'отмена':
+            bot.delete_state(message.from_user.id, message.chat.id)
+            start_new_game(message)
+            return
+
+        # Под списком слов остаются кнопки вариантов последнего вопроса: их нажатие - ответ, а не поиск
+        options = []
+        with bot.retrieve_data(message.from_user.id, message.chat.id) as data:
+            if data:
+                options = data.get('all_options', [])
+        if any(option['english_word'] == message.text for option in options):
+            bot.set_state(message.from_user.id, BotStates.playing_game, message.chat.id)
+            handle_game_answer(message)
+            return
+
+        # Слова хранятся через str.title(), так же приводим и начало слова
+        send_delete_picker(message.chat.id, message.from_user.id, message.text.strip().title())
+
+    @bot.callback_query_handler(func=lambda call: call.data.startswith('delete_page_'))
+    def delete_page_callback(call):
+        """Обработчик листания списка слов для удаления"""
+        _, _, direction, word_id = call.data.split('_')
+        user_id = call.from_user.id
+
+        prefix = ''
+        try:
+            with bot.retrieve_data(user_id, call.message.chat.id) as data:
+                if data:
+                    prefix = data.get('delete_prefix', '')
+        except Exception:
+            pass
+
+        if direction == 'next':
+            page = WordManager.get_personal_words_page(user_id, prefix, after_id=int(word_id))
+        else:
+            page = WordManager.get_personal_words_page(user_id, prefix, before_id=int(word_id))
+
+        bot.answer_callback_query(call.id)
+        if not page['words']:
+            return
+        bot.edit_message_reply_markup(
+            call.message.chat.id,
+            call.message.message_id,
+            reply_markup=create_delete_words_keyboard(page)
+        )
+
     @bot.callback_query_handler(func=lambda call: call.data.startswith('delete_word_'))
     def delete_word_callback(call):
         """Обработчик удаления слова"""
@@ -189,68 +340,84 @@ def register_handlers(bot):
         else:
             bot.answer_callback_query(call.id, "❌ Ошибка удаления!")
 
-        # Возвращаемся к игре
-        start_new_game(call.message)
+        # Возвращаемся к игре (call.message отправлен ботом, поэтому пользователь - из call)
+        start_new_game(call.message, user_id)
 
     @bot.message_handler(func=lambda message: True, content_types=['text'])
     def handle_game_answer(message):
-        """Обработчик ответов в игре"""
+        """Обработчик ответов в игре (кнопкой или, в режиме /typing, текстом)"""
         user_id = message.from_user.id
 
         try:
-            # Безопасно получаем данные пользователя
+            # Данные игры читаются из хранилища состояний один раз
             correct_word = None
+            options = []
+            typed_answers = False
+            answered = False
+            verdict = word = None
+            # Индекс словаря читается до блокировки состояния; ошибка БД уходит
+            # в общий обработчик ниже и попадает в лог
+            index = WordManager.get_word_index(user_id)
             try:
                 with bot.retrieve_data(message.from_user.id, message.chat.id) as data:
                     if data:
                         correct_word = data.get('correct_word')
-            except:
-                pass
-
-            if not correct_word:
-                start_new_game(message)
+                        options = data.get('all_options', [])
+                        typed_answers = data.get('typed_answers', False)
+                        answered = data.get('answered', False)
+                    if correct_word:
+                        # Проверка ответа - чистая функция, в памяти
+                        verdict, word = check_answer(message.text, correct_word, index)
+                        if verdict in (EXACT, TYPO):
+                            # Вопрос закрыт: повторное нажатие верной кнопки не засчитывается еще раз
+                            del data['correct_word']
+                            data['answered'] = True
+            except Exception:
+                # Состояние недоступно - игра начнется заново
+                logger.exception(f"Ошибка чтения состояния игры пользователя {user_id}")
+
+            if verdict is None:
+                # Нет вопроса - начинаем новый; вопрос уже отвечен верно - повтор не засчитывается,
+                # но пользователь видит, что делать дальше
+                if answered:
+                    bot.send_message(message.chat.id, answered_text(), reply_markup=create_main_keyboard())
+                else:
+                    start_new_game(message)
                 return
 
-            # Проверяем ответ
-            if message.text == correct_word['english_word']:
-                # Правильный ответ
+            # Запоминаем ответ для интервального повторения
+            is_correct = verdict in (EXACT, TYPO)
+            ReviewManager.record_answer(user_id, correct_word['word_id'], is_correct)
+
+            if is_correct:
                 words_count = UserManager.get_user_words_count(user_id)
-                response = (
-                    f"{CORRECT_ANSWER}\n"
-                    f"🇷🇺 {correct_word['russian_word']} = 🇬🇧 {correct_word['english_word']}\n"
-                    f"📚 Изучаете слов: {words_count}"
-                )
-                keyboard = create_main_keyboard()
-                bot.send_message(message.chat.id, response, reply_markup=keyboard)
+                response = correct_text(verdict, correct_word, words_count)
+                bot.send_message(message.chat.id, response, reply_markup=create_main_keyboard())
+            elif typed_answers:
+                bot.send_message(message.chat.id, wrong_text(verdict, word, correct_word),
+                                 reply_markup=create_main_keyboard())
+            elif options:
+                bot.send_message(message.chat.id, wrong_text(verdict, word, correct_word),
+                                 reply_markup=create_game_keyboard(options))
             else:
-                # Неправильный ответ
-                response = (
-                    f"{WRONG_ANSWER}\n"
-                    f"Попробуйте угадать перевод слова: 🇷🇺 {correct_word['russian_word']}"
-                )
-                # Получаем варианты ответов
-                try:
-                    with bot.retrieve_data(message.from_user.id, message.chat.id) as data:
-                        options = data.get('all_options', []) if data else []
-                        if not options:
-                            start_new_game(message)
-                            return
-                        keyboard = create_game_keyboard(options)
-                        bot.send_message(message.chat.id, response, reply_markup=keyboard)
-                except:
-                    start_new_game(message)
+                start_new_game(message)
 
-        except Exception as e:
-            logger.error(f"Ошибка обработки ответа: {e}")
+        except Exception:
+            logger.exception("Ошибка обработки ответа")
             start_new_game(message)
 
 
-def start_new_game(message):
-    """Запуск новой игры"""
-    user_id = message.from_user.id
+@timed_function('start_new_game')
+def start_new_game(message, user_id=None):
+    """Запуск новой игры
 
-    # Получаем случайное слово с вариантами
-    game_data = WordManager.get_random_word_with_options(user_id)
+    user_id нужен, когда message - сообщение самого бота (например, из callback).
+    """
+    if user_id is None:
+        user_id = message.from_user.id
+
+    # Готовый вопрос из заготовок, иначе подбираем сейчас
+    game_data = WordManager.next_question(user_id)
 
     if not game_data:
         bot_instance.send_message(
@@ -262,76 +429,29 @@ def start_new_game(message):
         )
         return
 
-    # Безопасно сохраняем данные игры
+    # Сохраняем данные игры в хранилище состояний
+    typed_answers = False
     try:
         # Сначала создаем состояние пользователя если его нет
-        bot_instance.set_state(message.from_user.id, BotStates.playing_game, message.chat.id)
+        bot_instance.set_state(user_id, BotStates.playing_game, message.chat.id)
 
-        with bot_instance.retrieve_data(message.from_user.id, message.chat.id) as data:
-            if data is None:
-                data = {}
+        with bot_instance.retrieve_data(user_id, message.chat.id) as data:
+            # Режим ответа читается из БД один раз за сессию
+            typed_answers = data.get('typed_answers')
+            if typed_answers is None:
+                typed_answers = data['typed_answers'] = UserManager.get_typed_answers(user_id)
             data['correct_word'] = game_data['correct_word']
             data['all_options'] = game_data['all_options']
+            data.pop('answered', None)
     except Exception as e:
         logger.error(f"Ошибка сохранения игровых данных: {e}")
-        # Альтернативное хранение
-        if not hasattr(bot_instance, '_game_data'):
-            bot_instance._game_data = {}
-        bot_instance._game_data[user_id] = {
-            'correct_word': game_data['correct_word'],
-            'all_options': game_data['all_options']
-        }
 
-    # Создаем клавиатуру с вариантами ответов
-    keyboard = create_game_keyboard(game_data['all_options'])
+    # В режиме /typing вариантов нет - только кнопки команд
+    if typed_answers:
+        keyboard = create_main_keyboard()
+    else:
+        keyboard = create_game_keyboard(game_data['all_options'])
 
     # Отправляем вопрос
-    question = f"🎯 Выберите перевод слова:\n🇷🇺 {game_data['russian_word']}"
+    question = question_text(game_data['russian_word'], typed_answers)
     bot_instance.send_message(message.chat.id, question, reply_markup=keyboard)
-
-
-def create_main_keyboard():
-    """Создание основной клавиатуры"""
-    keyboard = types.ReplyKeyboardMarkup(resize_keyboard=True, row_width=1)
-    keyboard.add(
-        types.KeyboardButton(Command.NEXT),
-        types.KeyboardButton(Command.ADD_WORD),
-        types.KeyboardButton(Command.DELETE_WORD)
-    )
-    return keyboard
-
-
-def create_game_keyboard(options):
-    """Создание клавиатуры для игры"""
-    keyboard = types.ReplyKeyboardMarkup(resize_keyboard=True, row_width=2)
-
-    # Добавляем варианты ответов
-    option_buttons = [types.KeyboardButton(option['english_word']) for option in options]
-    keyboard.add(*option_buttons)
-
-    # Добавляем основные кнопки
-    keyboard.add(
-        types.KeyboardButton(Command.NEXT),
-        types.KeyboardButton(Command.ADD_WORD),
-        types.KeyboardButton(Command.DELETE_WORD)
-    )
-    return keyboard
-
-
-def create_cancel_keyboard():
-    """Создание клавиатуры с кнопкой отмены"""
-    keyboard = types.ReplyKeyboardMarkup(resize_keyboard=True, row_width=1)
-    keyboard.add(types.KeyboardButton('Отмена'))
-    return keyboard
-
-
-def create_delete_words_keyboard(words):
-    """Создание клавиатуры для удаления слов"""
-    keyboard = types.InlineKeyboardMarkup(row_width=1)
-
-    for word in words:
-        button_text = f"🗑 {word['english_word']} - {word['russian_word']}"
-        callback_data = f"delete_word_{word['word_id']}"
-        keyboard.add(types.InlineKeyboardButton(button_text, callback_data=callback_data))
-
-    return keyboard
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+Клавиатуры бота с готовой сериализацией
+
+telebot превращает reply_markup в JSON на каждом сообщении. Постоянные клавиатуры
+(основная и «Отмена») сериализуются здесь один раз при импорте, а игровая
+собирается склейкой строк из кэшированных JSON-фрагментов кнопок:
+4 слова + те же 3 кнопки команд.
+"""
+from functools import lru_cache
+import json
+
+from telebot import types
+
+from config import Command
+
+# Сколько JSON-фрагментов кнопок со словами держать в кэше
+BUTTON_CACHE_SIZE = 50000
+
+# Кнопок с вариантами ответа в строке игровой клавиатуры
+OPTIONS_ROW_WIDTH = 2
+
+
+class RenderedMarkup(types.JsonSerializable):
+    """Уже сериализованная клавиатура: telebot берет to_json() как есть"""
+
+    __slots__ = ('json',)
+
+    def __init__(self, json_text):
+        self.json = json_text
+
+    def to_json(self):
+        return self.json
+
+
+@lru_cache(maxsize=BUTTON_CACHE_SIZE)
+def _button(text):
+    """JSON-фрагмент кнопки KeyboardButton"""
+    return json.dumps({'text': text}, ensure_ascii=False, separators=(',', ':'))
+
+
+def _rows(buttons, row_width):
+    """Строки клавиатуры в том же порядке, что и ReplyKeyboardMarkup.add(..., row_width)"""
+    return [
+        '[' + ','.join(buttons[start:start + row_width]) + ']'
+        for start in range(0, len(buttons), row_width)
+    ]
+
+
+def _reply_keyboard(rows):
+    return '{"keyboard":[' + ','.join(rows) + '],"resize_keyboard":true}'
+
+
+_COMMAND_BUTTONS = [_button(Command.NEXT), _button(Command.ADD_WORD), _button(Command.DELETE_WORD)]
+
+# Кнопки команд под вариантами ответа (две в первой строке, как при row_width=2)
+_GAME_COMMAND_ROWS = ','.join(_rows(_COMMAND_BUTTONS, OPTIONS_ROW_WIDTH))
+
+MAIN_KEYBOARD = RenderedMarkup(_reply_keyboard(_rows(_COMMAND_BUTTONS, 1)))
+CANCEL_KEYBOARD = RenderedMarkup(_reply_keyboard(_rows([_button('Отмена')], 1)))
+
+
+def create_main_keyboard():
+    """Основная клавиатура (сериализована заранее)"""
+    return MAIN_KEYBOARD
+
+
+def create_game_keyboard(options):
+    """Клавиатура для игры: варианты ответов по два в строке + кнопки команд"""
+    option_rows = _rows([_button(option['english_word']) for option in options], OPTIONS_ROW_WIDTH)
+    return RenderedMarkup(_reply_keyboard(option_rows + [_GAME_COMMAND_ROWS]))
+
+
+def create_cancel_keyboard():
+    """Клавиатура с кнопкой отмены (сериализована заранее)"""
+    return CANCEL_KEYBOARD
+
+
+def create_delete_words_keyboard(page):
+    """Клавиатура страницы слов для удаления со стрелками листания
+
+    page - результат WordManager.get_personal_words_page. Стрелки несут word_id
+    крайнего слова страницы: по нему строится соседняя страница.
+    """
+    keyboard = types.InlineKeyboardMarkup(row_width=1)
+    words = page['words']
+
+    for word in words:
+        button_text = f"🗑 {word['english_word']} - {word['russian_word']}"
+        callback_data = f"delete_word_{word['word_id']}"
+        keyboard.add(types.InlineKeyboardButton(button_text, callback_data=callback_data))
+
+    navigation = []
+    if words and page['has_prev']:
+        navigation.append(types.InlineKeyboardButton(
+            '◀️ Назад', callback_data=f"delete_page_prev_{words[0]['word_id']}"
+        ))
+    if words and page['has_next']:
+        navigation.append(types.InlineKeyboardButton(
+            'Вперед ▶️', callback_data=f"delete_page_next_{words[-1]['word_id']}"
+        ))
+    if navigation:
+        keyboard.row(*navigation)
+
+    return keyboard
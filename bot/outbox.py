@@ -0,0 +1,374 @@
+"""
+Очередь исходящих сообщений с учетом лимитов Telegram
+
+Обработчики не ждут ответа Telegram: send_message, edit_message_* и прочие
+вызовы QueuedTeleBot кладутся в очередь и возвращают None, а отправляют их
+потоки-отправители Outbox. Сообщения распределяются по отправителям по chat_id,
+поэтому в один чат они уходят в том же порядке, в котором их поставили.
+
+Лимиты - два ведра токенов: общее (OUTBOX_GLOBAL_RATE сообщений в секунду на
+бота) и свое у каждого чата (OUTBOX_CHAT_RATE в секунду с запасом
+OUTBOX_CHAT_BURST). Чат, исчерпавший свой лимит, не задерживает отправителя:
+его сообщения откладываются по порядку, а остальные чаты того же отправителя
+уходят сразу. Ждать в потоке можно только общее ведро. На ответ 429 общее ведро
+ставится на паузу retry_after для всех отправителей, после нее вызов повторяется;
+после сетевой ошибки - только если соединение с Telegram не было установлено.
+Каждый поток держит свою keep-alive сессию requests (так устроен apihelper).
+
+Очереди ограничены: если отправители не успевают, submit ждет место до
+OUTBOX_PUT_TIMEOUT секунд, а потом сообщение отбрасывается. И то и другое
+видно в метриках outbox_*.
+"""
+from collections import OrderedDict, deque
+import heapq
+import itertools
+import queue
+import threading
+import time
+
+import requests
+import telebot
+from telebot.apihelper import ApiTelegramException
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from config import (
+    OUTBOX_WORKERS, OUTBOX_QUEUE_SIZE, OUTBOX_PUT_TIMEOUT, OUTBOX_GLOBAL_RATE,
+    OUTBOX_CHAT_RATE, OUTBOX_CHAT_BURST, OUTBOX_MAX_RETRIES
+)
+from metrics import registry
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Сколько ведер чатов помнит один отправитель
+CHAT_BUCKETS_PER_WORKER = 10000
+
+# Пауза перед повтором после сетевой ошибки (удваивается с каждой попыткой)
+RETRY_BACKOFF = 0.5
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity про запас"""
+
+    def __init__(self, rate, capacity):
+        self._lock = threading.Lock()
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()  # До этого момента (после pause - в будущем) токены не копятся
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self):
+        """Забрать токен; вернуть, сколько секунд подождать до отправки
+
+        Токены могут уйти в минус: очередной вызов ждет, пока долг не погасится,
+        поэтому параллельные отправители честно делят общий лимит.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            return max(0.0, self.updated - now + max(0.0, -self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Не выдавать токены seconds секунд (ответ 429), после паузы - не больше одного сразу"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, 1.0)
+            self.updated = max(self.updated, now + seconds)
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class _Job:
+    __slots__ = ('chat_id', 'function', 'args', 'kwargs', 'limited', 'done', 'queued_at')
+
+    def __init__(self, chat_id, function, args, kwargs, limited, done):
+        self.chat_id = chat_id
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.limited = limited
+        self.done = done
+        self.queued_at = time.perf_counter()
+
+
+class _ChatLimiter:
+    """Лимиты чатов одного отправителя
+
+    Сообщение чата, исчерпавшего лимит, откладывается в held (вместе со всеми
+    следующими сообщениями этого чата - порядок сохраняется), а срок его отправки
+    кладется в кучу delayed. Токен первого отложенного сообщения чата уже забран.
+    """
+
+    def __init__(self, rate, burst):
+        self._rate = rate
+        self._burst = burst
+        self._buckets = OrderedDict()
+        self._held = {}  # chat_id -> deque отложенных сообщений
+        self._delayed = []  # (когда можно отправить, номер, chat_id)
+        self._sequence = itertools.count()
+        self.held = 0
+
+    def _bucket(self, chat_id):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(self._rate, self._burst)
+            if len(self._buckets) > CHAT_BUCKETS_PER_WORKER:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(chat_id)
+        return bucket
+
+    def _delay(self, chat_id, wait):
+        heapq.heappush(self._delayed, (time.monotonic() + wait, next(self._sequence), chat_id))
+
+    def offer(self, job):
+        """Сообщение, если его можно отправить сразу, иначе None (оно отложено)"""
+        held = self._held.get(job.chat_id)
+        if held is not None:
+            held.append(job)
+            self.held += 1
+            return None
+        wait = self._bucket(job.chat_id).reserve()
+        if not wait:
+            return job
+        self._held[job.chat_id] = deque([job])
+        self.held += 1
+        self._delay(job.chat_id, wait)
+        return None
+
+    def next_at(self):
+        """Когда наступит срок ближайшего отложенного сообщения (None - отложенных нет)"""
+        return self._delayed[0][0] if self._delayed else None
+
+    def pop_ready(self):
+        """Отложенные сообщения, срок которых наступил"""
+        ready = []
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, chat_id = heapq.heappop(self._delayed)
+            held = self._held[chat_id]
+            ready.append(held.popleft())
+            while held:
+                wait = self._bucket(chat_id).reserve()
+                if wait:
+                    self._delay(chat_id, wait)
+                    break
+                ready.append(held.popleft())
+            else:
+                del self._held[chat_id]
+        self.held -= len(ready)
+        return ready
+
+
+def retry_after(error):
+    """Секунды из ответа 429 (parameters.retry_after) или None для других ошибок"""
+    if isinstance(error, ApiTelegramException) and error.error_code == 429:
+        parameters = (error.result_json or {}).get('parameters') or {}
+        return parameters.get('retry_after', 1)
+    return None
+
+
+def not_sent(error):
+    """Сетевая ошибка до отправки запроса (соединение не установлено) - повтор не продублирует сообщение
+
+    Другие ConnectionError (разрыв соединения, таймаут чтения ответа) могут случиться
+    уже после того, как Telegram принял запрос, поэтому такие вызовы не повторяются.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        reason = getattr(error.args[0], 'reason', error.args[0])  # requests оборачивает MaxRetryError urllib3
+        return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+    return False
+
+
+class Outbox:
+    """Пул потоков-отправителей с очередью на каждый поток"""
+
+    def __init__(self, workers=OUTBOX_WORKERS, queue_size=OUTBOX_QUEUE_SIZE, put_timeout=OUTBOX_PUT_TIMEOUT,
+                 global_rate=OUTBOX_GLOBAL_RATE, chat_rate=OUTBOX_CHAT_RATE, chat_burst=OUTBOX_CHAT_BURST,
+                 max_retries=OUTBOX_MAX_RETRIES, shared_bucket=None):
+        """shared_bucket - общее ведро другой очереди того же бота (global_bucket очереди ответов):
+        сообщения этой очереди тратят и его токены, а ответ 429 ставит на паузу оба ведра.
+        """
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self._put_timeout = put_timeout
+        self._global_bucket = TokenBucket(global_rate, global_rate)
+        self._shared_bucket = shared_bucket
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._max_retries = max_retries
+        self._limiters = [_ChatLimiter(chat_rate, chat_burst) for _ in range(workers)]
+        self._threads = []
+
+        registry.gauge_function('outbox_queue_depth', "Сообщений в очереди на отправку", self.depth)
+
+    def start(self):
+        for number, jobs in enumerate(self._queues):
+            thread = threading.Thread(
+                target=self._worker_loop, args=(jobs, self._limiters[number]), name=f'outbox-{number}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    @property
+    def global_bucket(self):
+        """Общее ведро очереди - его можно отдать другой очереди как shared_bucket"""
+        return self._global_bucket
+
+    def depth(self):
+        return sum(jobs.qsize() for jobs in self._queues) + sum(limiter.held for limiter in self._limiters)
+
+    def submit(self, chat_id, function, *args, limited=True, done=None, **kwargs):
+        """Поставить вызов function(*args, **kwargs) в очередь чата chat_id
+
+        limited=False - вызов не тратит токены (например, answerCallbackQuery:
+        это не сообщение, и Telegram ждет его быстро).
+        done(error) вызывается в потоке-отправителе после отправки (error=None)
+        или окончательной ошибки; для отброшенного вызова (submit вернул False) - нет.
+        """
+        jobs = self._queues[hash(chat_id) % len(self._queues)]
+        job = _Job(chat_id, function, args, kwargs, limited, done)
+        try:
+            jobs.put_nowait(job)
+            return True
+        except queue.Full:
+            registry.counter('outbox_backpressure_total', "Постановки в очередь, ждавшие свободного места").inc()
+        try:
+            jobs.put(job, timeout=self._put_timeout)
+            return True
+        except queue.Full:
+            registry.counter('outbox_dropped_total', "Сообщения, не поместившиеся в очередь").inc()
+            logger.warning(f"Очередь отправки переполнена, сообщение в чат {chat_id} отброшено")
+            return False
+
+    def close(self):
+        """Дождаться отправки всего, что уже в очереди, и остановить потоки"""
+        for jobs in self._queues:
+            jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _worker_loop(self, jobs, limiter):
+        # Чаты распределены по потокам, поэтому лимиты чатов у каждого потока свои
+        closing = False
+        while not closing or limiter.next_at() is not None:
+            next_at = limiter.next_at()
+            timeout = None if next_at is None else max(0.0, next_at - time.monotonic())
+            if closing:
+                time.sleep(timeout)  # Очередь закрыта - досылаем отложенные сообщения
+            else:
+                try:
+                    job = jobs.get(timeout=timeout)
+                except queue.Empty:
+                    job = False
+                if job is None:
+                    closing = True
+                elif job and not job.limited:
+                    self._deliver(job)
+                elif job:
+                    if limiter.offer(job) is None:
+                        registry.counter('outbox_throttled_total', "Отправки, придержанные лимитом").inc()
+                    else:
+                        self._deliver(job)
+            for ready in limiter.pop_ready():
+                self._deliver(ready)
+
+    def _deliver(self, job):
+        if job.limited and self._acquire_global():
+            registry.counter('outbox_throttled_total', "Отправки, придержанные лимитом").inc()
+        registry.histogram(
+            'outbox_wait_seconds', "Время от постановки в очередь до отправки"
+        ).observe(time.perf_counter() - job.queued_at)
+        self._send(job)
+
+    def _acquire_global(self):
+        waited = self._global_bucket.acquire()
+        if self._shared_bucket is not None:
+            waited += self._shared_bucket.acquire()
+        return waited
+
+    def _send(self, job):
+        error = None
+        for attempt in range(self._max_retries + 1):
+            if attempt:
+                registry.counter('outbox_retries_total', "Повторные попытки отправки").inc()
+            try:
+                job.function(*job.args, **job.kwargs)
+                registry.counter('outbox_sent_total', "Отправленные вызовы").inc()
+                self._finish(job, None)
+                return
+            except ApiTelegramException as e:
+                error = e
+                seconds = retry_after(e)
+                if seconds is None:
+                    break
+                registry.counter('outbox_rate_limited_total', "Ответы 429 от Telegram").inc()
+                logger.warning(f"Telegram просит подождать {seconds} с (чат {job.chat_id})")
+                # Лимит общий на бота: ждут все отправители, а не только получивший 429
+                self._global_bucket.pause(seconds)
+                if self._shared_bucket is not None:
+                    self._shared_bucket.pause(seconds)
+                self._acquire_global()
+            except requests.exceptions.ConnectionError as e:
+                error = e
+                if not not_sent(e):
+                    break  # Запрос мог дойти до Telegram - повтор продублировал бы сообщение
+                time.sleep(RETRY_BACKOFF * 2 ** attempt)
+            except Exception as e:
+                error = e
+                break
+        registry.counter('outbox_failed_total', "Вызовы, которые не удалось отправить").inc()
+        logger.error(f"Не удалось отправить в чат {job.chat_id}: {error}")
+        self._finish(job, error)
+
+    @staticmethod
+    def _finish(job, error):
+        if job.done is None:
+            return
+        try:
+            job.done(error)
+        except Exception as e:
+            logger.error(f"Ошибка обработчика завершения отправки: {e}")
+
+
+class QueuedTeleBot(telebot.TeleBot):
+    """TeleBot, у которого исходящие сообщения уходят через Outbox
+
+    Перехваченные методы возвращают None сразу после постановки в очередь:
+    если нужен ответ Telegram (например, message_id), вызывайте метод
+    напрямую через telebot.TeleBot.
+    """
+
+    def __init__(self, *args, outbox, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.outbox = outbox
+
+    def send_message(self, chat_id, text, *args, **kwargs):
+        self.outbox.submit(chat_id, super().send_message, chat_id, text, *args, **kwargs)
+
+    def send_document(self, chat_id, document, *args, **kwargs):
+        self.outbox.submit(chat_id, super().send_document, chat_id, document, *args, **kwargs)
+
+    def edit_message_text(self, text, chat_id=None, *args, **kwargs):
+        self.outbox.submit(chat_id, super().edit_message_text, text, chat_id, *args, **kwargs)
+
+    def edit_message_reply_markup(self, chat_id=None, *args, **kwargs):
+        self.outbox.submit(chat_id, super().edit_message_reply_markup, chat_id, *args, **kwargs)
+
+    def answer_callback_query(self, callback_query_id, *args, **kwargs):
+        self.outbox.submit(
+            callback_query_id, super().answer_callback_query, callback_query_id, *args, limited=False, **kwargs
+        )
@@ -0,0 +1,54 @@
+"""
+Тексты вопроса, ответов и настроек игры (общие для синхронных и асинхронных обработчиков)
+"""
+from config import Command, CORRECT_ANSWER, WRONG_ANSWER
+from database.matching import TYPO, OTHER_WORD
+
+
+def question_text(russian_word, typed_answers):
+    """Вопрос: выбрать вариант или (в режиме /typing) написать перевод"""
+    if typed_answers:
+        return f"✍️ Напишите перевод слова по-английски:\n🇷🇺 {russian_word}"
+    return f"🎯 Выберите перевод слова:\n🇷🇺 {russian_word}"
+
+
+def correct_text(verdict, correct_word, words_count):
+    """Ответ на верный ответ (в том числе с прощенной опечаткой)"""
+    lines = [
+        CORRECT_ANSWER,
+        f"🇷🇺 {correct_word['russian_word']} = 🇬🇧 {correct_word['english_word']}"
+    ]
+    if verdict == TYPO:
+        lines.append(f"✏️ Засчитано, но правильно пишется: {correct_word['english_word']}")
+    lines.append(f"📚 Изучаете слов: {words_count}")
+    return "\n".join(lines)
+
+
+def wrong_text(verdict, word, correct_word):
+    """Ответ на ошибку; word - слово, которое пользователь назвал вместо правильного"""
+    lines = [WRONG_ANSWER]
+    if verdict == OTHER_WORD:
+        lines.append(f"🇬🇧 {word['english_word']} - это 🇷🇺 {word['russian_word']}")
+    lines.append(f"Попробуйте угадать перевод слова: 🇷🇺 {correct_word['russian_word']}")
+    return "\n".join(lines)
+
+
+def answered_text():
+    """Ответ на сообщение после верного ответа, пока не начат новый вопрос"""
+    return f"✅ На этот вопрос вы уже ответили. Нажмите «{Command.NEXT}», чтобы продолжить."
+
+
+def mode_text(typed_answers):
+    """Сообщение о смене режима ответа"""
+    if typed_answers:
+        return "⌨️ Режим ввода: пишите перевод сами, мелкие опечатки прощаются. /typing - вернуть варианты."
+    return "🔘 Режим вариантов: выбирайте перевод на кнопках. /typing - писать ответ самому."
+
+
+def reminders_text(enabled):
+    """Ответ на /reminders; enabled=None - переключить не удалось"""
+    if enabled is None:
+        return "❌ Не удалось изменить напоминания. Попробуйте позже."
+    if enabled:
+        return "🔔 Напоминания включены: раз в день я напишу, сколько слов пора повторить."
+    return "🔕 Напоминания выключены. /reminders - включить снова."
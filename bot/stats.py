@@ -0,0 +1,29 @@
+"""
+Текст ответа на /stats (общий для синхронных и асинхронных обработчиков)
+"""
+
+
+def format_stats(result):
+    """Сообщение со статистикой из результата StatsManager.get_user_stats"""
+    if result is None:
+        return "❌ Не удалось получить статистику. Попробуйте позже."
+
+    stats = result['stats']
+    if not stats or not stats['answers_total']:
+        return "📊 Статистики пока нет - ответьте хотя бы на один вопрос!"
+
+    accuracy = stats['correct_total'] * 100 / stats['answers_total']
+    lines = [
+        "📊 Ваша статистика",
+        f"✍️ Ответов: {stats['answers_total']}, верных: {stats['correct_total']} ({accuracy:.0f}%)",
+        f"🔥 Серия: {stats['current_streak']}, лучшая: {stats['best_streak']}"
+    ]
+    if result['hardest']:
+        lines.append("")
+        lines.append("🧩 Самые трудные слова:")
+        for word in result['hardest']:
+            lines.append(
+                f"  {word['english_word']} - {word['russian_word']}: "
+                f"ошибок {word['mistakes']} из {word['answers']}"
+            )
+    return "\n".join(lines)
@@ -0,0 +1,404 @@
+"""
+Хранилища состояний диалогов для TeleBot
+
+Вместо StateMemoryStorage (все в памяти, теряется при перезапуске) состояние
+хранится в Postgres или в файле SQLite, поэтому его видят все процессы бота.
+Изменения копятся в памяти и записываются пачками в фоновом потоке,
+брошенные сессии удаляются по истечении STATE_TTL.
+"""
+from collections import OrderedDict
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+
+from psycopg2.extras import execute_values
+from telebot import asyncio_storage
+from telebot.storage import StateStorageBase, StateContext, StateMemoryStorage, StateRedisStorage
+
+from config import (
+    STATE_STORAGE, STATE_SQLITE_PATH, STATE_REDIS_URL, STATE_TTL,
+    STATE_FLUSH_INTERVAL, STATE_FLUSH_BATCH_SIZE, STATE_CACHE_SIZE,
+    STATE_CACHE_TTL, STATE_PURGE_INTERVAL
+)
+from database.db_config import Database
+from database import queries
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Ключи строки слова, которые упаковываются в компактный список
+_WORD_KEYS = ('word_id', 'english_word', 'russian_word', 'is_default')
+_WORD_MARKER = '~w'
+
+
+def _pack_value(value):
+    if isinstance(value, dict):
+        if set(value.keys()) == set(_WORD_KEYS):
+            return {_WORD_MARKER: [value[key] for key in _WORD_KEYS]}
+        return {key: _pack_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_pack_value(item) for item in value]
+    return value
+
+
+def _unpack_value(value):
+    if isinstance(value, dict):
+        if len(value) == 1 and _WORD_MARKER in value:
+            return dict(zip(_WORD_KEYS, value[_WORD_MARKER]))
+        return {key: _unpack_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_unpack_value(item) for item in value]
+    return value
+
+
+def pack_data(data):
+    """Сериализовать данные сессии в компактный JSON (слова - списком значений)"""
+    return json.dumps(_pack_value(data or {}), ensure_ascii=False, separators=(',', ':'))
+
+
+def unpack_data(text):
+    """Восстановить данные сессии из pack_data"""
+    return _unpack_value(json.loads(text)) if text else {}
+
+
+class BufferedStateStorage(StateStorageBase):
+    """Основа хранилищ: локальный LRU-кэш сессий + пакетная запись в фоне
+
+    Подклассы реализуют _load, _write, _delete и _purge для своего бэкенда.
+    Локальной копии сессии доверяем STATE_CACHE_TTL секунд, а изменения пишем
+    с задержкой до STATE_FLUSH_INTERVAL: это верно, только пока сообщения одного
+    чата обрабатывает один процесс (так делает ChatDispatcher в webhook-режиме).
+    Иначе процессы видят устаревшие сессии - тогда нужен 'redis' (без кэша).
+    """
+
+    def __init__(self, ttl=STATE_TTL, flush_interval=STATE_FLUSH_INTERVAL,
+                 batch_size=STATE_FLUSH_BATCH_SIZE, cache_size=STATE_CACHE_SIZE,
+                 cache_ttl=STATE_CACHE_TTL, purge_interval=STATE_PURGE_INTERVAL):
+        super().__init__()
+        self.ttl = ttl
+        self._batch_size = batch_size
+        self._cache_size = cache_size
+        self._cache_ttl = cache_ttl
+        self._purge_interval = purge_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._cache = OrderedDict()  # (chat_id, user_id) -> (запись или None, момент устаревания)
+        self._dirty = {}  # (chat_id, user_id) -> запись или None (удалить)
+        self._flushing = {}  # Изменения, которые прямо сейчас записываются
+        self._last_purge = time.monotonic()
+        self._stop = threading.Event()
+        self._flush_interval = flush_interval
+        self._thread = threading.Thread(target=self._flush_loop, name='state-storage-flush', daemon=True)
+        self._thread.start()
+
+    # --- Интерфейс StateStorageBase ---
+
+    def set_state(self, chat_id, user_id, state):
+        if hasattr(state, 'name'):
+            state = state.name
+        record = self._get_record(chat_id, user_id)
+        if record is None:
+            record = {'state': state, 'data': {}}
+        else:
+            record = {'state': state, 'data': record['data']}
+        self._put(chat_id, user_id, record)
+        return True
+
+    def delete_state(self, chat_id, user_id):
+        if self._get_record(chat_id, user_id) is None:
+            return False
+        self._put(chat_id, user_id, None)
+        return True
+
+    def get_state(self, chat_id, user_id):
+        record = self._get_record(chat_id, user_id)
+        return record['state'] if record else None
+
+    def get_data(self, chat_id, user_id):
+        record = self._get_record(chat_id, user_id)
+        return record['data'] if record else None
+
+    def reset_data(self, chat_id, user_id):
+        record = self._get_record(chat_id, user_id)
+        if record is None:
+            return False
+        self._put(chat_id, user_id, {'state': record['state'], 'data': {}})
+        return True
+
+    def set_data(self, chat_id, user_id, key, value):
+        record = self._get_record(chat_id, user_id)
+        if record is None:
+            raise RuntimeError('chat_id {} and user_id {} does not exist'.format(chat_id, user_id))
+        data = dict(record['data'])
+        data[key] = value
+        self._put(chat_id, user_id, {'state': record['state'], 'data': data})
+        return True
+
+    def get_interactive_data(self, chat_id, user_id):
+        return StateContext(self, chat_id, user_id)
+
+    def save(self, chat_id, user_id, data):
+        record = self._get_record(chat_id, user_id)
+        if record is None:
+            raise RuntimeError('chat_id {} and user_id {} does not exist'.format(chat_id, user_id))
+        self._put(chat_id, user_id, {'state': record['state'], 'data': data or {}})
+
+    # --- Управление ---
+
+    def flush(self):
+        """Записать накопленные изменения в бэкенд"""
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+                self._flushing = dirty
+            if not dirty:
+                return
+            writes = [(key, record) for key, record in dirty.items() if record is not None]
+            deletes = [key for key, record in dirty.items() if record is None]
+            try:
+                if writes:
+                    self._write([
+                        (chat_id, user_id, record['state'], pack_data(record['data']))
+                        for (chat_id, user_id), record in writes
+                    ])
+                if deletes:
+                    self._delete(deletes)
+            except Exception as e:
+                logger.error(f"Ошибка записи состояний: {e}")
+                # Возвращаем изменения в буфер, если их не перекрыли более новые
+                with self._lock:
+                    for key, record in dirty.items():
+                        self._dirty.setdefault(key, record)
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+    def purge_expired(self):
+        """Удалить из бэкенда сессии, брошенные дольше STATE_TTL"""
+        try:
+            self._purge(self.ttl)
+        except Exception as e:
+            logger.error(f"Ошибка удаления устаревших состояний: {e}")
+
+    def close(self):
+        """Остановить фоновую запись и сбросить буфер"""
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+
+    # --- Внутреннее ---
+
+    def _get_record(self, chat_id, user_id):
+        key = (chat_id, user_id)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._dirty:
+                return self._dirty[key]
+            if key in self._flushing:
+                return self._flushing[key]
+            entry = self._cache.get(key)
+            if entry is not None and now < entry[1]:
+                self._cache.move_to_end(key)
+                return entry[0]
+
+        try:
+            loaded = self._load(chat_id, user_id, self.ttl)
+        except Exception as e:
+            logger.error(f"Ошибка чтения состояния: {e}")
+            return None
+        record = None
+        if loaded is not None:
+            state, text = loaded
+            record = {'state': state, 'data': unpack_data(text)}
+
+        with self._lock:
+            if key in self._dirty:  # Пока читали, сессию успели изменить
+                return self._dirty[key]
+            self._remember(key, record, now)
+        return record
+
+    def _put(self, chat_id, user_id, record):
+        key = (chat_id, user_id)
+        with self._lock:
+            self._dirty[key] = record
+            self._remember(key, record, time.monotonic())
+            overflow = len(self._dirty) >= self._batch_size
+        if overflow:
+            self.flush()
+
+    def _remember(self, key, record, now):
+        self._cache[key] = (record, now + self._cache_ttl)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self._flush_interval):
+            self.flush()
+            if time.monotonic() - self._last_purge >= self._purge_interval:
+                self._last_purge = time.monotonic()
+                self.purge_expired()
+
+    def _load(self, chat_id, user_id, ttl):
+        """Вернуть (state, упакованные данные) или None"""
+        raise NotImplementedError
+
+    def _write(self, rows):
+        """Записать строки (chat_id, user_id, state, упакованные данные)"""
+        raise NotImplementedError
+
+    def _delete(self, keys):
+        """Удалить сессии по ключам (chat_id, user_id)"""
+        raise NotImplementedError
+
+    def _purge(self, ttl):
+        raise NotImplementedError
+
+
+class StatePostgresStorage(BufferedStateStorage):
+    """Состояния в таблице bot_states основной БД - общие для всех процессов и хостов"""
+
+    def _load(self, chat_id, user_id, ttl):
+        with Database() as db:
+            db.cursor.execute(queries.SELECT_BOT_STATE, (chat_id, user_id, ttl))
+            row = db.cursor.fetchone()
+        return (row['state'], row['data']) if row else None
+
+    def _write(self, rows):
+        with Database() as db:
+            execute_values(db.cursor, queries.UPSERT_BOT_STATES, rows)
+
+    def _delete(self, keys):
+        with Database() as db:
+            execute_values(db.cursor, queries.DELETE_BOT_STATES, keys)
+
+    def _purge(self, ttl):
+        with Database() as db:
+            db.cursor.execute(queries.PURGE_BOT_STATES, (ttl,))
+            if db.cursor.rowcount:
+                logger.info(f"Удалено брошенных сессий: {db.cursor.rowcount}")
+
+
+class StateSQLiteStorage(BufferedStateStorage):
+    """Состояния в файле SQLite - локальная замена Redis для процессов на одном хосте"""
+
+    def __init__(self, path=STATE_SQLITE_PATH, **kwargs):
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")  # Параллельное чтение из нескольких процессов
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS bot_states (
+                chat_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                state TEXT,
+                data TEXT NOT NULL DEFAULT '{}',
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (chat_id, user_id)
+            )
+        """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bot_states_updated_at ON bot_states(updated_at)"
+        )
+        self._connection.commit()
+        self._db_lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def _load(self, chat_id, user_id, ttl):
+        with self._db_lock:
+            row = self._connection.execute(
+                "SELECT state, data FROM bot_states "
+                "WHERE chat_id = ? AND user_id = ? AND updated_at > ?",
+                (chat_id, user_id, time.time() - ttl)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _write(self, rows):
+        now = time.time()
+        with self._db_lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO bot_states (chat_id, user_id, state, data, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (chat_id, user_id) DO UPDATE SET "
+                "state = excluded.state, data = excluded.data, updated_at = excluded.updated_at",
+                [row + (now,) for row in rows]
+            )
+
+    def _delete(self, keys):
+        with self._db_lock, self._connection:
+            self._connection.executemany(
+                "DELETE FROM bot_states WHERE chat_id = ? AND user_id = ?", keys
+            )
+
+    def _purge(self, ttl):
+        with self._db_lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM bot_states WHERE updated_at <= ?", (time.time() - ttl,)
+            )
+        if cursor.rowcount:
+            logger.info(f"Удалено брошенных сессий: {cursor.rowcount}")
+
+    def close(self):
+        super().close()
+        self._connection.close()
+
+
+class AsyncStateStorage(asyncio_storage.StateStorageBase):
+    """Обертка над синхронным хранилищем для AsyncTeleBot
+
+    Обращения к бэкенду выполняются в пуле потоков и не блокируют event loop.
+    """
+
+    def __init__(self, storage):
+        super().__init__()
+        self.storage = storage
+
+    async def set_state(self, chat_id, user_id, state):
+        return await asyncio.to_thread(self.storage.set_state, chat_id, user_id, state)
+
+    async def delete_state(self, chat_id, user_id):
+        return await asyncio.to_thread(self.storage.delete_state, chat_id, user_id)
+
+    async def get_state(self, chat_id, user_id):
+        return await asyncio.to_thread(self.storage.get_state, chat_id, user_id)
+
+    async def get_data(self, chat_id, user_id):
+        return await asyncio.to_thread(self.storage.get_data, chat_id, user_id)
+
+    async def reset_data(self, chat_id, user_id):
+        return await asyncio.to_thread(self.storage.reset_data, chat_id, user_id)
+
+    async def set_data(self, chat_id, user_id, key, value):
+        return await asyncio.to_thread(self.storage.set_data, chat_id, user_id, key, value)
+
+    def get_interactive_data(self, chat_id, user_id):
+        return asyncio_storage.StateContext(self, chat_id, user_id)
+
+    async def save(self, chat_id, user_id, data):
+        return await asyncio.to_thread(self.storage.save, chat_id, user_id, data)
+
+    def close(self):
+        if hasattr(self.storage, 'close'):
+            self.storage.close()
+
+
+def create_state_storage(backend=STATE_STORAGE):
+    """Создать хранилище состояний по настройке STATE_STORAGE"""
+    if backend == 'postgres':
+        return StatePostgresStorage()
+    if backend == 'sqlite':
+        return StateSQLiteStorage()
+    if backend == 'redis':
+        return StateRedisStorage(redis_url=STATE_REDIS_URL)
+    if backend == 'memory':
+        return StateMemoryStorage()
+    raise ValueError(f"Неизвестное хранилище состояний: {backend}")
+
+
+def create_async_state_storage(backend=STATE_STORAGE):
+    """Создать хранилище состояний для AsyncTeleBot"""
+    if backend == 'redis':
+        return asyncio_storage.StateRedisStorage(redis_url=STATE_REDIS_URL)
+    if backend == 'memory':
+        return asyncio_storage.StateMemoryStorage()
+    return AsyncStateStorage(create_state_storage(backend))
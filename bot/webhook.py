@@ -0,0 +1,177 @@
+"""
+Прием обновлений Telegram через webhook и параллельная обработка
+
+Обновления распределяются по воркерам (потокам или процессам) по chat_id:
+все сообщения одного чата попадают в одну очередь и обрабатываются по порядку,
+поэтому цепочки состояний BotStates не ломаются, а разные чаты идут параллельно.
+Для нескольких хостов перед серверами нужен балансировщик, который так же
+привязывает чат к хосту.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import multiprocessing
+import queue
+import threading
+
+from metrics import registry
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Заголовок с секретом, который Telegram передает при set_webhook(secret_token=...)
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+def chat_key(update):
+    """Ключ упорядочивания обновления: id чата, иначе id пользователя, иначе update_id"""
+    for field in ('message', 'edited_message', 'channel_post', 'edited_channel_post'):
+        if field in update:
+            return update[field]['chat']['id']
+    if 'callback_query' in update:
+        callback = update['callback_query']
+        if 'message' in callback:
+            return callback['message']['chat']['id']
+        return callback['from']['id']
+    for value in update.values():
+        if isinstance(value, dict) and 'from' in value:
+            return value['from']['id']
+    return update.get('update_id', 0)
+
+
+def _worker_loop(updates, handle):
+    """Обрабатывать обновления из очереди, пока не придет None"""
+    while True:
+        raw_update = updates.get()
+        if raw_update is None:
+            break
+        try:
+            handle(raw_update)
+        except Exception as e:
+            logger.error(f"Ошибка обработки обновления: {e}")
+
+
+def _close_handler(handle):
+    if hasattr(handle, 'close'):
+        handle.close()
+
+
+def _process_worker(updates, worker_factory, number):
+    """Точка входа процесса-воркера: свой бот, свои подключения"""
+    handle = worker_factory(number)
+    try:
+        _worker_loop(updates, handle)
+    finally:
+        _close_handler(handle)
+
+
+class ChatDispatcher:
+    """Очереди воркеров с разбиением обновлений по chat_id
+
+    worker_factory - функция (или класс) верхнего уровня, возвращающая handle(raw_update);
+    если у обработчика есть close(), он вызывается при остановке.
+    В режиме 'threads' фабрика вызывается один раз без аргументов и обработчик общий
+    для потоков, в режиме 'processes' - в каждом процессе с номером воркера
+    worker_factory(number) (поэтому должна сериализоваться pickle).
+    """
+
+    def __init__(self, worker_factory, workers, queue_size, mode='threads'):
+        if mode not in ('threads', 'processes'):
+            raise ValueError(f"Неизвестный режим воркеров: {mode}")
+        self._worker_factory = worker_factory
+        self._mode = mode
+        if mode == 'processes':
+            self._queues = [multiprocessing.Queue(queue_size) for _ in range(workers)]
+        else:
+            self._queues = [queue.Queue(queue_size) for _ in range(workers)]
+        self._workers = []
+        self._handle = None
+
+    def start(self):
+        if self._mode == 'processes':
+            for number, updates in enumerate(self._queues):
+                worker = multiprocessing.Process(
+                    target=_process_worker,
+                    args=(updates, self._worker_factory, number),
+                    name=f'webhook-worker-{number}',
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+        else:
+            self._handle = self._worker_factory()
+            for number, updates in enumerate(self._queues):
+                worker = threading.Thread(
+                    target=_worker_loop,
+                    args=(updates, self._handle),
+                    name=f'webhook-worker-{number}',
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+        logger.info(f"Запущено воркеров webhook: {len(self._workers)} ({self._mode})")
+
+    def submit(self, raw_update, key):
+        """Поставить обновление в очередь воркера; False, если очередь переполнена"""
+        updates = self._queues[hash(key) % len(self._queues)]
+        try:
+            updates.put_nowait(raw_update)
+            return True
+        except queue.Full:
+            return False
+
+    def stop(self):
+        """Дождаться обработки очередей и остановить воркеры"""
+        for updates in self._queues:
+            updates.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        if self._handle is not None:
+            _close_handler(self._handle)
+            self._handle = None
+
+
+def create_webhook_server(dispatcher, host, port, path, secret=None):
+    """HTTP-сервер, принимающий POST с JSON обновления Telegram"""
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+
+        def do_POST(self):
+            if self.path != path:
+                self._reply(404)
+                return
+            if secret and self.headers.get(SECRET_HEADER) != secret:
+                self._reply(403)
+                return
+
+            length = int(self.headers.get('Content-Length', 0))
+            raw_update = self.rfile.read(length).decode('utf-8')
+            try:
+                key = chat_key(json.loads(raw_update))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                self._reply(400)
+                return
+
+            # 503 заставит Telegram повторить доставку позже
+            self._reply(200 if dispatcher.submit(raw_update, key) else 503)
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            self._reply(200 if self.path == '/healthz' else 404)
+
+        def _reply(self, status):
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return ThreadingHTTPServer((host, port), WebhookHandler)
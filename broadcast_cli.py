@@ -0,0 +1,63 @@
+"""
+Ежедневные напоминания о словах к повторению (см. bot/broadcast.py)
+
+Примеры:
+    python broadcast_cli.py run                   # разослать за сегодня или продолжить прерванную рассылку
+    python broadcast_cli.py run --date 2026-10-17
+    python broadcast_cli.py daemon                # рассылать каждый день в BROADCAST_HOUR
+    python broadcast_cli.py status                # последние рассылки и их контрольные точки
+
+Запускайте один экземпляр: два процесса разошлют одни и те же пачки дважды.
+Лимит отправки этого процесса не общий с ответами бота (см. BROADCAST_RATE);
+общий лимит - при рассылке из процесса бота: python main.py --reminders.
+"""
+import argparse
+from datetime import date
+
+from config import BOT_TOKEN, BROADCAST_RATE
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Напоминания EnglishCard")
+    parser.add_argument('action', choices=['run', 'daemon', 'status'])
+    parser.add_argument('--date', type=date.fromisoformat, default=None,
+                        help="за какой день рассылать (ГГГГ-ММ-ДД, по умолчанию - сегодня)")
+    args = parser.parse_args()
+
+    from database.broadcasts import recent_broadcasts
+    from database.db_config import close_pool
+
+    outbox = None
+    try:
+        if args.action == 'status':
+            for row in recent_broadcasts():
+                state = '✅' if row['finished_at'] else '⏳'
+                print(
+                    f"{state} {row['run_date']} {row['kind']}: отправлено {row['sent']}, "
+                    f"ошибок {row['failed']}, контрольная точка {row['last_user_id']}"
+                )
+            return
+
+        import telebot
+        from bot.broadcast import Broadcaster
+        from bot.outbox import Outbox
+
+        outbox = Outbox(global_rate=BROADCAST_RATE)
+        outbox.start()
+        broadcaster = Broadcaster(telebot.TeleBot(BOT_TOKEN, threaded=False), outbox)
+        if args.action == 'daemon':
+            broadcaster.run_forever()
+        else:
+            result = broadcaster.run(args.date)
+            print(f"✅ Отправлено: {result['sent']}, ошибок: {result['failed']}")
+    finally:
+        if outbox is not None:
+            outbox.close()
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,111 @@ DATABASE_CONFIG = {
     'port': 5432
 }
 
+# Реплики только для чтения (те же ключи, что у DATABASE_CONFIG); пустой список - все на основной БД
+DATABASE_REPLICAS = [
+    # {'host': 'replica1', 'database': 'englishcard_bot', 'user': 'postgres', 'password': '...', 'port': 5432},
+]
+DB_REPLICA_STICKY_SECONDS = 5  # Сколько секунд после записи читать данные пользователя с основной БД
+
+# Настройки пула подключений к базе данных
+DB_POOL_MIN_SIZE = 1         # Сколько соединений держать открытыми всегда
+DB_POOL_MAX_SIZE = 10        # Максимум одновременных соединений процесса
+DB_POOL_TIMEOUT = 30         # Сколько секунд ждать свободное соединение
+DB_POOL_PING_INTERVAL = 60   # После скольких секунд простоя проверять соединение через SELECT 1
+DB_PREPARED_STATEMENTS = True  # Частые запросы через PREPARE/EXECUTE (выключить за pgbouncer в режиме transaction)
+
+# Регистрация пользователей (см. database/registration.py)
+USER_FLUSH_INTERVAL = 2.0         # Как часто (в секундах) записывать новых пользователей
+USER_FLUSH_BATCH_SIZE = 500       # Записать сразу, если накопилось столько пользователей
+USER_SEEN_CACHE_SIZE = 100000     # Сколько уже записанных пользователей помнить в памяти
+
+# Журнал ответов и /stats (см. database/answers.py)
+ANSWER_FLUSH_INTERVAL = 5.0       # Как часто (в секундах) записывать накопленные ответы
+ANSWER_FLUSH_BATCH_SIZE = 1000    # Записать сразу, если накопилось столько ответов
+ANSWER_MAX_PENDING = 100000       # Больше ответов в памяти не держать (при недоступной БД)
+STATS_HARDEST_WORDS = 5           # Сколько самых трудных слов показывать в /stats
+
+# Заготовка вопросов для активных пользователей (см. database/prefetch.py)
+PREFETCH_ENABLED = True
+PREFETCH_DEPTH = 2                # Сколько готовых вопросов держать на пользователя
+PREFETCH_WORKERS = 2              # Фоновых потоков, готовящих вопросы
+PREFETCH_MAX_USERS = 10000        # Для скольких последних пользователей держать заготовки
+
+# Настройки кэша словаря
+VOCAB_CACHE_DEFAULT_TTL = 3600   # Сколько секунд хранить общие слова
+VOCAB_CACHE_USER_TTL = 600       # Сколько секунд хранить персональные слова пользователя
+VOCAB_CACHE_MAX_USERS = 10000    # Сколько пользователей держать в кэше (вытеснение LRU)
+
+# Похожие слова для неправильных вариантов ответа (см. database/neighbours.py)
+NEIGHBOURS_TOP_K = 10             # Сколько похожих слов хранить на каждое слово
+NEIGHBOURS_BLOCK_SIZE = 32        # Сколько слов сравнивать со всем словарем за раз (память ~ 64 байта * словарь * блок)
+NEIGHBOURS_CACHE_SIZE = 50000     # Для скольких слов держать списки соседей в памяти процесса
+NEIGHBOURS_CACHE_TTL = 3600       # Сколько секунд доверять закэшированному списку
+
+# Настройки интервального повторения (упрощенный SM-2)
+REVIEW_INITIAL_EASE = 2.5          # Начальный коэффициент легкости слова
+REVIEW_MIN_EASE = 1.3              # Ниже этого коэффициент не опускается
+REVIEW_EASE_BONUS = 0.1            # Прибавка к коэффициенту за верный ответ
+REVIEW_EASE_PENALTY = 0.2          # Штраф к коэффициенту за ошибку
+REVIEW_FIRST_INTERVAL_DAYS = 1     # Через сколько дней повторить после первого верного ответа
+REVIEW_SECOND_INTERVAL_DAYS = 6    # ... после второго подряд
+REVIEW_RELEARN_MINUTES = 10        # Через сколько минут вернуть слово после ошибки
+
+# Хранилище состояний диалогов
+STATE_STORAGE = 'postgres'            # 'postgres', 'sqlite', 'redis' или 'memory'
+STATE_SQLITE_PATH = 'bot_states.sqlite3'
+STATE_REDIS_URL = 'redis://localhost:6379/0'
+STATE_TTL = 24 * 60 * 60              # Через сколько секунд бездействия сессия считается брошенной
+STATE_FLUSH_INTERVAL = 1.0            # Как часто (в секундах) записывать накопленные изменения
+STATE_FLUSH_BATCH_SIZE = 500          # Записать сразу, если накопилось столько изменений
+STATE_CACHE_SIZE = 10000              # Сколько сессий держать в памяти процесса
+STATE_CACHE_TTL = 30                  # Сколько секунд доверять локальной копии сессии
+# Локальная копия и отложенная запись ('postgres', 'sqlite') верны, только пока сообщения
+# чата обрабатывает один процесс: так и есть в main.py, async_main.py и webhook_main.py
+# (ChatDispatcher делит чаты по процессам). Если обновления одного чата попадают в разные
+# процессы (несколько серверов за балансировщиком), выберите 'redis' - он без локальной копии
+STATE_PURGE_INTERVAL = 10 * 60        # Как часто удалять брошенные сессии из хранилища
+
+# Режим webhook (webhook_main.py)
+WEBHOOK_URL = ''                      # Публичный адрес сервера, например 'https://bot.example.com'
+WEBHOOK_PATH = '/webhook'             # Путь, на который Telegram присылает обновления
+WEBHOOK_SECRET = ''                   # Секрет для заголовка X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_HOST = '0.0.0.0'
+WEBHOOK_PORT = 8443
+WEBHOOK_MODE = 'threads'              # 'threads' или 'processes'
+WEBHOOK_WORKERS = 8                   # Сколько воркеров обрабатывают обновления параллельно
+WEBHOOK_QUEUE_SIZE = 1000             # Размер очереди воркера; при переполнении отвечаем 503
+
+# Метрики (см. metrics.py)
+METRICS_ENABLED = True
+METRICS_HOST = '127.0.0.1'            # Эндпоинт /metrics только для локального сборщика
+METRICS_PORT = 9108                   # 0 - без HTTP-эндпоинта, только сводка в лог
+METRICS_LOG_INTERVAL = 300            # Как часто (в секундах) писать сводку p50/p99 в лог; 0 - никогда
+
+# Очередь исходящих сообщений (см. bot/outbox.py)
+OUTBOX_ENABLED = True
+OUTBOX_WORKERS = 8                    # Потоков-отправителей, у каждого своя keep-alive сессия
+OUTBOX_QUEUE_SIZE = 1000              # Размер очереди одного отправителя
+OUTBOX_PUT_TIMEOUT = 5.0              # Сколько секунд обработчик ждет места в полной очереди
+OUTBOX_GLOBAL_RATE = 30               # Сообщений в секунду на весь бот (лимит Telegram)
+OUTBOX_CHAT_RATE = 1.0                # Сообщений в секунду в один чат
+OUTBOX_CHAT_BURST = 3                 # Сколько сообщений подряд в чат можно без ожидания
+OUTBOX_MAX_RETRIES = 3                # Повторов после 429 или ошибки соединения до отправки запроса
+
+# Ежедневные напоминания о словах к повторению (broadcast_cli.py, см. bot/broadcast.py)
+BROADCAST_HOUR = 18                   # В котором часу (время сервера) рассылать напоминания
+BROADCAST_MIN_DUE = 1                 # Напоминать, если к повторению хотя бы столько слов
+BROADCAST_CHUNK_SIZE = 500            # Пользователей в пачке; после каждой пачки - контрольная точка
+BROADCAST_SEGMENT_SECONDS = 300       # Сколько секунд держать серверный курсор (и транзакцию) открытым
+BROADCAST_RATE = 10                   # Сообщений в секунду; с main.py --reminders еще и в общем лимите OUTBOX_GLOBAL_RATE
+BROADCAST_RETRY_DELAY = 60            # Через сколько секунд продолжить рассылку после ошибки
+
+# Выбор слова для удаления
+DELETE_PAGE_SIZE = 8                  # Слов на одной странице списка
+
+# Импорт словаря из файла (/import)
+IMPORT_MAX_FILE_SIZE = 20 * 1024 * 1024  # Больше Telegram не дает скачать боту
+
 # Команды бота (текст на кнопках)
 class Command:
     ADD_WORD = 'Добавить слово ➕'
@@ -30,6 +135,10 @@ WELCOME_MESSAGE = """🇬🇧 Привет! Давай изучать англи
 - Добавить слово ➕ - добавить свое слово
 - Удалить слово 🔙 - убрать слово из своего словаря  
 - Дальше ⏭ - перейти к следующему слову
+- /import и /export - загрузить слова из CSV-файла или выгрузить свой словарь
+- /stats - точность ответов, серии и самые трудные слова
+- /typing - писать перевод самому вместо выбора из вариантов (и обратно)
+- /reminders - включить или выключить ежедневные напоминания
 
 Готов начать? Жми Дальше! ⬇️"""
 
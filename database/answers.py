@@ -0,0 +1,173 @@
+"""
+Журнал ответов и агрегаты для /stats
+
+Ответ в игре не пишется в БД сразу: record кладет его в буфер в памяти,
+а фоновый поток раз в ANSWER_FLUSH_INTERVAL секунд (или при ANSWER_FLUSH_BATCH_SIZE
+ответах) одной транзакцией дописывает пачку в answers и обновляет итоги
+user_stats и user_word_stats. Поэтому /stats - чтение по первичному ключу,
+а в обработчике ответа журнал не добавляет ни одного запроса к БД.
+
+Буфер живет в памяти процесса: при аварийном завершении последние несколько
+секунд ответов теряются (close() при штатной остановке все дописывает).
+"""
+from datetime import datetime, timedelta
+import threading
+
+from psycopg2 import errors
+from psycopg2.extras import execute_values
+
+from config import ANSWER_FLUSH_INTERVAL, ANSWER_FLUSH_BATCH_SIZE, ANSWER_MAX_PENDING
+from database.db_config import Database
+from database import queries
+from database.routing import router
+from metrics import registry
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _month_start(moment):
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def aggregate_answers(answers):
+    """Итоги пачки ответов (user_id, word_id, correct, answered_at) в порядке поступления
+
+    Возвращает строки для UPDATE_USER_STATS и UPSERT_USER_WORD_STATS.
+    """
+    users = {}  # user_id -> [answers, correct, leading, trailing, best_run, last_answer_at]
+    words = {}  # (user_id, word_id) -> [answers, mistakes, last_answer_at]
+    for user_id, word_id, correct, answered_at in answers:
+        user = users.get(user_id)
+        if user is None:
+            user = users[user_id] = [0, 0, 0, 0, 0, answered_at]
+        if correct:
+            if user[2] == user[0]:
+                user[2] += 1  # Серия с начала пачки еще не прервана
+            user[3] += 1
+            user[4] = max(user[4], user[3])
+            user[1] += 1
+        else:
+            user[3] = 0
+        user[0] += 1
+        user[5] = max(user[5], answered_at)
+
+        word = words.get((user_id, word_id))
+        if word is None:
+            word = words[(user_id, word_id)] = [0, 0, answered_at]
+        word[0] += 1
+        word[1] += 0 if correct else 1
+        word[2] = max(word[2], answered_at)
+
+    user_rows = [(user_id, *totals) for user_id, totals in users.items()]
+    word_rows = [(user_id, word_id, *totals) for (user_id, word_id), totals in words.items()]
+    return user_rows, word_rows
+
+
+class AnswerLog:
+    """Буфер ответов с пакетной записью в фоне"""
+
+    def __init__(self, flush_interval=ANSWER_FLUSH_INTERVAL, batch_size=ANSWER_FLUSH_BATCH_SIZE,
+                 max_pending=ANSWER_MAX_PENDING):
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []  # (user_id, word_id, correct, answered_at)
+        self._flushing = []  # Пачка, которая прямо сейчас записывается
+        self._partitions = set()  # Месяцы, для которых секция answers уже есть
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record(self, user_id, word_id, correct):
+        """Запомнить ответ; в БД он попадет со следующей пачкой"""
+        with self._lock:
+            if len(self._pending) >= self._max_pending:
+                registry.counter('answers_dropped_total', "Ответы, не поместившиеся в буфер журнала").inc()
+                return
+            self._pending.append((user_id, word_id, correct, datetime.now()))
+            self._start_thread()
+            if len(self._pending) >= self._batch_size:
+                # Пишет фоновый поток: record вызывается и из event loop
+                self._wakeup.set()
+
+    def has_pending(self, user_id):
+        """Есть ли у пользователя ответы, еще не записанные в БД"""
+        with self._lock:
+            return any(answer[0] == user_id for answer in self._pending) or \
+                any(answer[0] == user_id for answer in self._flushing)
+
+    def ensure_flushed(self, user_id):
+        """Гарантировать, что все ответы пользователя уже учтены в статистике"""
+        if self.has_pending(user_id):
+            self.flush()
+
+    def flush(self):
+        """Записать накопленные ответы и обновить агрегаты одной транзакцией"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._flushing = batch
+            if not batch:
+                return
+            try:
+                self._ensure_partitions(batch)
+                user_rows, word_rows = aggregate_answers(batch)
+                with Database() as db:
+                    execute_values(db.cursor, queries.INSERT_ANSWERS, batch, page_size=len(batch))
+                    execute_values(db.cursor, queries.INSERT_USER_STATS_ROWS,
+                                   [(row[0],) for row in user_rows], page_size=len(user_rows))
+                    execute_values(db.cursor, queries.UPDATE_USER_STATS, user_rows, page_size=len(user_rows))
+                    execute_values(db.cursor, queries.UPSERT_USER_WORD_STATS, word_rows, page_size=len(word_rows))
+                # Свежие агрегаты есть только на основной БД - /stats читает оттуда
+                for row in user_rows:
+                    router.record_write(row[0])
+                logger.info(f"Ответов записано: {len(batch)}")
+            except Exception as e:
+                logger.error(f"Ошибка записи журнала ответов: {e}")
+                # Возвращаем пачку в начало буфера, чтобы не нарушить порядок серий
+                with self._lock:
+                    self._pending = (batch + self._pending)[-self._max_pending:]
+            finally:
+                with self._lock:
+                    self._flushing = []
+
+    def close(self):
+        """Остановить фоновую запись и сбросить буфер"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _ensure_partitions(self, batch):
+        """Создать месячные секции answers для ответов пачки и следующего месяца"""
+        months = {_month_start(answer[3]) for answer in batch}
+        months.add(_month_start(max(months) + timedelta(days=32)))
+        for month in sorted(months - self._partitions):
+            sql, params = queries.answers_partition_params(month)
+            try:
+                with Database() as db:
+                    db.cursor.execute(sql, params)
+            except errors.CheckViolation as e:
+                # За этот месяц уже есть строки в answers_default - месяц остается там
+                logger.warning(f"Секция answers за {month:%Y-%m} не создана: {e}")
+            self._partitions.add(month)
+
+    def _start_thread(self):
+        if self._thread is None and not self._stop.is_set():
+            self._thread = threading.Thread(target=self._flush_loop, name='answer-log-flush', daemon=True)
+            self._thread.start()
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+# Глобальный журнал ответов
+answer_log = AnswerLog()
@@ -0,0 +1,167 @@
+"""
+Асинхронное подключение к базе данных (psycopg 3)
+"""
+import asyncio
+import time
+
+from psycopg import AsyncCursor
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from config import (
+    DATABASE_CONFIG, DATABASE_REPLICAS, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE,
+    DB_POOL_TIMEOUT, DB_PREPARED_STATEMENTS
+)
+from database.db_config import query_name
+from database.routing import router
+from metrics import registry
+import logging
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_replica_pools = {}  # номер реплики -> пул
+# Пул публикуется только открытым: пока первый вызов ждет open(), остальные ждут блокировку
+_open_lock = asyncio.Lock()
+
+
+class TimedAsyncCursor(AsyncCursor):
+    """Курсор, замеряющий каждый запрос (те же метрики sql_seconds, что и у TimedCursor)"""
+
+    async def execute(self, query, params=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            registry.histogram('sql_seconds', "Длительность SQL-запросов", query=query_name(query)).observe(
+                time.perf_counter() - started
+            )
+
+
+def _conninfo(db_config):
+    return make_conninfo(
+        host=db_config['host'],
+        dbname=db_config['database'],
+        user=db_config['user'],
+        password=db_config['password'],
+        port=db_config['port']
+    )
+
+
+def _create_pool(db_config):
+    return AsyncConnectionPool(
+        _conninfo(db_config),
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        check=AsyncConnectionPool.check_connection,  # Проверка соединения при выдаче
+        kwargs={
+            'row_factory': dict_row,  # Результаты как словари
+            'cursor_factory': TimedAsyncCursor,  # Замер запросов
+            # psycopg 3 сам готовит повторяющиеся запросы на сервере (PREPARE) - сразу с первого вызова
+            'prepare_threshold': 0 if DB_PREPARED_STATEMENTS else None
+        },
+        open=False
+    )
+
+
+async def open_async_pool():
+    """Открыть пул подключений (вызывается внутри работающего event loop)"""
+    global _pool
+    if _pool is None:
+        async with _open_lock:
+            if _pool is None:
+                pool = _create_pool(DATABASE_CONFIG)
+                await pool.open()
+                _pool = pool
+                logger.info(
+                    f"Создан асинхронный пул подключений к БД ({DB_POOL_MIN_SIZE}-{DB_POOL_MAX_SIZE})"
+                )
+    return _pool
+
+
+async def open_replica_pool(number):
+    """Открыть пул подключений к реплике number из DATABASE_REPLICAS"""
+    if number not in _replica_pools:
+        async with _open_lock:
+            if number not in _replica_pools:
+                replica_pool = _create_pool(DATABASE_REPLICAS[number])
+                await replica_pool.open()
+                _replica_pools[number] = replica_pool
+                logger.info(f"Создан асинхронный пул подключений к реплике {DATABASE_REPLICAS[number]['host']}")
+    return _replica_pools[number]
+
+
+async def close_async_pool():
+    """Закрыть пулы подключений (основной и реплик)"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+        logger.info("Асинхронный пул подключений к БД закрыт")
+    while _replica_pools:
+        _, replica_pool = _replica_pools.popitem()
+        await replica_pool.close()
+
+
+class AsyncDatabase:
+    """Асинхронный аналог Database
+
+        async with AsyncDatabase() as db:
+            await db.cursor.execute(...)
+
+    При выходе из блока транзакция фиксируется, а при исключении - откатывается.
+    readonly и user_id - как у Database: чтение может уйти на реплику.
+    """
+
+    def __init__(self, readonly=False, user_id=None):
+        self._readonly = readonly
+        self._user_id = user_id
+        self._context = None
+        self.connection = None
+        self.cursor = None
+
+    async def __aenter__(self):
+        try:
+            if self._readonly:
+                await self._connect_replica(router.replica_index(self._user_id))
+            if self.connection is None:
+                pool = await open_async_pool()
+                self._context = pool.connection()
+                self.connection = await self._context.__aenter__()
+            self.cursor = self.connection.cursor()
+        except Exception as e:
+            logger.error(f"Ошибка подключения к БД: {e}")
+            if self._context is not None:
+                # Соединение уже выдано пулом - возвращаем его
+                await self._context.__aexit__(type(e), e, e.__traceback__)
+                self._context = None
+                self.connection = None
+            raise
+        return self
+
+    async def _connect_replica(self, number):
+        if number is None:
+            return
+        try:
+            replica_pool = await open_replica_pool(number)
+            context = replica_pool.connection()
+            self.connection = await context.__aenter__()
+            self._context = context
+            registry.counter('db_replica_reads_total', "Чтения, отправленные на реплику").inc()
+        except Exception as e:
+            # Реплика недоступна - читаем с основной БД
+            registry.counter(
+                'db_replica_fallbacks_total', "Чтения, ушедшие на основную БД из-за недоступной реплики"
+            ).inc()
+            logger.warning(f"Реплика {number} недоступна, читаем с основной БД: {e}")
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            await self.cursor.close()
+        finally:
+            # Контекст пула сам делает commit/rollback и возвращает соединение
+            await self._context.__aexit__(exc_type, exc_val, exc_tb)
+            self.cursor = None
+            self.connection = None
+        return False
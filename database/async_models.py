@@ -0,0 +1,311 @@
+"""
+Асинхронные модели для работы с данными
+
+Повторяют UserManager/WordManager/ReviewManager из database.models,
+но работают через AsyncDatabase и не блокируют event loop.
+Кэш словаря и выбор вопроса общие с синхронной версией.
+"""
+import asyncio
+import random
+
+from config import DELETE_PAGE_SIZE, STATS_HARDEST_WORDS
+from database.async_db import AsyncDatabase
+from database.answers import answer_log
+from database.cache import neighbour_cache, vocabulary_cache
+from database.prefetch import question_prefetcher
+from database.registration import user_registry
+from database.routing import router
+from database import queries
+from database.sampling import OPTIONS_COUNT, WordIndex, WordList, sample_question
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def _ensure_user(user_id):
+    """user_registry.ensure_user без блокировки event loop"""
+    if user_registry.is_pending(user_id):
+        await asyncio.to_thread(user_registry.ensure_user, user_id)
+
+
+class AsyncUserManager:
+    """Асинхронный класс для работы с пользователями"""
+
+    @staticmethod
+    async def create_user(user_id, username, first_name):
+        """Создание нового пользователя (через общий буфер user_registry)"""
+        user_registry.register(user_id, username, first_name)
+        return True
+
+    @staticmethod
+    async def get_user_words_count(user_id):
+        """Получить количество слов у пользователя (из кэша словаря)"""
+        return len(await AsyncWordManager.get_word_index(user_id))
+
+    @staticmethod
+    async def get_typed_answers(user_id):
+        """Пишет ли пользователь ответы сам (режим /typing)"""
+        try:
+            async with AsyncDatabase(readonly=True, user_id=user_id) as db:
+                await db.cursor.execute(queries.SELECT_TYPED_ANSWERS, (user_id,))
+                result = await db.cursor.fetchone()
+            return bool(result and result['typed_answers'])
+        except Exception as e:
+            logger.error(f"Ошибка получения режима ответа: {e}")
+            return False
+
+    @staticmethod
+    async def toggle_reminders(user_id):
+        """Переключить ежедневные напоминания; новое значение или None при ошибке"""
+        try:
+            await _ensure_user(user_id)
+            async with AsyncDatabase() as db:
+                await db.cursor.execute(queries.TOGGLE_REMINDERS, (user_id,))
+                result = await db.cursor.fetchone()
+            return result['reminders'] if result else None
+        except Exception as e:
+            logger.error(f"Ошибка переключения напоминаний: {e}")
+            return None
+
+    @staticmethod
+    async def set_typed_answers(user_id, enabled):
+        """Включить или выключить режим ответа вводом текста"""
+        try:
+            await _ensure_user(user_id)
+            async with AsyncDatabase() as db:
+                await db.cursor.execute(queries.UPDATE_TYPED_ANSWERS, (enabled, user_id))
+            router.record_write(user_id)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка сохранения режима ответа: {e}")
+            return False
+
+
+class AsyncWordManager:
+    """Асинхронный класс для работы со словами"""
+
+    @staticmethod
+    async def get_default_words():
+        """Получить общие слова (из кэша или БД)"""
+        words = vocabulary_cache.get_default_words()
+        if words is not None:
+            return words
+
+        version = vocabulary_cache.version
+        try:
+            async with AsyncDatabase(readonly=True) as db:
+                await db.cursor.execute(queries.SELECT_DEFAULT_WORDS)
+                words = WordList(await db.cursor.fetchall())
+        except Exception as e:
+            logger.error(f"Ошибка получения общих слов: {e}")
+            return WordList()
+
+        vocabulary_cache.set_default_words(words, version)
+        return words
+
+    @staticmethod
+    async def get_user_extra_words(user_id):
+        """Получить слова из словаря пользователя сверх общих (из кэша или БД)"""
+        words = vocabulary_cache.get_user_words(user_id)
+        if words is not None:
+            return words
+
+        version = vocabulary_cache.version
+        try:
+            async with AsyncDatabase(readonly=True, user_id=user_id) as db:
+                await db.cursor.execute(queries.SELECT_USER_EXTRA_WORDS, (user_id,))
+                words = WordList(await db.cursor.fetchall())
+        except Exception as e:
+            logger.error(f"Ошибка получения слов пользователя: {e}")
+            return WordList()
+
+        vocabulary_cache.set_user_words(user_id, words, version)
+        return words
+
+    @staticmethod
+    async def get_word_index(user_id):
+        """Получить индекс доступных слов пользователя без копирования"""
+        return WordIndex(
+            await AsyncWordManager.get_default_words(),
+            await AsyncWordManager.get_user_extra_words(user_id)
+        )
+
+    @staticmethod
+    async def get_random_word_with_options(user_id, exclude_word_ids=()):
+        """Получить слово для повторения (или случайное) с вариантами ответов"""
+        index = await AsyncWordManager.get_word_index(user_id)
+        if len(index) < OPTIONS_COUNT:
+            return None  # Недостаточно слов для игры
+
+        correct_word = None
+        due_word_id = await AsyncReviewManager.get_due_word_id(user_id)
+        if due_word_id is not None and due_word_id not in exclude_word_ids:
+            correct_word = index.find(due_word_id)
+        if correct_word is None:
+            correct_word = index[random.randrange(len(index))]
+
+        neighbour_ids = await AsyncWordManager.get_neighbour_ids(correct_word['word_id'])
+        return sample_question(index, correct_word, neighbour_ids=neighbour_ids)
+
+    @staticmethod
+    async def get_neighbour_ids(word_id):
+        """Получить ID похожих слов по убыванию похожести (из кэша или БД)"""
+        neighbour_ids = neighbour_cache.get(word_id)
+        if neighbour_ids is not None:
+            return neighbour_ids
+
+        try:
+            async with AsyncDatabase(readonly=True) as db:
+                await db.cursor.execute(queries.SELECT_WORD_NEIGHBOURS, (word_id,))
+                neighbour_ids = tuple(row['neighbour_id'] for row in await db.cursor.fetchall())
+        except Exception as e:
+            logger.error(f"Ошибка получения похожих слов: {e}")
+            return ()
+
+        neighbour_cache.set(word_id, neighbour_ids)
+        return neighbour_ids
+
+    @staticmethod
+    async def next_question(user_id):
+        """Следующий вопрос: заготовленный (см. database/prefetch.py) или подобранный сейчас"""
+        question = question_prefetcher.take(user_id)
+        if question is None:
+            question = await AsyncWordManager.get_random_word_with_options(user_id)
+        return question
+
+    @staticmethod
+    async def add_user_word(user_id, english_word, russian_word):
+        """Добавить слово в словарь пользователя
+
+        Если такое английское слово уже есть (например, его добавил другой
+        пользователь), в словарь попадает существующая строка с ее переводом.
+        Возвращает строку слова (word_id, english_word, russian_word, ...) или None.
+        """
+        params = {'english_word': english_word, 'russian_word': russian_word, 'user_id': user_id}
+        try:
+            await _ensure_user(user_id)
+            async with AsyncDatabase() as db:
+                # Слово и связь с пользователем - одним запросом
+                await db.cursor.execute(queries.ADD_USER_WORD, params)
+                word = await db.cursor.fetchone()
+                if word is None:
+                    # Гонка с параллельной вставкой того же слова - повторяем с новым снимком
+                    await db.cursor.execute(queries.ADD_USER_WORD, params)
+                    word = await db.cursor.fetchone()
+
+            if not word:
+                return None
+
+            router.record_write(user_id)
+            question_prefetcher.invalidate(user_id)
+            if word['linked']:
+                vocabulary_cache.add_user_word(user_id, {
+                    'word_id': word['word_id'],
+                    'english_word': word['english_word'],
+                    'russian_word': word['russian_word'],
+                    'is_default': False
+                })
+            logger.info(f"Слово '{english_word}' добавлено пользователю {user_id}")
+            return word
+
+        except Exception as e:
+            logger.error(f"Ошибка добавления слова: {e}")
+            return None
+
+    @staticmethod
+    async def get_personal_words_page(user_id, prefix='', after_id=None, before_id=None, limit=DELETE_PAGE_SIZE):
+        """Страница персональных слов по алфавиту (см. WordManager.get_personal_words_page)"""
+        backward = before_id is not None
+        params = queries.personal_page_params(
+            user_id, prefix, before_id if backward else after_id, limit + 1
+        )
+        try:
+            async with AsyncDatabase(readonly=True, user_id=user_id) as db:
+                await db.cursor.execute(
+                    queries.SELECT_PERSONAL_WORDS_BEFORE if backward else queries.SELECT_PERSONAL_WORDS_AFTER,
+                    params
+                )
+                rows = await db.cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Ошибка получения персональных слов: {e}")
+            rows = []
+        return queries.personal_page(rows, limit, backward, after_id is not None)
+
+    @staticmethod
+    async def delete_user_word(user_id, word_id):
+        """Удалить персональное слово пользователя"""
+        try:
+            async with AsyncDatabase() as db:
+                await db.cursor.execute(queries.REMOVE_USER_WORD, {'user_id': user_id, 'word_id': word_id})
+
+            router.record_write(user_id)
+            question_prefetcher.invalidate(user_id)
+            vocabulary_cache.remove_user_word(user_id, word_id)
+            logger.info(f"Слово {word_id} удалено у пользователя {user_id}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Ошибка удаления слова: {e}")
+            return False
+
+
+class AsyncReviewManager:
+    """Асинхронный класс для интервального повторения слов"""
+
+    @staticmethod
+    async def record_answer(user_id, word_id, is_correct):
+        """Сохранить ответ и пересчитать, когда слово нужно повторить
+
+        В журнал для /stats ответ попадает через буфер answer_log, без запроса к БД.
+        """
+        answer_log.record(user_id, word_id, is_correct)
+        try:
+            await _ensure_user(user_id)
+            async with AsyncDatabase() as db:
+                await db.cursor.execute(
+                    queries.UPSERT_REVIEW,
+                    queries.review_params(user_id, word_id, is_correct)
+                )
+            router.record_write(user_id)
+            # Заготовки пересчитываются уже с новым сроком повторения слова
+            question_prefetcher.answered(user_id, word_id)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка сохранения ответа: {e}")
+            return False
+
+    @staticmethod
+    async def get_due_word_id(user_id):
+        """Получить word_id слова, которое пора повторить (или None)"""
+        try:
+            async with AsyncDatabase(readonly=True, user_id=user_id) as db:
+                await db.cursor.execute(queries.SELECT_DUE_WORD, (user_id,))
+                result = await db.cursor.fetchone()
+            return result['word_id'] if result else None
+        except Exception as e:
+            logger.error(f"Ошибка получения слова для повторения: {e}")
+            return None
+
+
+class AsyncStatsManager:
+    """Асинхронный класс для статистики ответов (/stats)"""
+
+    @staticmethod
+    async def get_user_stats(user_id, hardest_limit=STATS_HARDEST_WORDS):
+        """Итоги пользователя и самые трудные слова
+
+        Возвращает {'stats': строка user_stats или None, 'hardest': [...]}.
+        Сначала дописываются ответы пользователя, еще лежащие в буфере.
+        """
+        if answer_log.has_pending(user_id):
+            await asyncio.to_thread(answer_log.flush)
+        try:
+            async with AsyncDatabase(readonly=True, user_id=user_id) as db:
+                await db.cursor.execute(queries.SELECT_USER_STATS, (user_id,))
+                stats = await db.cursor.fetchone()
+                await db.cursor.execute(queries.SELECT_HARDEST_WORDS, (user_id, hardest_limit))
+                hardest = await db.cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Ошибка получения статистики: {e}")
+            return None
+        return {'stats': stats, 'hardest': hardest}
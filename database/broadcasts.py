@@ -0,0 +1,96 @@
+"""
+Данные рассылок: получатели через серверный курсор и контрольные точки
+
+Получатели читаются именованным (серверным) курсором psycopg2 пачками по
+chunk_size строк, поэтому в памяти процесса всегда не больше одной пачки,
+сколько бы пользователей ни было в users. Рассылка идет часами (ее сдерживает
+лимит отправки), а курсор живет внутри транзакции - чтобы не держать
+транзакцию и снимок так долго, курсор через segment_seconds закрывается
+и открывается заново после последнего выданного пользователя.
+"""
+from datetime import datetime, timedelta
+import itertools
+import time
+
+from config import BROADCAST_CHUNK_SIZE, BROADCAST_SEGMENT_SECONDS, BROADCAST_MIN_DUE
+from database.db_config import Database
+from database import queries
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Меньше любого user_id: с него начинается рассылка без контрольной точки
+FIRST_USER_ID = -2 ** 63
+
+_cursor_numbers = itertools.count(1)
+
+
+def start_broadcast(kind, run_date):
+    """Начать рассылку kind за день run_date или вернуть уже начатую (с контрольной точкой)"""
+    with Database() as db:
+        db.cursor.execute(queries.START_BROADCAST, (kind, run_date))
+        return db.cursor.fetchone()
+
+
+def save_checkpoint(broadcast_id, last_user_id, sent, failed):
+    """Запомнить, что всем до last_user_id включительно сообщения отправлены"""
+    with Database() as db:
+        db.cursor.execute(queries.SAVE_BROADCAST_CHECKPOINT, (last_user_id, sent, failed, broadcast_id))
+
+
+def finish_broadcast(broadcast_id):
+    """Отметить рассылку законченной"""
+    with Database() as db:
+        db.cursor.execute(queries.FINISH_BROADCAST, (broadcast_id,))
+
+
+def recent_broadcasts(limit=10):
+    """Последние рассылки для python broadcast_cli.py status"""
+    with Database() as db:
+        db.cursor.execute(queries.SELECT_RECENT_BROADCASTS, (limit,))
+        return db.cursor.fetchall()
+
+
+def disable_reminders(user_ids):
+    """Выключить напоминания пользователям, заблокировавшим бота"""
+    if not user_ids:
+        return
+    with Database() as db:
+        db.cursor.execute(queries.DISABLE_REMINDERS, (list(user_ids),))
+
+
+def iter_reminder_recipients(after_user_id, run_date, min_due=BROADCAST_MIN_DUE,
+                             chunk_size=BROADCAST_CHUNK_SIZE, segment_seconds=BROADCAST_SEGMENT_SECONDS):
+    """Пачки получателей напоминания ({'user_id', 'due_count'}) по возрастанию user_id
+
+    Начинает после after_user_id (контрольная точка). Слова к повторению
+    считаются те, срок которых наступает до конца дня run_date.
+    """
+    params = {
+        'after_user_id': after_user_id,
+        'until': datetime.combine(run_date + timedelta(days=1), datetime.min.time()),
+        'min_due': min_due
+    }
+    while True:
+        opened = time.monotonic()
+        exhausted = True
+        # Чтение можно отдать реплике: контрольные точки пишутся отдельными транзакциями
+        with Database(readonly=True) as db:
+            cursor = db.connection.cursor(name=f"broadcast_{next(_cursor_numbers)}")
+            try:
+                cursor.itersize = chunk_size
+                cursor.execute(queries.SELECT_REMINDER_RECIPIENTS, params)
+                while True:
+                    chunk = cursor.fetchmany(chunk_size)
+                    if not chunk:
+                        break
+                    params['after_user_id'] = chunk[-1]['user_id']
+                    yield chunk
+                    if time.monotonic() - opened >= segment_seconds:
+                        exhausted = False
+                        break
+            finally:
+                cursor.close()
+        if exhausted:
+            return
+        logger.info(f"Курсор рассылки переоткрыт после пользователя {params['after_user_id']}")
@@ -0,0 +1,113 @@
+"""
+Массовый импорт и экспорт словаря через COPY
+
+Файл не разбирается в Python построчно: copy_expert передает его потоком
+во временную таблицу, а слияние с words/user_words выполняется несколькими
+запросами над всеми строками сразу.
+"""
+from database.db_config import Database
+from database.cache import vocabulary_cache
+from database.prefetch import question_prefetcher
+from database.registration import user_registry
+from database.routing import router
+from database import queries
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Разделители поддерживаемых форматов
+DELIMITERS = {
+    'csv': ',',
+    'tsv': '\t'
+}
+
+
+def detect_format(filename, default='csv'):
+    """Формат по расширению файла"""
+    name = (filename or '').lower()
+    if name.endswith('.tsv') or name.endswith('.tab'):
+        return 'tsv'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+class _ProgressReader:
+    """Обертка файла, сообщающая, сколько байт уже прочитал COPY"""
+
+    def __init__(self, source, progress):
+        self._source = source
+        self._progress = progress
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = self._source.read(size)
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        self.bytes_read += len(chunk)
+        if self._progress:
+            self._progress(self.bytes_read)
+        return chunk
+
+
+def import_words(source, user_id=None, fmt='csv', header=True, progress=None):
+    """Импортировать слова из файла source (CSV/TSV: английское слово, перевод)
+
+    user_id=None - общие слова для всех, иначе слова добавляются в словарь пользователя
+    (уже существующие слова просто связываются с ним). progress(bytes_read) вызывается
+    по мере чтения файла. Возвращает словарь со счетчиками строк.
+    """
+    reader = _ProgressReader(source, progress)
+    if user_id is not None:
+        user_registry.ensure_user(user_id)
+    with Database() as db:
+        db.cursor.execute(queries.IMPORT_CREATE_STAGING)
+        copy_sql = db.cursor.mogrify(queries.IMPORT_COPY, (DELIMITERS[fmt], header)).decode()
+        db.cursor.copy_expert(copy_sql, reader)
+        rows_read = db.cursor.rowcount
+
+        db.cursor.execute(queries.IMPORT_NORMALIZE)
+        rows_valid = db.cursor.rowcount
+
+        db.cursor.execute(queries.IMPORT_MERGE_WORDS, {
+            'is_default': user_id is None,
+            'user_id': user_id
+        })
+        words_added = db.cursor.rowcount
+
+        links_added = 0
+        if user_id is not None:
+            db.cursor.execute(queries.IMPORT_LINK_USER_WORDS, (user_id,))
+            links_added = db.cursor.rowcount
+
+    if user_id is None:
+        vocabulary_cache.invalidate_defaults()
+        question_prefetcher.clear()
+    else:
+        router.record_write(user_id)
+        vocabulary_cache.invalidate_user(user_id)
+        question_prefetcher.invalidate(user_id)
+
+    stats = {
+        'rows_read': rows_read,
+        'rows_valid': rows_valid,
+        'words_added': words_added,
+        'links_added': links_added,
+        'bytes_read': reader.bytes_read
+    }
+    logger.info(f"Импорт словаря (пользователь {user_id}): {stats}")
+    return stats
+
+
+def export_words(target, user_id=None, fmt='csv'):
+    """Выгрузить общие слова (user_id=None) или словарь пользователя в файл target
+
+    target открывается в двоичном режиме. Возвращает число выгруженных строк.
+    """
+    with Database() as db:
+        if user_id is None:
+            copy_sql = db.cursor.mogrify(queries.EXPORT_DEFAULT_WORDS, (DELIMITERS[fmt],))
+        else:
+            copy_sql = db.cursor.mogrify(queries.EXPORT_USER_WORDS, (user_id, DELIMITERS[fmt]))
+        db.cursor.copy_expert(copy_sql.decode(), target)
+        return db.cursor.rowcount
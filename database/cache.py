@@ -0,0 +1,177 @@
+"""
+Кэш словаря в памяти процесса
+"""
+from collections import OrderedDict
+import threading
+import time
+
+from config import (
+    VOCAB_CACHE_MAX_USERS, VOCAB_CACHE_USER_TTL, VOCAB_CACHE_DEFAULT_TTL,
+    NEIGHBOURS_CACHE_SIZE, NEIGHBOURS_CACHE_TTL
+)
+from database.sampling import WordList
+from metrics import registry
+
+
+class VocabularyCache:
+    """Общие слова (одна копия на процесс) + персональные слова пользователей с LRU/TTL
+
+    Кэш только хранит данные - загрузкой из БД занимаются менеджеры моделей.
+    Чтобы загрузка, начатая до изменения словаря, не записала устаревшие данные,
+    каждое изменение увеличивает version, а set_* принимает версию, прочитанную
+    до запроса к БД, и молча игнорирует запись, если версия успела смениться.
+    """
+
+    def __init__(self, max_users=VOCAB_CACHE_MAX_USERS, user_ttl=VOCAB_CACHE_USER_TTL,
+                 default_ttl=VOCAB_CACHE_DEFAULT_TTL, clock=time.monotonic):
+        self._max_users = max_users
+        self._user_ttl = user_ttl
+        self._default_ttl = default_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._default_words = None
+        self._default_expires = 0
+        self._users = OrderedDict()  # user_id -> (WordList, момент устаревания)
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_default_words(self):
+        """Общие слова или None, если их нужно загрузить"""
+        with self._lock:
+            if self._default_words is not None and self._clock() < self._default_expires:
+                self.hits += 1
+                return self._default_words
+            self.misses += 1
+            return None
+
+    def set_default_words(self, words, version):
+        """Сохранить общие слова, загруженные при версии version"""
+        with self._lock:
+            if version != self.version:
+                return
+            self._default_words = _as_word_list(words)
+            self._default_expires = self._clock() + self._default_ttl
+
+    def get_user_words(self, user_id):
+        """Персональные слова пользователя или None, если их нужно загрузить"""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or self._clock() >= entry[1]:
+                if entry is not None:
+                    del self._users[user_id]
+                self.misses += 1
+                return None
+            self._users.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+    def set_user_words(self, user_id, words, version):
+        """Сохранить персональные слова, загруженные при версии version"""
+        with self._lock:
+            if version != self.version:
+                return
+            self._store_user(user_id, _as_word_list(words))
+
+    def add_user_word(self, user_id, word):
+        """Дописать новое слово в закэшированный словарь пользователя"""
+        with self._lock:
+            self.version += 1
+            entry = self._users.get(user_id)
+            if entry is not None:
+                self._store_user(user_id, WordList(entry[0] + (word,)))
+
+    def remove_user_word(self, user_id, word_id):
+        """Убрать слово из закэшированного словаря пользователя"""
+        with self._lock:
+            self.version += 1
+            entry = self._users.get(user_id)
+            if entry is not None:
+                words = WordList(w for w in entry[0] if w['word_id'] != word_id)
+                self._store_user(user_id, words)
+
+    def invalidate_user(self, user_id):
+        """Сбросить кэш пользователя"""
+        with self._lock:
+            self.version += 1
+            self._users.pop(user_id, None)
+
+    def invalidate_defaults(self):
+        """Сбросить кэш общих слов"""
+        with self._lock:
+            self.version += 1
+            self._default_words = None
+
+    def clear(self):
+        """Полностью очистить кэш"""
+        with self._lock:
+            self.version += 1
+            self._default_words = None
+            self._users.clear()
+
+    def _store_user(self, user_id, words):
+        self._users[user_id] = (words, self._clock() + self._user_ttl)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self._max_users:
+            self._users.popitem(last=False)
+
+
+class NeighbourCache:
+    """Списки похожих слов (word_id -> кортеж neighbour_id) с LRU/TTL
+
+    Списки меняет только задание neighbours_cli.py, а не бот, поэтому версии,
+    как у VocabularyCache, не нужны: через ttl список просто перечитывается.
+    """
+
+    def __init__(self, max_words=NEIGHBOURS_CACHE_SIZE, ttl=NEIGHBOURS_CACHE_TTL, clock=time.monotonic):
+        self._max_words = max_words
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._words = OrderedDict()  # word_id -> (кортеж neighbour_id, момент устаревания)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, word_id):
+        """Соседи слова или None, если их нужно загрузить"""
+        with self._lock:
+            entry = self._words.get(word_id)
+            if entry is None or self._clock() >= entry[1]:
+                if entry is not None:
+                    del self._words[word_id]
+                self.misses += 1
+                return None
+            self._words.move_to_end(word_id)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, word_id, neighbour_ids):
+        """Сохранить соседей слова"""
+        with self._lock:
+            self._words[word_id] = (tuple(neighbour_ids), self._clock() + self._ttl)
+            self._words.move_to_end(word_id)
+            while len(self._words) > self._max_words:
+                self._words.popitem(last=False)
+
+    def clear(self):
+        """Полностью очистить кэш"""
+        with self._lock:
+            self._words.clear()
+
+
+def _as_word_list(words):
+    return words if isinstance(words, WordList) else WordList(words)
+
+
+# Общие кэши процесса
+vocabulary_cache = VocabularyCache()
+neighbour_cache = NeighbourCache()
+
+registry.gauge_function('vocab_cache_hits_total', "Попадания в кэш словаря",
+                        lambda: vocabulary_cache.hits, kind='counter')
+registry.gauge_function('vocab_cache_misses_total', "Промахи кэша словаря",
+                        lambda: vocabulary_cache.misses, kind='counter')
+registry.gauge_function('neighbour_cache_hits_total', "Попадания в кэш похожих слов",
+                        lambda: neighbour_cache.hits, kind='counter')
+registry.gauge_function('neighbour_cache_misses_total', "Промахи кэша похожих слов",
+                        lambda: neighbour_cache.misses, kind='counter')
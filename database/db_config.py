@@ -1,9 +1,20 @@
 """
 Конфигурация подключения к базе данных
 """
+import threading
+import time
+
 import psycopg2
+from psycopg2 import extensions, pool
 from psycopg2.extras import RealDictCursor
-from config import DATABASE_CONFIG
+from config import (
+    DATABASE_CONFIG, DATABASE_REPLICAS, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE,
+    DB_POOL_TIMEOUT, DB_POOL_PING_INTERVAL, DB_PREPARED_STATEMENTS
+)
+from database import queries
+from database.routing import router
+from database.statements import STATEMENTS, PreparingConnection
+from metrics import registry
 import logging
 
 # Настройка логирования
@@ -11,26 +22,282 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-class Database:
-    """Класс для работы с базой данных"""
-
-    def __init__(self):
-        """Создание подключения к базе данных"""
-        try:
-            self.connection = psycopg2.connect(
-                host=DATABASE_CONFIG['host'],
-                database=DATABASE_CONFIG['database'],
-                user=DATABASE_CONFIG['user'],
-                password=DATABASE_CONFIG['password'],
-                port=DATABASE_CONFIG['port'],
-                cursor_factory=RealDictCursor  # Результаты как словари
+# Текст запроса -> имя константы в database.queries (метка для метрик)
+_QUERY_NAMES = {
+    value: name for name, value in vars(queries).items()
+    if name.isupper() and isinstance(value, str)
+}
+
+_pool_checkouts = registry.counter('db_pool_checkouts_total', "Выдачи соединений из пула")
+_pool_timeouts = registry.counter('db_pool_timeouts_total', "Таймауты ожидания свободного соединения")
+_pool_wait = registry.histogram('db_pool_wait_seconds', "Ожидание свободного соединения в пуле")
+_replica_reads = registry.counter('db_replica_reads_total', "Чтения, отправленные на реплику")
+_replica_fallbacks = registry.counter('db_replica_fallbacks_total', "Чтения, ушедшие на основную БД из-за недоступной реплики")
+
+
+def query_name(query):
+    """Имя запроса из database.queries или 'other'"""
+    return _QUERY_NAMES.get(query, 'other') if isinstance(query, str) else 'other'
+
+
+class TimedCursor(RealDictCursor):
+    """RealDictCursor, замеряющий каждый запрос (гистограмма sql_seconds по имени запроса)
+
+    Запросы из database.statements.STATEMENTS выполняются как подготовленные (EXECUTE).
+    Если сервер успел сбросить сессию (DISCARD ALL, например от pgbouncer), запрос,
+    открывавший транзакцию, подготавливается и выполняется заново в новой транзакции.
+    """
+
+    def execute(self, query, vars=None):
+        name = query_name(query)
+        statement = STATEMENTS.get(query) if DB_PREPARED_STATEMENTS and isinstance(query, str) else None
+        started = time.perf_counter()
+        try:
+            if statement is not None and isinstance(self.connection, PreparingConnection):
+                first = self.connection.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+                try:
+                    return self._execute_prepared(statement, vars)
+                except psycopg2.errors.InvalidSqlStatementName:
+                    # Подготовленных запросов на сервере больше нет - на этом соединении готовим все заново
+                    self.connection.prepared.clear()
+                    if not first:
+                        raise  # Прежние запросы прерванной транзакции не повторить - ошибка вызывающему
+                    self.connection.rollback()
+                    return self._execute_prepared(statement, vars)
+            return super().execute(query, vars)
+        finally:
+            registry.histogram('sql_seconds', "Длительность SQL-запросов", query=name).observe(
+                time.perf_counter() - started
+            )
+
+    def _execute_prepared(self, statement, vars):
+        if statement.name not in self.connection.prepared:
+            super().execute(statement.prepare_sql)
+            self.connection.prepared.add(statement.name)
+        return super().execute(statement.execute_sql, statement.arguments(vars))
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            registry.histogram('sql_seconds', "Длительность SQL-запросов", query='COPY').observe(
+                time.perf_counter() - started
             )
+
+
+class ConnectionPool:
+    """Общий для процесса пул подключений с проверкой соединения при выдаче"""
+
+    def __init__(self, minconn, maxconn, timeout, ping_interval, **connect_kwargs):
+        self._pool = pool.ThreadedConnectionPool(
+            minconn,
+            maxconn,
+            cursor_factory=TimedCursor,  # Результаты как словари + замер запросов
+            connection_factory=PreparingConnection,  # Учет подготовленных запросов
+            **connect_kwargs
+        )
+        # ThreadedConnectionPool сразу падает при исчерпании, поэтому ждем свободное место сами
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._timeout = timeout
+        self._ping_interval = ping_interval
+        self._last_used = {}  # id(соединения) -> время возврата в пул
+        self._lock = threading.Lock()
+        self._max_attempts = maxconn + 1
+
+    def getconn(self):
+        """Получить живое соединение из пула"""
+        started = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self._timeout)
+        _pool_wait.observe(time.perf_counter() - started)
+        if not acquired:
+            _pool_timeouts.inc()
+            raise pool.PoolError(f"Нет свободных соединений в пуле за {self._timeout} с")
+        try:
+            for _ in range(self._max_attempts):
+                connection = self._pool.getconn()
+                if self._is_healthy(connection):
+                    _pool_checkouts.inc()
+                    return connection
+                logger.warning("Соединение из пула неработоспособно, переподключаемся")
+                self._discard(connection)
+            raise psycopg2.OperationalError("Не удалось получить рабочее соединение из пула")
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, connection, close=False):
+        """Вернуть соединение в пул"""
+        try:
+            if close or connection.closed:
+                self._discard(connection)
+                return
+            with self._lock:
+                self._last_used[id(connection)] = time.monotonic()
+            self._pool.putconn(connection)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        """Закрыть все соединения пула"""
+        with self._lock:
+            self._last_used.clear()
+        self._pool.closeall()
+
+    def _discard(self, connection):
+        with self._lock:
+            self._last_used.pop(id(connection), None)
+        self._pool.putconn(connection, close=True)
+
+    def _is_healthy(self, connection):
+        """Проверка соединения: статус драйвера, а после простоя - SELECT 1"""
+        if connection.closed:
+            return False
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            # Соединение вернули посреди транзакции - откатываем ее
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                return False
+
+        with self._lock:
+            last_used = self._last_used.get(id(connection))
+        if last_used is not None and time.monotonic() - last_used < self._ping_interval:
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+
+_pool = None
+_replica_pools = None
+_pool_lock = threading.Lock()
+
+
+def _create_pool(db_config):
+    return ConnectionPool(
+        DB_POOL_MIN_SIZE,
+        DB_POOL_MAX_SIZE,
+        DB_POOL_TIMEOUT,
+        DB_POOL_PING_INTERVAL,
+        host=db_config['host'],
+        database=db_config['database'],
+        user=db_config['user'],
+        password=db_config['password'],
+        port=db_config['port']
+    )
+
+
+def get_pool():
+    """Получить (и при первом обращении создать) пул подключений процесса"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _create_pool(DATABASE_CONFIG)
+                logger.info(
+                    f"Создан пул подключений к БД ({DB_POOL_MIN_SIZE}-{DB_POOL_MAX_SIZE})"
+                )
+    return _pool
+
+
+def get_replica_pool(number):
+    """Пул подключений к реплике number из DATABASE_REPLICAS (создаются при первом обращении)"""
+    global _replica_pools
+    if _replica_pools is None:
+        with _pool_lock:
+            if _replica_pools is None:
+                _replica_pools = [None] * len(DATABASE_REPLICAS)
+    if _replica_pools[number] is None:
+        with _pool_lock:
+            if _replica_pools[number] is None:
+                _replica_pools[number] = _create_pool(DATABASE_REPLICAS[number])
+                logger.info(f"Создан пул подключений к реплике {DATABASE_REPLICAS[number]['host']}")
+    return _replica_pools[number]
+
+
+def close_pool():
+    """Закрыть пулы подключений процесса (основной и реплик)"""
+    global _pool, _replica_pools
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            logger.info("Пул подключений к БД закрыт")
+        for replica_pool in _replica_pools or ():
+            if replica_pool is not None:
+                replica_pool.closeall()
+        _replica_pools = None
+
+
+class Database:
+    """Класс для работы с базой данных
+
+    Соединение берется из общего пула и возвращается в него при close().
+    Удобнее использовать как контекстный менеджер:
+
+        with Database() as db:
+            db.cursor.execute(...)
+
+    При выходе из блока транзакция фиксируется, а при исключении - откатывается.
+
+    readonly=True - блок только читает и может уйти на реплику (см. database/routing.py);
+    user_id - чей это запрос: сразу после записи пользователь читает с основной БД.
+    """
+
+    def __init__(self, readonly=False, user_id=None):
+        """Получение подключения из пула"""
+        self._pool = None
+        self.connection = None
+        try:
+            if readonly:
+                self._connect_replica(router.replica_index(user_id))
+            if self._pool is None:
+                self._pool = get_pool()
+                self.connection = self._pool.getconn()
             self.cursor = self.connection.cursor()
-            logger.info("Успешное подключение к базе данных")
         except Exception as e:
             logger.error(f"Ошибка подключения к БД: {e}")
+            if self.connection is not None:
+                # Соединение уже выдано пулом - возвращаем, иначе слот пула потерян навсегда
+                self._pool.putconn(self.connection)
+                self.connection = None
             raise
 
+    def _connect_replica(self, number):
+        if number is None:
+            return
+        try:
+            replica_pool = get_replica_pool(number)
+            self.connection = replica_pool.getconn()
+            self._pool = replica_pool
+            _replica_reads.inc()
+        except Exception as e:
+            # Реплика недоступна - читаем с основной БД
+            _replica_fallbacks.inc()
+            logger.warning(f"Реплика {number} недоступна, читаем с основной БД: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                self.connection.commit()
+            else:
+                self.connection.rollback()
+        finally:
+            self.close()
+        return False
+
     def execute_query(self, query, params=None):
         """Выполнение SQL запроса"""
         try:
@@ -52,9 +319,17 @@ class Database:
             raise
 
     def close(self):
-        """Закрытие подключения"""
+        """Возврат подключения в пул"""
+        if self.connection is None:
+            return
         if self.cursor:
             self.cursor.close()
-        if self.connection:
-            self.connection.close()
-        logger.info("Подключение к БД закрыто")
\ No newline at end of file
+            self.cursor = None
+        if not self.connection.closed and \
+                self.connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                self.connection.rollback()
+            except psycopg2.Error:
+                pass
+        self._pool.putconn(self.connection)
+        self.connection = None
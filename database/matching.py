@@ -0,0 +1,100 @@
+"""
+Проверка ответа, набранного вручную (режим /typing)
+
+Ответ и слова словаря приводятся к одному виду normalize_answer: регистр,
+лишние пробелы, диакритика (café -> cafe), типографские апострофы и дефисы.
+Нормализованные написания слов индексируются один раз на WordList (WordList.by_answer):
+общие слова - один раз на процесс, персональные - при загрузке в кэш словаря.
+Поэтому проверка ответа стоит O(длины ответа) и не обращается к БД.
+
+Опечатки прощаются по расстоянию Дамерау-Левенштейна не больше typo_limit: считается
+только полоса шириной 2 * limit + 1, и счет прекращается, как только расстояние
+заведомо больше limit. Но ответ, который сам является другим словом словаря
+пользователя (cart вместо card), - ошибка, а не опечатка.
+"""
+import unicodedata
+
+# Результаты check_answer
+EXACT = 'exact'  # Верно
+TYPO = 'typo'  # Верно, но с опечаткой
+OTHER_WORD = 'other_word'  # Другое слово из словаря пользователя
+WRONG = 'wrong'
+
+# Сколько опечаток прощать: слова до 3 букв - ни одной, до 7 - одну, длиннее - две
+_TYPO_LIMITS = ((3, 0), (7, 1))
+MAX_TYPOS = 2
+
+_REPLACEMENTS = str.maketrans({
+    '’': "'", '‘': "'", '`': "'", 'ʼ': "'",
+    '‐': '-', '‑': '-', '–': '-', '—': '-',
+    'ß': 'ss', 'æ': 'ae', 'œ': 'oe', 'ø': 'o', 'ł': 'l'
+})
+
+
+def normalize_answer(text):
+    """Привести ответ или слово к виду для сравнения"""
+    text = unicodedata.normalize('NFKD', text.casefold().translate(_REPLACEMENTS))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.split()).strip(".,!?;:\"'")
+
+
+def typo_limit(length):
+    """Сколько опечаток прощать в слове длины length"""
+    for max_length, limit in _TYPO_LIMITS:
+        if length <= max_length:
+            return limit
+    return MAX_TYPOS
+
+
+def within_distance(first, second, limit):
+    """Расстояние между строками не больше limit (O(длина * limit))
+
+    Считается расстояние Дамерау-Левенштейна без повторных правок подстрок:
+    перестановка соседних букв (wrod -> word) - одна опечатка.
+    """
+    if abs(len(first) - len(second)) > limit:
+        return False
+    if len(first) > len(second):
+        first, second = second, first
+
+    too_far = limit + 1
+    before = None
+    previous = list(range(len(second) + 1))
+    for i, char in enumerate(first, start=1):
+        low, high = max(1, i - limit), min(len(second), i + limit)
+        current = [too_far] * (len(second) + 1)
+        current[0] = i if i <= limit else too_far
+        for j in range(low, high + 1):
+            distance = min(
+                previous[j - 1] + (char != second[j - 1]),
+                previous[j] + 1,
+                current[j - 1] + 1,
+                too_far
+            )
+            if before is not None and j > 1 and char == second[j - 2] and first[i - 2] == second[j - 1]:
+                distance = min(distance, before[j - 2] + 1)
+            current[j] = distance
+        if min(current[low - 1:high + 1]) > limit:
+            return False
+        before, previous = previous, current
+    return previous[len(second)] <= limit
+
+
+def check_answer(text, correct_word, index):
+    """Проверить ответ text на слово correct_word по индексу словаря пользователя (WordIndex)
+
+    Возвращает (результат, слово): для OTHER_WORD - слово, которое пользователь
+    написал вместо правильного, иначе correct_word.
+    """
+    answer = normalize_answer(text or '')
+    expected = normalize_answer(correct_word['english_word'])
+    if answer == expected:
+        return EXACT, correct_word
+
+    other_word = index.find_answer(answer)
+    if other_word is not None:
+        return OTHER_WORD, other_word
+
+    if answer and within_distance(answer, expected, typo_limit(len(expected))):
+        return TYPO, correct_word
+    return WRONG, correct_word
@@ -0,0 +1,70 @@
+"""
+Версионные миграции схемы БД
+
+Миграции - файлы sql/migrations/NNN_описание.sql. Каждая применяется один раз
+в своей транзакции, номер записывается в таблицу schema_migrations.
+База из sql/init_db.sql считается версией 0. Таблицы, добавленные в init_db.sql
+позже (word_reviews, bot_states), миграция 001 создает, если их еще нет.
+"""
+import os
+import re
+
+from database.db_config import Database
+from database import queries
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql', 'migrations')
+
+_MIGRATION_FILE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+
+def list_migrations(directory=MIGRATIONS_DIR):
+    """Список миграций (версия, имя, путь) по возрастанию версии"""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort()
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Повторяющиеся номера миграций в {directory}")
+    return migrations
+
+
+def applied_versions():
+    """Номера уже примененных миграций"""
+    with Database() as db:
+        db.cursor.execute(queries.CREATE_SCHEMA_MIGRATIONS)
+        db.cursor.execute(queries.SELECT_APPLIED_MIGRATIONS)
+        return {row['version'] for row in db.cursor.fetchall()}
+
+
+def pending_migrations(directory=MIGRATIONS_DIR):
+    """Миграции, которые еще не применены"""
+    applied = applied_versions()
+    return [migration for migration in list_migrations(directory) if migration[0] not in applied]
+
+
+def migrate(target=None, directory=MIGRATIONS_DIR):
+    """Применить миграции до версии target (по умолчанию - все). Возвращает их номера"""
+    done = []
+    for version, name, path in pending_migrations(directory):
+        if target is not None and version > target:
+            break
+        with open(path, encoding='utf-8') as migration_file:
+            sql = migration_file.read()
+
+        with Database() as db:
+            db.cursor.execute(queries.LOCK_SCHEMA_MIGRATIONS)
+            db.cursor.execute(queries.SELECT_APPLIED_MIGRATIONS)
+            if version in {row['version'] for row in db.cursor.fetchall()}:
+                continue  # Успел применить параллельный запуск
+            db.cursor.execute(sql)
+            db.cursor.execute(queries.INSERT_MIGRATION, (version, name))
+
+        logger.info(f"Применена миграция {version:03d}_{name}")
+        done.append(version)
+    return done
@@ -2,7 +2,16 @@
 Модели для работы с данными
 """
 import random
+
+from config import DELETE_PAGE_SIZE, STATS_HARDEST_WORDS
 from database.db_config import Database
+from database.answers import answer_log
+from database.cache import neighbour_cache, vocabulary_cache
+from database.prefetch import question_prefetcher
+from database.registration import user_registry
+from database.routing import router
+from database import queries
+from database.sampling import OPTIONS_COUNT, WordIndex, WordList, sample_question
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,180 +22,306 @@ class UserManager:
 
     @staticmethod
     def create_user(user_id, username, first_name):
-        """Создание нового пользователя"""
-        db = Database()
+        """Создание нового пользователя
+
+        Запись отложенная: пользователь попадает в буфер user_registry и пишется
+        в БД пачкой вместе с другими. Уже известный и не изменившийся - пропускается.
+        """
+        user_registry.register(user_id, username, first_name)
+        return True
+
+    @staticmethod
+    def get_user_words_count(user_id):
+        """Получить количество слов у пользователя
+
+        Общие слова + персональные, то есть ровно размер индекса из кэша словаря:
+        add_user_word/delete_user_word поддерживают его актуальным без запроса COUNT.
+        """
+        return len(WordManager.get_word_index(user_id))
+
+    @staticmethod
+    def get_typed_answers(user_id):
+        """Пишет ли пользователь ответы сам (режим /typing)
+
+        Обработчики читают флаг один раз за сессию и хранят в данных состояния.
+        """
         try:
-            query = """
-                INSERT INTO users (user_id, username, first_name) 
-                VALUES (%s, %s, %s)
-                ON CONFLICT (user_id) DO NOTHING
-            """
-            db.cursor.execute(query, (user_id, username, first_name))
-            db.connection.commit()
-            logger.info(f"Пользователь {user_id} добавлен/обновлен")
-            return True
+            with Database(readonly=True, user_id=user_id) as db:
+                db.cursor.execute(queries.SELECT_TYPED_ANSWERS, (user_id,))
+                result = db.cursor.fetchone()
+            return bool(result and result['typed_answers'])
         except Exception as e:
-            logger.error(f"Ошибка создания пользователя: {e}")
-            db.connection.rollback()
+            logger.error(f"Ошибка получения режима ответа: {e}")
             return False
-        finally:
-            db.close()
 
     @staticmethod
-    def get_user_words_count(user_id):
-        """Получить количество слов у пользователя"""
-        db = Database()
+    def toggle_reminders(user_id):
+        """Переключить ежедневные напоминания; новое значение или None при ошибке"""
+        try:
+            user_registry.ensure_user(user_id)
+            with Database() as db:
+                db.cursor.execute(queries.TOGGLE_REMINDERS, (user_id,))
+                result = db.cursor.fetchone()
+            return result['reminders'] if result else None
+        except Exception as e:
+            logger.error(f"Ошибка переключения напоминаний: {e}")
+            return None
+
+    @staticmethod
+    def set_typed_answers(user_id, enabled):
+        """Включить или выключить режим ответа вводом текста"""
         try:
-            # Считаем общие слова + персональные слова пользователя
-            query = """
-                SELECT COUNT(DISTINCT w.word_id) as count
-                FROM words w
-                LEFT JOIN user_words uw ON w.word_id = uw.word_id AND uw.user_id = %s
-                WHERE w.is_default = TRUE OR uw.user_id = %s
-            """
-            db.cursor.execute(query, (user_id, user_id))
-            result = db.cursor.fetchone()
-            return result['count'] if result else 0
+            user_registry.ensure_user(user_id)
+            with Database() as db:
+                db.cursor.execute(queries.UPDATE_TYPED_ANSWERS, (enabled, user_id))
+            router.record_write(user_id)
+            return True
         except Exception as e:
-            logger.error(f"Ошибка получения количества слов: {e}")
-            return 0
-        finally:
-            db.close()
+            logger.error(f"Ошибка сохранения режима ответа: {e}")
+            return False
 
 
 class WordManager:
     """Класс для работы со словами"""
 
     @staticmethod
-    def get_available_words(user_id):
-        """Получить все доступные слова для пользователя"""
-        db = Database()
+    def get_default_words():
+        """Получить общие слова (из кэша или БД)"""
+        words = vocabulary_cache.get_default_words()
+        if words is not None:
+            return words
+
+        version = vocabulary_cache.version
         try:
-            query = """
-                SELECT DISTINCT w.word_id, w.english_word, w.russian_word, w.is_default
-                FROM words w
-                LEFT JOIN user_words uw ON w.word_id = uw.word_id AND uw.user_id = %s
-                WHERE w.is_default = TRUE OR uw.user_id = %s
-            """
-            db.cursor.execute(query, (user_id, user_id))
-            words = db.cursor.fetchall()
+            with Database(readonly=True) as db:
+                db.cursor.execute(queries.SELECT_DEFAULT_WORDS)
+                words = WordList(db.cursor.fetchall())
+        except Exception as e:
+            logger.error(f"Ошибка получения общих слов: {e}")
+            return WordList()
+
+        vocabulary_cache.set_default_words(words, version)
+        return words
+
+    @staticmethod
+    def get_user_extra_words(user_id):
+        """Получить слова из словаря пользователя сверх общих (из кэша или БД)"""
+        words = vocabulary_cache.get_user_words(user_id)
+        if words is not None:
             return words
+
+        version = vocabulary_cache.version
+        try:
+            with Database(readonly=True, user_id=user_id) as db:
+                db.cursor.execute(queries.SELECT_USER_EXTRA_WORDS, (user_id,))
+                words = WordList(db.cursor.fetchall())
         except Exception as e:
-            logger.error(f"Ошибка получения слов: {e}")
-            return []
-        finally:
-            db.close()
+            logger.error(f"Ошибка получения слов пользователя: {e}")
+            return WordList()
+
+        vocabulary_cache.set_user_words(user_id, words, version)
+        return words
+
+    @staticmethod
+    def get_available_words(user_id):
+        """Получить все доступные слова для пользователя"""
+        return list(WordManager.get_default_words()) + list(WordManager.get_user_extra_words(user_id))
+
+    @staticmethod
+    def get_word_index(user_id):
+        """Получить индекс доступных слов пользователя без копирования"""
+        return WordIndex(WordManager.get_default_words(), WordManager.get_user_extra_words(user_id))
 
     @staticmethod
-    def get_random_word_with_options(user_id):
-        """Получить случайное слово с вариантами ответов"""
-        available_words = WordManager.get_available_words(user_id)
+    def get_random_word_with_options(user_id, exclude_word_ids=()):
+        """Получить слово для повторения (или случайное) с вариантами ответов
 
-        if len(available_words) < 4:
+        exclude_word_ids - слова, которые уже ждут в заготовленных вопросах:
+        слово для повторения из них не берется повторно.
+        """
+        index = WordManager.get_word_index(user_id)
+        if len(index) < OPTIONS_COUNT:
             return None  # Недостаточно слов для игры
 
-        # Выбираем правильное слово
-        correct_word = random.choice(available_words)
+        # Сначала слово, которое пора повторить, иначе - случайное (в том числе новое)
+        correct_word = None
+        due_word_id = ReviewManager.get_due_word_id(user_id)
+        if due_word_id is not None and due_word_id not in exclude_word_ids:
+            correct_word = index.find(due_word_id)
+        if correct_word is None:
+            correct_word = index[random.randrange(len(index))]
 
-        # Выбираем 3 других слова как неправильные варианты
-        other_words = [w for w in available_words if w['word_id'] != correct_word['word_id']]
-        wrong_options = random.sample(other_words, min(3, len(other_words)))
+        # Неправильные варианты - из похожих на правильное слов
+        neighbour_ids = WordManager.get_neighbour_ids(correct_word['word_id'])
+        return sample_question(index, correct_word, neighbour_ids=neighbour_ids)
 
-        # Создаем список всех вариантов и перемешиваем
-        all_options = [correct_word] + wrong_options
-        random.shuffle(all_options)
+    @staticmethod
+    def get_neighbour_ids(word_id):
+        """Получить ID похожих слов по убыванию похожести (из кэша или БД)
+
+        Списки заранее считает neighbours_cli.py; пока их нет, список пуст
+        и варианты ответа выбираются случайно.
+        """
+        neighbour_ids = neighbour_cache.get(word_id)
+        if neighbour_ids is not None:
+            return neighbour_ids
+
+        try:
+            with Database(readonly=True) as db:
+                db.cursor.execute(queries.SELECT_WORD_NEIGHBOURS, (word_id,))
+                neighbour_ids = tuple(row['neighbour_id'] for row in db.cursor.fetchall())
+        except Exception as e:
+            logger.error(f"Ошибка получения похожих слов: {e}")
+            return ()
 
-        return {
-            'correct_word': correct_word,
-            'all_options': all_options,
-            'russian_word': correct_word['russian_word']
-        }
+        neighbour_cache.set(word_id, neighbour_ids)
+        return neighbour_ids
+
+    @staticmethod
+    def next_question(user_id):
+        """Следующий вопрос: заготовленный (см. database/prefetch.py) или подобранный сейчас"""
+        question = question_prefetcher.take(user_id)
+        if question is None:
+            question = WordManager.get_random_word_with_options(user_id)
+        return question
 
     @staticmethod
     def add_user_word(user_id, english_word, russian_word):
-        """Добавить персональное слово пользователя"""
-        db = Database()
+        """Добавить слово в словарь пользователя
+
+        Если такое английское слово уже есть (например, его добавил другой
+        пользователь), в словарь попадает существующая строка с ее переводом.
+        Возвращает строку слова (word_id, english_word, russian_word, ...) или None.
+        """
+        params = {'english_word': english_word, 'russian_word': russian_word, 'user_id': user_id}
         try:
-            # Сначала добавляем слово в таблицу words
-            query_word = """
-                INSERT INTO words (english_word, russian_word, is_default, created_by)
-                VALUES (%s, %s, FALSE, %s)
-                RETURNING word_id
-            """
-            db.cursor.execute(query_word, (english_word, russian_word, user_id))
-            result = db.cursor.fetchone()
-
-            if result:
-                word_id = result['word_id']
-
-                # Затем добавляем связь в user_words
-                query_user_word = """
-                    INSERT INTO user_words (user_id, word_id)
-                    VALUES (%s, %s)
-                    ON CONFLICT (user_id, word_id) DO NOTHING
-                """
-                db.cursor.execute(query_user_word, (user_id, word_id))
-                db.connection.commit()
-
-                logger.info(f"Слово '{english_word}' добавлено пользователю {user_id}")
-                return True
+            user_registry.ensure_user(user_id)
+            with Database() as db:
+                # Слово и связь с пользователем - одним запросом
+                db.cursor.execute(queries.ADD_USER_WORD, params)
+                word = db.cursor.fetchone()
+                if word is None:
+                    # Гонка с параллельной вставкой того же слова - повторяем с новым снимком
+                    db.cursor.execute(queries.ADD_USER_WORD, params)
+                    word = db.cursor.fetchone()
 
-            return False
+            if not word:
+                return None
+
+            router.record_write(user_id)
+            question_prefetcher.invalidate(user_id)
+            if word['linked']:
+                vocabulary_cache.add_user_word(user_id, {
+                    'word_id': word['word_id'],
+                    'english_word': word['english_word'],
+                    'russian_word': word['russian_word'],
+                    'is_default': False
+                })
+            logger.info(f"Слово '{english_word}' добавлено пользователю {user_id}")
+            return word
 
         except Exception as e:
             logger.error(f"Ошибка добавления слова: {e}")
-            db.connection.rollback()
-            return False
-        finally:
-            db.close()
+            return None
 
     @staticmethod
-    def get_user_personal_words(user_id):
-        """Получить персональные слова пользователя"""
-        db = Database()
+    def get_personal_words_page(user_id, prefix='', after_id=None, before_id=None, limit=DELETE_PAGE_SIZE):
+        """Страница персональных слов по алфавиту (начинающихся с prefix)
+
+        after_id - следующая страница после этого слова, before_id - предыдущая перед ним,
+        без них - первая страница. Возвращает {'words', 'has_prev', 'has_next'}.
+        """
+        backward = before_id is not None
+        params = queries.personal_page_params(
+            user_id, prefix, before_id if backward else after_id, limit + 1
+        )
         try:
-            query = """
-                SELECT w.word_id, w.english_word, w.russian_word
-                FROM words w
-                JOIN user_words uw ON w.word_id = uw.word_id
-                WHERE uw.user_id = %s AND w.created_by = %s
-                ORDER BY w.english_word
-            """
-            db.cursor.execute(query, (user_id, user_id))
-            words = db.cursor.fetchall()
-            return words
+            with Database(readonly=True, user_id=user_id) as db:
+                db.cursor.execute(
+                    queries.SELECT_PERSONAL_WORDS_BEFORE if backward else queries.SELECT_PERSONAL_WORDS_AFTER,
+                    params
+                )
+                rows = db.cursor.fetchall()
         except Exception as e:
             logger.error(f"Ошибка получения персональных слов: {e}")
-            return []
-        finally:
-            db.close()
+            rows = []
+        return queries.personal_page(rows, limit, backward, after_id is not None)
 
     @staticmethod
     def delete_user_word(user_id, word_id):
         """Удалить персональное слово пользователя"""
-        db = Database()
         try:
-            # Сначала удаляем связь из user_words
-            query_user_words = """
-                DELETE FROM user_words 
-                WHERE user_id = %s AND word_id = %s
-            """
-            db.cursor.execute(query_user_words, (user_id, word_id))
-
-            # Затем удаляем само слово (только если оно персональное)
-            query_word = """
-                DELETE FROM words 
-                WHERE word_id = %s AND created_by = %s AND is_default = FALSE
-            """
-            db.cursor.execute(query_word, (word_id, user_id))
-            db.connection.commit()
+            with Database() as db:
+                # Связь и (если больше никому не нужно) само слово - одним запросом
+                db.cursor.execute(queries.REMOVE_USER_WORD, {'user_id': user_id, 'word_id': word_id})
 
+            router.record_write(user_id)
+            question_prefetcher.invalidate(user_id)
+            vocabulary_cache.remove_user_word(user_id, word_id)
             logger.info(f"Слово {word_id} удалено у пользователя {user_id}")
             return True
 
         except Exception as e:
             logger.error(f"Ошибка удаления слова: {e}")
-            db.connection.rollback()
             return False
-        finally:
-            db.close()
\ No newline at end of file
+
+
+class ReviewManager:
+    """Класс для интервального повторения слов (упрощенный SM-2)"""
+
+    @staticmethod
+    def record_answer(user_id, word_id, is_correct):
+        """Сохранить ответ и пересчитать, когда слово нужно повторить
+
+        В журнал для /stats ответ попадает через буфер answer_log, без запроса к БД.
+        """
+        answer_log.record(user_id, word_id, is_correct)
+        try:
+            user_registry.ensure_user(user_id)
+            with Database() as db:
+                db.cursor.execute(
+                    queries.UPSERT_REVIEW,
+                    queries.review_params(user_id, word_id, is_correct)
+                )
+            router.record_write(user_id)
+            # Заготовки пересчитываются уже с новым сроком повторения слова
+            question_prefetcher.answered(user_id, word_id)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка сохранения ответа: {e}")
+            return False
+
+    @staticmethod
+    def get_due_word_id(user_id):
+        """Получить word_id слова, которое пора повторить (или None)"""
+        try:
+            with Database(readonly=True, user_id=user_id) as db:
+                db.cursor.execute(queries.SELECT_DUE_WORD, (user_id,))
+                result = db.cursor.fetchone()
+            return result['word_id'] if result else None
+        except Exception as e:
+            logger.error(f"Ошибка получения слова для повторения: {e}")
+            return None
+
+
+class StatsManager:
+    """Класс для статистики ответов (/stats)"""
+
+    @staticmethod
+    def get_user_stats(user_id, hardest_limit=STATS_HARDEST_WORDS):
+        """Итоги пользователя и самые трудные слова
+
+        Возвращает {'stats': строка user_stats или None, 'hardest': [...]}.
+        Сначала дописываются ответы пользователя, еще лежащие в буфере.
+        """
+        answer_log.ensure_flushed(user_id)
+        try:
+            with Database(readonly=True, user_id=user_id) as db:
+                db.cursor.execute(queries.SELECT_USER_STATS, (user_id,))
+                stats = db.cursor.fetchone()
+                db.cursor.execute(queries.SELECT_HARDEST_WORDS, (user_id, hardest_limit))
+                hardest = db.cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Ошибка получения статистики: {e}")
+            return None
+        return {'stats': stats, 'hardest': hardest}
@@ -0,0 +1,212 @@
+"""
+Похожие слова для неправильных вариантов ответа
+
+Случайные неправильные варианты угадываются слишком легко: рядом с «cat» стоят
+«window» и «happiness». Здесь для каждого слова заранее находятся NEIGHBOURS_TOP_K
+самых похожих по написанию и сохраняются в word_neighbours. Выбор вопроса только
+читает готовый список (запрос по первичному ключу и кэш, см. WordManager.get_neighbour_ids) -
+на пути ответа пользователю похожесть не считается.
+
+Похожесть считается векторно в NumPy сразу для блока слов против всего словаря:
+- общие триграммы - коэффициент Жаккара по 128-битной хэш-маске триграмм;
+- длина общего префикса;
+- разница длин.
+
+Кандидаты в соседи слова - общие слова и слова того же автора (чужое персональное
+слово в вопрос пользователю все равно не попадет), кроме слов с тем же переводом:
+«color» и «colour» в одном вопросе - два верных ответа.
+
+build_all пересчитывает все списки, update досчитывает слова без списка и вставляет
+их в уже посчитанные списки соседей. Запуск - python neighbours_cli.py build|update.
+numpy нужен только этому заданию: бот модуль не импортирует.
+"""
+import io
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from config import NEIGHBOURS_TOP_K, NEIGHBOURS_BLOCK_SIZE
+from database.db_config import Database
+from database import queries
+import logging
+
+logger = logging.getLogger(__name__)
+
+WORD_LENGTH = 32  # Более длинные слова обрезаются
+PREFIX_LENGTH = 16  # Общий префикс длиннее этого не различается
+TRIGRAM_BITS = 128
+
+# Веса признаков в итоговой похожести (в сумме 1)
+TRIGRAM_WEIGHT = 0.5
+PREFIX_WEIGHT = 0.3
+LENGTH_WEIGHT = 0.2
+
+_START, _END = 1, 2  # Коды маркеров начала и конца слова для триграмм
+_NO_AUTHOR = -1
+
+
+class WordFeatures:
+    """Признаки всех слов словаря в массивах NumPy: строка i - слово word_ids[i]"""
+
+    def __init__(self, words):
+        """words - строки SELECT_WORDS_FOR_NEIGHBOURS"""
+        count = len(words)
+        self.word_ids = np.array([w['word_id'] for w in words], dtype=np.int64)
+        self.position = {word_id: i for i, word_id in enumerate(self.word_ids.tolist())}
+        self.is_default = np.array([bool(w['is_default']) for w in words], dtype=bool)
+        self.created_by = np.array(
+            [_NO_AUTHOR if w['created_by'] is None else w['created_by'] for w in words], dtype=np.int64
+        )
+        translations = [w['russian_word'].strip().lower() for w in words]
+        self.translations = np.unique(np.array(translations, dtype=str), return_inverse=True)[1]
+
+        english = np.array([w['english_word'].strip().lower() for w in words], dtype=f'<U{WORD_LENGTH}')
+        codes = english.view(np.uint32).reshape(count, WORD_LENGTH)
+        self.lengths = np.char.str_len(english)
+        self.prefixes = codes[:, :PREFIX_LENGTH].copy()
+
+        # Триграммы с маркерами краев: у слова длины n их ровно n
+        padded = np.zeros((count, WORD_LENGTH + 2), dtype=np.uint64)
+        padded[:, 0] = _START
+        padded[:, 1:-1] = codes
+        padded[np.arange(count), self.lengths + 1] = _END
+        mixed = (padded[:, :-2] * 961 + padded[:, 1:-1] * 31 + padded[:, 2:]) * 2654435761
+        hashes = (mixed & 0xFFFFFFFF) >> 25  # Старшие 7 бит из 32 - номер бита 0..127
+        valid = np.arange(WORD_LENGTH) < self.lengths[:, None]
+        bits = np.zeros((count, TRIGRAM_BITS), dtype=bool)
+        bits[np.nonzero(valid)[0], hashes[valid]] = True
+        self.trigrams = np.packbits(bits, axis=1).view(np.uint64)
+        self.trigram_counts = np.bitwise_count(self.trigrams).sum(axis=1)
+
+    def __len__(self):
+        return len(self.word_ids)
+
+    def similarity(self, rows):
+        """Похожесть слов rows на все слова словаря: массив (len(rows), len(self)) от 0 до 1"""
+        shared = np.bitwise_count(self.trigrams[rows, None, :] & self.trigrams[None, :, :]).sum(axis=2)
+        union = self.trigram_counts[rows, None] + self.trigram_counts[None, :] - shared
+        trigram = shared / np.maximum(union, 1)
+
+        mismatch = self.prefixes[rows, None, :] != self.prefixes[None, :, :]
+        prefix = np.where(mismatch.any(axis=2), mismatch.argmax(axis=2), PREFIX_LENGTH)
+        shorter = np.minimum(self.lengths[rows, None], self.lengths[None, :])
+        longer = np.maximum(np.maximum(self.lengths[rows, None], self.lengths[None, :]), 1)
+        prefix = np.minimum(prefix, shorter)
+
+        score = (TRIGRAM_WEIGHT * trigram + PREFIX_WEIGHT * prefix / longer
+                 + LENGTH_WEIGHT * (1 - (longer - shorter) / longer))
+        return score.astype(np.float32)
+
+    def candidates(self, rows):
+        """Кто может быть соседом слов rows: маска (len(rows), len(self))"""
+        mask = self.is_default[None, :] | (self.created_by[None, :] == self.created_by[rows, None])
+        mask &= self.translations[None, :] != self.translations[rows, None]
+        mask[np.arange(len(rows)), rows] = False
+        return mask
+
+    def owners(self, rows):
+        """Для кого слова rows - кандидаты в соседи: маска (len(rows), len(self))
+
+        Обратное к candidates отношение: общее слово годится всем, персональное - словам автора.
+        """
+        mask = self.is_default[rows, None] | (self.created_by[None, :] == self.created_by[rows, None])
+        mask &= self.translations[None, :] != self.translations[rows, None]
+        mask[np.arange(len(rows)), rows] = False
+        return mask
+
+
+def top_neighbours(features, rows, scores, top_k):
+    """Лучшие соседи слов rows по матрице похожести scores: строки (word_id, neighbour_id, score)"""
+    scores = np.where(features.candidates(rows), scores, -1)
+    top_k = min(top_k, scores.shape[1])
+    if top_k == 0:
+        return []
+    top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+
+    result = []
+    for row, positions, row_scores in zip(rows.tolist(), top.tolist(), top_scores.tolist()):
+        word_id = int(features.word_ids[row])
+        for position, score in zip(positions, row_scores):
+            if score >= 0:
+                result.append((word_id, int(features.word_ids[position]), round(score, 4)))
+    return result
+
+
+def load_features():
+    """Загрузить все слова и посчитать их признаки"""
+    with Database() as db:
+        db.cursor.execute(queries.SELECT_WORDS_FOR_NEIGHBOURS)
+        words = db.cursor.fetchall()
+    return WordFeatures(words)
+
+
+def _blocks(rows, block_size):
+    for start in range(0, len(rows), block_size):
+        yield rows[start:start + block_size]
+
+
+def build_all(top_k=NEIGHBOURS_TOP_K, block_size=NEIGHBOURS_BLOCK_SIZE):
+    """Пересчитать соседей всех слов. Возвращает число записанных строк
+
+    Все списки считаются в памяти до записи, а замена - одна транзакция
+    TRUNCATE + COPY: бот читает либо старые списки, либо новые.
+    """
+    features = load_features()
+    buffer = io.StringIO()
+    rows_count = 0
+    for rows in _blocks(np.arange(len(features)), block_size):
+        for word_id, neighbour_id, score in top_neighbours(features, rows, features.similarity(rows), top_k):
+            buffer.write(f"{word_id}\t{neighbour_id}\t{score}\n")
+            rows_count += 1
+
+    buffer.seek(0)
+    with Database() as db:
+        db.cursor.execute(queries.TRUNCATE_WORD_NEIGHBOURS)
+        db.cursor.copy_expert(queries.COPY_WORD_NEIGHBOURS, buffer)
+    logger.info(f"Соседи пересчитаны: слов {len(features)}, строк {rows_count}")
+    return rows_count
+
+
+def update(top_k=NEIGHBOURS_TOP_K, block_size=NEIGHBOURS_BLOCK_SIZE):
+    """Досчитать соседей слов без списка. Возвращает (число таких слов, число записанных строк)
+
+    Похожесть симметрична, поэтому та же матрица дает и обратное: новое слово
+    попадает в список старого, если оно похоже сильнее его последнего соседа.
+    Удаленные слова уходят из списков каскадно, и списки укорачиваются - их
+    дополняют следующие новые слова или полный build_all.
+    """
+    features = load_features()
+    with Database() as db:
+        db.cursor.execute(queries.SELECT_WORDS_WITHOUT_NEIGHBOURS)
+        # Слова, добавленные после load_features, досчитает следующий запуск
+        new_rows = [features.position[row['word_id']] for row in db.cursor.fetchall()
+                    if row['word_id'] in features.position]
+        if not new_rows:
+            return 0, 0
+        db.cursor.execute(queries.SELECT_NEIGHBOUR_THRESHOLDS, (top_k,))
+        thresholds = np.full(len(features), np.inf, dtype=np.float32)
+        for row in db.cursor.fetchall():
+            position = features.position.get(row['word_id'])
+            if position is not None:
+                thresholds[position] = row['threshold']
+
+    new_rows = np.array(sorted(new_rows))
+    thresholds[new_rows] = np.inf  # Списки новых слов считаются целиком, а не дополняются
+    result = []
+    for rows in _blocks(new_rows, block_size):
+        scores = features.similarity(rows)
+        result.extend(top_neighbours(features, rows, scores, top_k))
+
+        better = features.owners(rows) & (scores > thresholds[None, :])
+        for row, position in zip(*np.nonzero(better)):
+            result.append((int(features.word_ids[position]), int(features.word_ids[rows[row]]),
+                           round(float(scores[row, position]), 4)))
+
+    if result:
+        changed = sorted({row[0] for row in result})
+        with Database() as db:
+            execute_values(db.cursor, queries.UPSERT_WORD_NEIGHBOURS, result, page_size=1000)
+            db.cursor.execute(queries.TRIM_WORD_NEIGHBOURS, (changed, top_k))
+    logger.info(f"Соседи досчитаны: новых слов {len(new_rows)}, строк {len(result)}")
+    return len(new_rows), len(result)
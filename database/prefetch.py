@@ -0,0 +1,193 @@
+"""
+Заранее подготовленные вопросы для активных пользователей
+
+У каждого недавно игравшего пользователя есть короткое кольцо готовых вопросов
+(правильное слово + варианты). «Дальше ⏭» берет вопрос из кольца, а фоновые
+потоки сразу готовят следующий - выбор слова (в том числе запрос слова для
+повторения) уходит с пути ответа пользователю.
+
+Кольцо сбрасывается при изменении словаря пользователя (invalidate), а после
+ответа из него убираются вопросы на только что отвеченное слово: срок его
+повторения изменился. Результаты заготовки, начатой до сброса или ответа,
+отбрасываются по номеру поколения.
+
+В asyncio-боте кольца пополняют задачи его event loop через AsyncWordManager
+(use_event_loop), а не потоки: иначе рядом с асинхронным пулом psycopg 3
+открылся бы второй, синхронный пул psycopg2.
+"""
+from collections import OrderedDict, deque
+import asyncio
+import queue
+import threading
+
+from config import PREFETCH_ENABLED, PREFETCH_DEPTH, PREFETCH_WORKERS, PREFETCH_MAX_USERS
+from metrics import registry
+import logging
+
+logger = logging.getLogger(__name__)
+
+_hits = registry.counter('prefetch_hits_total', "Вопросы, выданные из заготовленных")
+_misses = registry.counter('prefetch_misses_total', "Вопросы, подобранные на пути ответа")
+
+
+class QuestionPrefetcher:
+    """Кольца заготовленных вопросов и фоновые потоки, которые их пополняют"""
+
+    def __init__(self, depth=PREFETCH_DEPTH, workers=PREFETCH_WORKERS, max_users=PREFETCH_MAX_USERS,
+                 enabled=PREFETCH_ENABLED):
+        self._depth = depth
+        self._workers = workers
+        self._max_users = max_users
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._rings = OrderedDict()  # user_id -> deque вопросов, по давности использования
+        self._generations = {}  # user_id -> номер поколения кольца
+        self._queued = set()  # Пользователи, ждущие пополнения
+        self._requests = queue.Queue()
+        self._threads = []
+        self._loop = None  # event loop asyncio-бота (use_event_loop)
+        self._async_generate = None
+        self._semaphore = None
+        self._tasks = set()
+
+    def use_event_loop(self, generate):
+        """Пополнять кольца задачами текущего event loop: generate - корутина
+        generate(user_id, exclude_word_ids=...), как AsyncWordManager.get_random_word_with_options.
+        Одновременно работает не больше workers задач.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._async_generate = generate
+        self._semaphore = asyncio.Semaphore(self._workers)
+
+    def take(self, user_id):
+        """Взять готовый вопрос (None, если кольцо пусто) и заказать пополнение"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            ring = self._rings.get(user_id)
+            question = ring.popleft() if ring else None
+            if ring is not None:
+                self._rings.move_to_end(user_id)
+        (_hits if question is not None else _misses).inc()
+        self.request(user_id)
+        return question
+
+    def request(self, user_id):
+        """Заказать пополнение кольца пользователя в фоне"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if user_id in self._queued:
+                return
+            self._queued.add(user_id)
+            if self._loop is None:
+                self._start_threads()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._start_task, user_id)
+        else:
+            self._requests.put(user_id)
+
+    def answered(self, user_id, word_id):
+        """Пользователь ответил на слово: убрать вопросы с ним и пополнить кольцо"""
+        with self._lock:
+            ring = self._rings.get(user_id)
+            if ring is None:
+                return
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            kept = [question for question in ring if question['correct_word']['word_id'] != word_id]
+            ring.clear()
+            ring.extend(kept)
+        self.request(user_id)
+
+    def invalidate(self, user_id):
+        """Словарь пользователя изменился: заготовленные вопросы больше не годятся"""
+        with self._lock:
+            if user_id not in self._rings:
+                return
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._rings[user_id].clear()
+
+    def clear(self):
+        """Сбросить кольца всех пользователей (изменились общие слова)"""
+        with self._lock:
+            for user_id in self._rings:
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._rings.clear()
+
+    def _start_threads(self):
+        while len(self._threads) < self._workers:
+            thread = threading.Thread(
+                target=self._worker_loop, name=f'question-prefetch-{len(self._threads)}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker_loop(self):
+        from database.models import WordManager  # models сами импортируют этот модуль
+
+        while True:
+            user_id = self._requests.get()
+            with self._lock:
+                self._queued.discard(user_id)
+            try:
+                self._fill(user_id, WordManager.get_random_word_with_options)
+            except Exception as e:
+                logger.error(f"Ошибка заготовки вопроса для {user_id}: {e}")
+
+    def _start_task(self, user_id):
+        task = self._loop.create_task(self._refill(user_id))
+        self._tasks.add(task)  # Ссылка нужна, чтобы задачу не собрал сборщик мусора
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refill(self, user_id):
+        async with self._semaphore:
+            with self._lock:
+                self._queued.discard(user_id)
+            try:
+                while True:
+                    slot = self._next_slot(user_id)
+                    if slot is None:
+                        return
+                    question = await self._async_generate(user_id, exclude_word_ids=slot[2])
+                    if not self._store(user_id, slot, question):
+                        return
+            except Exception as e:
+                logger.error(f"Ошибка заготовки вопроса для {user_id}: {e}")
+
+    def _fill(self, user_id, generate):
+        while True:
+            slot = self._next_slot(user_id)
+            if slot is None:
+                return
+            question = generate(user_id, exclude_word_ids=slot[2])
+            if not self._store(user_id, slot, question):
+                return
+
+    def _next_slot(self, user_id):
+        """(кольцо, поколение, word_id в кольце), если кольцо нужно пополнить, иначе None"""
+        with self._lock:
+            ring = self._rings.get(user_id)
+            if ring is None:
+                ring = self._rings[user_id] = deque()
+                while len(self._rings) > self._max_users:
+                    evicted, _ = self._rings.popitem(last=False)
+                    self._generations.pop(evicted, None)
+            if len(ring) >= self._depth:
+                return None
+            exclude = {question['correct_word']['word_id'] for question in ring}
+            return ring, self._generations.get(user_id, 0), exclude
+
+    def _store(self, user_id, slot, question):
+        """Положить вопрос в кольцо; False - пополнять дальше не нужно"""
+        if question is None:
+            return False  # Слов для игры не хватает
+        ring, generation, _ = slot
+        with self._lock:
+            if self._generations.get(user_id, 0) != generation or self._rings.get(user_id) is not ring:
+                return False  # Кольцо сбросили, пока готовили вопрос - его пополнит следующий заказ
+            ring.append(question)
+            return True
+
+
+# Общие для sync и async моделей заготовки вопросов процесса
+question_prefetcher = QuestionPrefetcher()
@@ -0,0 +1,498 @@
+"""
+SQL-запросы бота
+
+Общие для синхронных (psycopg2) и асинхронных (psycopg 3) моделей:
+оба драйвера понимают параметры в стиле %s и %(name)s.
+"""
+from config import (
+    REVIEW_INITIAL_EASE, REVIEW_MIN_EASE, REVIEW_EASE_BONUS, REVIEW_EASE_PENALTY,
+    REVIEW_FIRST_INTERVAL_DAYS, REVIEW_SECOND_INTERVAL_DAYS, REVIEW_RELEARN_MINUTES
+)
+
+# Пользователи
+# Пакетный upsert для psycopg2.extras.execute_values (см. database/registration.py):
+# строка переписывается, только если username или имя действительно изменились
+UPSERT_USERS = """
+    INSERT INTO users (user_id, username, first_name)
+    VALUES %s
+    ON CONFLICT (user_id) DO UPDATE SET
+        username = EXCLUDED.username,
+        first_name = EXCLUDED.first_name
+    WHERE users.username IS DISTINCT FROM EXCLUDED.username
+       OR users.first_name IS DISTINCT FROM EXCLUDED.first_name
+"""
+
+# Режим ответа (/typing, sql/migrations/005_typed_answers.sql)
+SELECT_TYPED_ANSWERS = "SELECT typed_answers FROM users WHERE user_id = %s"
+
+UPDATE_TYPED_ANSWERS = "UPDATE users SET typed_answers = %s WHERE user_id = %s"
+
+# Напоминания (/reminders, sql/migrations/006_broadcasts.sql): переключение одним запросом
+TOGGLE_REMINDERS = "UPDATE users SET reminders = NOT reminders WHERE user_id = %s RETURNING reminders"
+
+# Слова
+SELECT_DEFAULT_WORDS = """
+    SELECT w.word_id, w.english_word, w.russian_word, w.is_default
+    FROM words w
+    WHERE w.is_default = TRUE
+"""
+
+SELECT_USER_EXTRA_WORDS = """
+    SELECT w.word_id, w.english_word, w.russian_word, w.is_default
+    FROM words w
+    JOIN user_words uw ON w.word_id = uw.word_id
+    WHERE uw.user_id = %s AND w.is_default = FALSE
+"""
+
+# Все доступные пользователю слова одним запросом: ветки не пересекаются
+# (is_default TRUE/FALSE), поэтому UNION ALL без DISTINCT, и у каждой ветки
+# свой покрывающий индекс (sql/migrations/001_covering_indexes.sql).
+# Кэш словаря загружает ветки по отдельности и хранит их независимо.
+SELECT_AVAILABLE_WORDS = SELECT_DEFAULT_WORDS + "    UNION ALL" + SELECT_USER_EXTRA_WORDS
+
+# Страницы персональных слов для удаления (keyset по english_word).
+# Страница строится по словарю пользователя (user_words), а не по автору слова:
+# в нем есть и слова, добавленные раньше другими пользователями. Связи читаются
+# по UNIQUE (user_id, word_id), слова - по idx_words_personal_cover, и сортируются
+# только слова этого пользователя с нужным началом (top-N до LIMIT).
+# Якорь - word_id крайнего слова соседней страницы: в callback_data Telegram
+# помещается только 64 байта, само слово туда не влезет
+SELECT_PERSONAL_WORDS_AFTER = """
+    SELECT w.word_id, w.english_word, w.russian_word
+    FROM user_words uw
+    JOIN words w ON w.word_id = uw.word_id
+    WHERE uw.user_id = %(user_id)s AND w.is_default = FALSE
+      AND w.english_word COLLATE "C" >= %(prefix)s
+      AND w.english_word COLLATE "C" < %(prefix_end)s
+      AND w.english_word COLLATE "C" > COALESCE(
+          (SELECT a.english_word FROM words a WHERE a.word_id = %(anchor_id)s), '')
+    ORDER BY w.english_word COLLATE "C"
+    LIMIT %(limit)s
+"""
+
+SELECT_PERSONAL_WORDS_BEFORE = """
+    SELECT w.word_id, w.english_word, w.russian_word
+    FROM user_words uw
+    JOIN words w ON w.word_id = uw.word_id
+    WHERE uw.user_id = %(user_id)s AND w.is_default = FALSE
+      AND w.english_word COLLATE "C" >= %(prefix)s
+      AND w.english_word COLLATE "C" < %(prefix_end)s
+      AND w.english_word COLLATE "C" < COALESCE(
+          (SELECT a.english_word FROM words a WHERE a.word_id = %(anchor_id)s), %(prefix_end)s)
+    ORDER BY w.english_word COLLATE "C" DESC
+    LIMIT %(limit)s
+"""
+
+# Добавление слова в словарь пользователя за один запрос.
+# Слово с таким english_word уже может быть (общее или добавленное другим
+# пользователем) - тогда переиспользуем его строку с ее переводом, а не падаем
+# на UNIQUE. Общие слова и так есть у всех, их не связываем.
+# Пустой результат возможен только в гонке с параллельной вставкой того же
+# слова: строка закоммичена после снимка запроса - достаточно повторить.
+ADD_USER_WORD = """
+    WITH new_word AS (
+        INSERT INTO words (english_word, russian_word, is_default, created_by)
+        VALUES (%(english_word)s, %(russian_word)s, FALSE, %(user_id)s)
+        ON CONFLICT (english_word) DO NOTHING
+        RETURNING word_id, english_word, russian_word, is_default
+    ),
+    word AS (
+        SELECT word_id, english_word, russian_word, is_default FROM new_word
+        UNION ALL
+        SELECT word_id, english_word, russian_word, is_default
+        FROM words
+        WHERE english_word = %(english_word)s AND NOT EXISTS (SELECT 1 FROM new_word)
+    ),
+    link AS (
+        INSERT INTO user_words (user_id, word_id)
+        SELECT %(user_id)s, word_id FROM word WHERE is_default = FALSE
+        ON CONFLICT (user_id, word_id) DO NOTHING
+        RETURNING word_id
+    )
+    SELECT word_id, english_word, russian_word, is_default,
+           EXISTS (SELECT 1 FROM link) AS linked
+    FROM word
+"""
+
+# Удаление слова из словаря пользователя за один запрос: связь и состояние
+# повторения пользователя удаляются всегда, а само слово - только если оно
+# персональное, добавлено этим пользователем и больше ни у кого не в словаре
+# (в снимке запроса своя связь еще видна)
+REMOVE_USER_WORD = """
+    WITH unlinked AS (
+        DELETE FROM user_words
+        WHERE user_id = %(user_id)s AND word_id = %(word_id)s
+        RETURNING word_id
+    ),
+    forgotten AS (
+        DELETE FROM word_reviews r
+        USING unlinked u
+        WHERE r.user_id = %(user_id)s AND r.word_id = u.word_id
+    )
+    DELETE FROM words w
+    USING unlinked u
+    WHERE w.word_id = u.word_id AND w.created_by = %(user_id)s AND w.is_default = FALSE
+      AND NOT EXISTS (
+          SELECT 1 FROM user_words uw WHERE uw.word_id = w.word_id AND uw.user_id <> %(user_id)s
+      )
+"""
+
+# Интервальное повторение (упрощенный SM-2).
+# Новое состояние считается прямо в upsert, без предварительного чтения.
+# Интервал после верного ответа: первый, второй, затем прошлый * ease
+UPSERT_REVIEW = """
+    INSERT INTO word_reviews AS r
+        (user_id, word_id, ease, interval_days, repetitions, due_at, last_reviewed_at)
+    VALUES (
+        %(user_id)s, %(word_id)s,
+        GREATEST(%(min_ease)s, %(initial_ease)s +
+            CASE WHEN %(correct)s THEN %(ease_bonus)s ELSE 0 - %(ease_penalty)s END),
+        CASE WHEN %(correct)s THEN %(first_interval)s ELSE 0 END,
+        CASE WHEN %(correct)s THEN 1 ELSE 0 END,
+        CASE WHEN %(correct)s
+            THEN NOW() + %(first_interval)s * INTERVAL '1 day'
+            ELSE NOW() + %(relearn_minutes)s * INTERVAL '1 minute'
+        END,
+        NOW()
+    )
+    ON CONFLICT (user_id, word_id) DO UPDATE SET
+        ease = GREATEST(%(min_ease)s, r.ease +
+            CASE WHEN %(correct)s THEN %(ease_bonus)s ELSE 0 - %(ease_penalty)s END),
+        interval_days = CASE
+            WHEN NOT %(correct)s THEN 0
+            WHEN r.repetitions = 0 THEN %(first_interval)s
+            WHEN r.repetitions = 1 THEN %(second_interval)s
+            ELSE r.interval_days * r.ease
+        END,
+        repetitions = CASE WHEN %(correct)s THEN r.repetitions + 1 ELSE 0 END,
+        due_at = CASE
+            WHEN NOT %(correct)s THEN NOW() + %(relearn_minutes)s * INTERVAL '1 minute'
+            WHEN r.repetitions = 0 THEN NOW() + %(first_interval)s * INTERVAL '1 day'
+            WHEN r.repetitions = 1 THEN NOW() + %(second_interval)s * INTERVAL '1 day'
+            ELSE NOW() + r.interval_days * r.ease * INTERVAL '1 day'
+        END,
+        last_reviewed_at = NOW()
+"""
+
+# Обслуживается индексом idx_word_reviews_due_cover (user_id, due_at).
+# Слово должно оставаться в словаре пользователя (своя связь в user_words или
+# общее слово): повторение удаленного слова не выдается, даже если его строка
+# в word_reviews осталась. Проверки - по UNIQUE (user_id, word_id) и idx_words_default_cover
+SELECT_DUE_WORD = """
+    SELECT r.word_id
+    FROM word_reviews r
+    WHERE r.user_id = %s AND r.due_at <= NOW()
+      AND (
+          EXISTS (SELECT 1 FROM user_words uw WHERE uw.user_id = r.user_id AND uw.word_id = r.word_id)
+          OR EXISTS (SELECT 1 FROM words w WHERE w.word_id = r.word_id AND w.is_default = TRUE)
+      )
+    ORDER BY r.due_at
+    LIMIT 1
+"""
+
+# Массовый импорт/экспорт словаря (database.bulk, только psycopg2: copy_expert).
+# Файл сначала копируется в import_words, затем нормализуется и сливается множествами
+IMPORT_CREATE_STAGING = """
+    CREATE TEMP TABLE import_words (
+        english_word TEXT,
+        russian_word TEXT
+    ) ON COMMIT DROP
+"""
+
+IMPORT_COPY = """
+    COPY import_words (english_word, russian_word)
+    FROM STDIN WITH (FORMAT csv, DELIMITER %s, HEADER %s, ENCODING 'UTF8')
+"""
+
+# Регистр обоих слов как у слов, добавленных через бота (str.title), дубликаты файла схлопываются
+IMPORT_NORMALIZE = """
+    CREATE TEMP TABLE import_clean ON COMMIT DROP AS
+    SELECT DISTINCT ON (english_word) english_word, russian_word
+    FROM (
+        SELECT initcap(btrim(english_word)) AS english_word, initcap(btrim(russian_word)) AS russian_word
+        FROM import_words
+    ) raw
+    WHERE english_word <> '' AND russian_word <> ''
+    ORDER BY english_word
+"""
+
+IMPORT_MERGE_WORDS = """
+    INSERT INTO words (english_word, russian_word, is_default, created_by)
+    SELECT english_word, russian_word, %(is_default)s, %(user_id)s
+    FROM import_clean
+    ON CONFLICT (english_word) DO NOTHING
+"""
+
+# Уже существующие слова тоже попадают в словарь пользователя.
+# Общие слова и так есть у всех - их не связываем (как в ADD_USER_WORD)
+IMPORT_LINK_USER_WORDS = """
+    INSERT INTO user_words (user_id, word_id)
+    SELECT %s, w.word_id
+    FROM import_clean i
+    JOIN words w ON w.english_word = i.english_word
+    WHERE w.is_default = FALSE
+    ON CONFLICT (user_id, word_id) DO NOTHING
+"""
+
+EXPORT_DEFAULT_WORDS = """
+    COPY (
+        SELECT english_word, russian_word
+        FROM words
+        WHERE is_default = TRUE
+        ORDER BY english_word
+    ) TO STDOUT WITH (FORMAT csv, DELIMITER %s, HEADER TRUE, ENCODING 'UTF8')
+"""
+
+EXPORT_USER_WORDS = """
+    COPY (
+        SELECT w.english_word, w.russian_word
+        FROM words w
+        JOIN user_words uw ON w.word_id = uw.word_id
+        WHERE uw.user_id = %s
+        ORDER BY w.english_word
+    ) TO STDOUT WITH (FORMAT csv, DELIMITER %s, HEADER TRUE, ENCODING 'UTF8')
+"""
+
+# Состояния диалогов (bot.storage.StatePostgresStorage).
+# Пакетные запросы рассчитаны на psycopg2.extras.execute_values
+SELECT_BOT_STATE = """
+    SELECT state, data
+    FROM bot_states
+    WHERE chat_id = %s AND user_id = %s AND updated_at > NOW() - %s * INTERVAL '1 second'
+"""
+
+UPSERT_BOT_STATES = """
+    INSERT INTO bot_states (chat_id, user_id, state, data)
+    VALUES %s
+    ON CONFLICT (chat_id, user_id) DO UPDATE SET
+        state = EXCLUDED.state,
+        data = EXCLUDED.data,
+        updated_at = NOW()
+"""
+
+DELETE_BOT_STATES = """
+    DELETE FROM bot_states b
+    USING (VALUES %s) AS v (chat_id, user_id)
+    WHERE b.chat_id = v.chat_id AND b.user_id = v.user_id
+"""
+
+# Обслуживается индексом idx_bot_states_updated_at
+PURGE_BOT_STATES = """
+    DELETE FROM bot_states
+    WHERE updated_at <= NOW() - %s * INTERVAL '1 second'
+"""
+
+
+def review_params(user_id, word_id, is_correct):
+    """Параметры для UPSERT_REVIEW"""
+    return {
+        'user_id': user_id,
+        'word_id': word_id,
+        'correct': bool(is_correct),
+        'initial_ease': REVIEW_INITIAL_EASE,
+        'min_ease': REVIEW_MIN_EASE,
+        'ease_bonus': REVIEW_EASE_BONUS,
+        'ease_penalty': REVIEW_EASE_PENALTY,
+        'first_interval': REVIEW_FIRST_INTERVAL_DAYS,
+        'second_interval': REVIEW_SECOND_INTERVAL_DAYS,
+        'relearn_minutes': REVIEW_RELEARN_MINUTES
+    }
+
+
+def personal_page_params(user_id, prefix, anchor_id, limit):
+    """Параметры для SELECT_PERSONAL_WORDS_AFTER/BEFORE
+
+    Слова с началом prefix в побайтовом порядке лежат в [prefix, prefix + U+10FFFF).
+    """
+    return {
+        'user_id': user_id,
+        'prefix': prefix,
+        'prefix_end': prefix + '\U0010FFFF',
+        'anchor_id': anchor_id,
+        'limit': limit
+    }
+
+
+def personal_page(rows, limit, backward, after_anchor):
+    """Страница из результата SELECT_PERSONAL_WORDS_AFTER/BEFORE (запрошено limit + 1 строк)"""
+    more = len(rows) > limit
+    words = list(rows[:limit])
+    if backward:
+        words.reverse()
+        return {'words': words, 'has_prev': more, 'has_next': True}
+    return {'words': words, 'has_prev': after_anchor, 'has_next': more}
+
+
+# Журнал ответов и статистика (database/answers.py, sql/migrations/003_answer_stats.sql)
+INSERT_ANSWERS = "INSERT INTO answers (user_id, word_id, correct, answered_at) VALUES %s"
+
+# Месячная секция журнала; имя подставляет answers_partition_params
+CREATE_ANSWERS_PARTITION = """
+    CREATE TABLE IF NOT EXISTS {partition} PARTITION OF answers
+    FOR VALUES FROM (%s) TO (%s)
+"""
+
+# Агрегаты обновляются пачкой: сначала строки для новых пользователей,
+# затем UPDATE по итогам пачки (см. answers.aggregate_answers). Серии:
+# leading - верных подряд в начале пачки, trailing - в конце, best_run - лучшая внутри.
+# В SET везде старые значения строки, поэтому порядок присваиваний не важен
+INSERT_USER_STATS_ROWS = "INSERT INTO user_stats (user_id) VALUES %s ON CONFLICT (user_id) DO NOTHING"
+
+UPDATE_USER_STATS = """
+    UPDATE user_stats AS s SET
+        answers_total = s.answers_total + b.answers,
+        correct_total = s.correct_total + b.correct,
+        best_streak = GREATEST(s.best_streak, s.current_streak + b.leading, b.best_run),
+        current_streak = CASE WHEN b.trailing = b.answers THEN s.current_streak + b.answers ELSE b.trailing END,
+        last_answer_at = GREATEST(s.last_answer_at, b.last_answer_at)
+    FROM (VALUES %s) AS b(user_id, answers, correct, leading, trailing, best_run, last_answer_at)
+    WHERE s.user_id = b.user_id
+"""
+
+UPSERT_USER_WORD_STATS = """
+    INSERT INTO user_word_stats AS s (user_id, word_id, answers, mistakes, last_answer_at)
+    VALUES %s
+    ON CONFLICT (user_id, word_id) DO UPDATE SET
+        answers = s.answers + EXCLUDED.answers,
+        mistakes = s.mistakes + EXCLUDED.mistakes,
+        last_answer_at = GREATEST(s.last_answer_at, EXCLUDED.last_answer_at)
+"""
+
+SELECT_USER_STATS = """
+    SELECT answers_total, correct_total, current_streak, best_streak, last_answer_at
+    FROM user_stats
+    WHERE user_id = %s
+"""
+
+# Самые трудные слова: доля ошибок, при равенстве - число ошибок
+SELECT_HARDEST_WORDS = """
+    SELECT w.english_word, w.russian_word, s.answers, s.mistakes
+    FROM user_word_stats s
+    JOIN words w ON w.word_id = s.word_id
+    WHERE s.user_id = %s AND s.mistakes > 0
+    ORDER BY s.mistakes::real / s.answers DESC, s.mistakes DESC
+    LIMIT %s
+"""
+
+
+def answers_partition_params(month_start):
+    """Запрос CREATE_ANSWERS_PARTITION и его параметры для месяца, начинающегося с month_start"""
+    if month_start.month == 12:
+        month_end = month_start.replace(year=month_start.year + 1, month=1)
+    else:
+        month_end = month_start.replace(month=month_start.month + 1)
+    partition = f"answers_{month_start:%Y_%m}"
+    return CREATE_ANSWERS_PARTITION.format(partition=partition), (month_start, month_end)
+
+
+# Похожие слова для неправильных вариантов (database/neighbours.py, sql/migrations/004_word_neighbours.sql)
+SELECT_WORD_NEIGHBOURS = """
+    SELECT neighbour_id
+    FROM word_neighbours
+    WHERE word_id = %s
+    ORDER BY score DESC
+"""
+
+SELECT_WORDS_FOR_NEIGHBOURS = """
+    SELECT word_id, english_word, russian_word, is_default, created_by
+    FROM words
+    ORDER BY word_id
+"""
+
+SELECT_WORDS_WITHOUT_NEIGHBOURS = """
+    SELECT w.word_id
+    FROM words w
+    WHERE NOT EXISTS (SELECT 1 FROM word_neighbours n WHERE n.word_id = w.word_id)
+"""
+
+# Порог попадания нового слова в уже посчитанный список: похожесть последнего
+# соседа, а если список короче top_k - любое слово подходит (-1)
+SELECT_NEIGHBOUR_THRESHOLDS = """
+    SELECT word_id, CASE WHEN count(*) < %s THEN -1 ELSE min(score) END AS threshold
+    FROM word_neighbours
+    GROUP BY word_id
+"""
+
+TRUNCATE_WORD_NEIGHBOURS = "TRUNCATE word_neighbours"
+
+COPY_WORD_NEIGHBOURS = "COPY word_neighbours (word_id, neighbour_id, score) FROM STDIN"
+
+# Пакетная запись для psycopg2.extras.execute_values
+UPSERT_WORD_NEIGHBOURS = """
+    INSERT INTO word_neighbours (word_id, neighbour_id, score)
+    VALUES %s
+    ON CONFLICT (word_id, neighbour_id) DO UPDATE SET score = EXCLUDED.score
+"""
+
+# После вставки в чужие списки оставляем в каждом только top_k лучших
+TRIM_WORD_NEIGHBOURS = """
+    DELETE FROM word_neighbours n
+    USING (
+        SELECT word_id, neighbour_id,
+               row_number() OVER (PARTITION BY word_id ORDER BY score DESC, neighbour_id) AS place
+        FROM word_neighbours
+        WHERE word_id = ANY(%s)
+    ) ranked
+    WHERE n.word_id = ranked.word_id AND n.neighbour_id = ranked.neighbour_id
+      AND ranked.place > %s
+"""
+
+# Рассылки (database/broadcasts.py, sql/migrations/006_broadcasts.sql).
+# Начать рассылку за день или получить уже начатую - с ее контрольной точкой
+START_BROADCAST = """
+    INSERT INTO broadcasts (kind, run_date)
+    VALUES (%s, %s)
+    ON CONFLICT (kind, run_date) DO UPDATE SET kind = EXCLUDED.kind
+    RETURNING broadcast_id, last_user_id, sent, failed, finished_at
+"""
+
+# Получатели напоминания для серверного курсора: пользователи идут по первичному
+# ключу (без сортировки всей таблицы), число слов к повторению считается на сервере
+# по индексу idx_word_reviews_due_cover, а пользователи без таких слов отсеиваются там же
+SELECT_REMINDER_RECIPIENTS = """
+    SELECT u.user_id, d.due_count
+    FROM users u
+    CROSS JOIN LATERAL (
+        SELECT count(*) AS due_count
+        FROM word_reviews r
+        WHERE r.user_id = u.user_id AND r.due_at < %(until)s
+    ) d
+    WHERE u.user_id > %(after_user_id)s AND u.reminders AND d.due_count >= %(min_due)s
+    ORDER BY u.user_id
+"""
+
+SAVE_BROADCAST_CHECKPOINT = """
+    UPDATE broadcasts
+    SET last_user_id = %s, sent = %s, failed = %s, updated_at = CURRENT_TIMESTAMP
+    WHERE broadcast_id = %s
+"""
+
+FINISH_BROADCAST = """
+    UPDATE broadcasts SET finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+    WHERE broadcast_id = %s
+"""
+
+SELECT_RECENT_BROADCASTS = """
+    SELECT kind, run_date, last_user_id, sent, failed, started_at, updated_at, finished_at
+    FROM broadcasts
+    ORDER BY run_date DESC, broadcast_id DESC
+    LIMIT %s
+"""
+
+DISABLE_REMINDERS = "UPDATE users SET reminders = FALSE WHERE user_id = ANY(%s)"
+
+# Миграции схемы (database/migrations.py)
+CREATE_SCHEMA_MIGRATIONS = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Второй запуск migrate.py ждет, пока первый закончит
+LOCK_SCHEMA_MIGRATIONS = "SELECT pg_advisory_xact_lock(hashtext('schema_migrations'))"
+
+SELECT_APPLIED_MIGRATIONS = "SELECT version FROM schema_migrations"
+
+INSERT_MIGRATION = "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)"
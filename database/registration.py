@@ -0,0 +1,119 @@
+"""
+Буфер регистрации пользователей
+
+/start и /cards не пишут в БД на каждый вызов: недавно виденные пользователи
+помнятся в памяти процесса, а новые и сменившие username/имя копятся в буфере
+и записываются одним многострочным upsert по таймеру или при переполнении.
+Перед записями, которые ссылаются на users (слова, ответы, импорт),
+вызывается ensure_user - он сразу записывает пользователя, если тот еще в буфере.
+"""
+from collections import OrderedDict
+import threading
+
+from psycopg2.extras import execute_values
+
+from config import USER_FLUSH_INTERVAL, USER_FLUSH_BATCH_SIZE, USER_SEEN_CACHE_SIZE
+from database.db_config import Database
+from database import queries
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class UserRegistry:
+    """Дедупликация и пакетная запись пользователей"""
+
+    def __init__(self, flush_interval=USER_FLUSH_INTERVAL, batch_size=USER_FLUSH_BATCH_SIZE,
+                 seen_size=USER_SEEN_CACHE_SIZE):
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._seen_size = seen_size
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._seen = OrderedDict()  # user_id -> (username, first_name), уже записанные в БД
+        self._pending = {}  # user_id -> (username, first_name), ждут записи
+        self._flushing = {}  # Пользователи, которые прямо сейчас записываются
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def register(self, user_id, username, first_name):
+        """Запомнить пользователя; True, если он новый или изменился и будет записан"""
+        profile = (username, first_name)
+        with self._lock:
+            if self._seen.get(user_id) == profile:
+                self._seen.move_to_end(user_id)
+                return False
+            if self._pending.get(user_id, self._flushing.get(user_id)) == profile:
+                return False
+            self._pending[user_id] = profile
+            self._start_thread()
+            if len(self._pending) >= self._batch_size:
+                # Пишет фоновый поток: register вызывается и из event loop
+                self._wakeup.set()
+        return True
+
+    def is_pending(self, user_id):
+        """Пользователь еще не записан в БД"""
+        with self._lock:
+            return user_id in self._pending or user_id in self._flushing
+
+    def ensure_user(self, user_id):
+        """Гарантировать, что строка пользователя уже есть в БД"""
+        if self.is_pending(user_id):
+            self.flush()
+
+    def flush(self):
+        """Записать накопленных пользователей одним запросом"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._flushing = pending
+            if not pending:
+                return
+            try:
+                with Database() as db:
+                    execute_values(db.cursor, queries.UPSERT_USERS, [
+                        (user_id, username, first_name)
+                        for user_id, (username, first_name) in pending.items()
+                    ])
+                logger.info(f"Пользователей добавлено/обновлено: {len(pending)}")
+            except Exception as e:
+                logger.error(f"Ошибка записи пользователей: {e}")
+                # Возвращаем в буфер, если их не перекрыли более новые данные
+                with self._lock:
+                    for user_id, profile in pending.items():
+                        self._pending.setdefault(user_id, profile)
+                    self._flushing = {}
+                return
+            with self._lock:
+                for user_id, profile in pending.items():
+                    self._seen[user_id] = profile
+                    self._seen.move_to_end(user_id)
+                while len(self._seen) > self._seen_size:
+                    self._seen.popitem(last=False)
+                self._flushing = {}
+
+    def close(self):
+        """Остановить фоновую запись и сбросить буфер"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _start_thread(self):
+        if self._thread is None and not self._stop.is_set():
+            self._thread = threading.Thread(target=self._flush_loop, name='user-registry-flush', daemon=True)
+            self._thread.start()
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+# Глобальный буфер регистрации
+user_registry = UserRegistry()
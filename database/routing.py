@@ -0,0 +1,63 @@
+"""
+Маршрутизация чтений на реплики
+
+Запросы, которые только читают (словарь, страницы личных слов, слово для
+повторения), можно отправлять на реплики из DATABASE_REPLICAS, записи всегда
+идут на основную БД. Реплика отстает от основной, поэтому пользователь, который
+только что что-то записал, DB_REPLICA_STICKY_SECONDS секунд читает с основной
+(read-your-writes). Помнит это процесс: обновления одного чата обрабатывает
+один процесс (см. bot/webhook.py), так что этого достаточно.
+
+Роутер выбирает только номер реплики; пулы держат db_config (psycopg2)
+и async_db (psycopg 3).
+"""
+from collections import OrderedDict
+import itertools
+import threading
+import time
+
+from config import DATABASE_REPLICAS, DB_REPLICA_STICKY_SECONDS
+
+
+class ReplicaRouter:
+    """Выбор реплики для чтения с учетом недавних записей пользователя"""
+
+    def __init__(self, replicas_count=len(DATABASE_REPLICAS), sticky_seconds=DB_REPLICA_STICKY_SECONDS):
+        self.replicas_count = replicas_count
+        self._sticky_seconds = sticky_seconds
+        self._lock = threading.Lock()
+        self._recent_writes = OrderedDict()  # user_id -> время записи, по возрастанию времени
+        self._next = itertools.count()
+
+    def record_write(self, user_id):
+        """Пользователь записал данные: пока читаем его с основной БД"""
+        if not self.replicas_count or user_id is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writes[user_id] = now
+            self._recent_writes.move_to_end(user_id)
+            self._expire(now)
+
+    def replica_index(self, user_id=None):
+        """Номер реплики для чтения или None - читать с основной БД"""
+        if not self.replicas_count:
+            return None
+        if user_id is not None:
+            now = time.monotonic()
+            with self._lock:
+                self._expire(now)
+                if user_id in self._recent_writes:
+                    return None
+        return next(self._next) % self.replicas_count
+
+    def _expire(self, now):
+        while self._recent_writes:
+            user_id, written_at = next(iter(self._recent_writes.items()))
+            if now - written_at < self._sticky_seconds:
+                break
+            self._recent_writes.popitem(last=False)
+
+
+# Общий для sync и async моделей роутер процесса
+router = ReplicaRouter()
@@ -0,0 +1,109 @@
+"""
+Выбор слов для вопроса без копирования словаря
+"""
+import random
+
+from database.matching import normalize_answer
+
+# Сколько вариантов ответа показываем в вопросе
+OPTIONS_COUNT = 4
+
+
+class WordList(tuple):
+    """Кортеж слов с поиском по word_id за O(1)"""
+
+    def __new__(cls, words=()):
+        self = super().__new__(cls, words)
+        self.by_id = {word['word_id']: word for word in self}
+        self._by_answer = None
+        return self
+
+    @property
+    def by_answer(self):
+        """Слова по нормализованному английскому написанию (строится при первом обращении)"""
+        if self._by_answer is None:
+            self._by_answer = {normalize_answer(word['english_word']): word for word in self}
+        return self._by_answer
+
+
+class WordIndex:
+    """Словарь пользователя как единая последовательность: общие слова + персональные
+
+    Общие слова - один WordList на процесс, персональные - WordList из кэша пользователя.
+    Индекс только ссылается на них, поэтому создание, доступ по позиции и поиск
+    по word_id стоят O(1).
+    """
+
+    __slots__ = ('_default_words', '_user_words', '_split')
+
+    def __init__(self, default_words, user_words):
+        self._default_words = default_words
+        self._user_words = user_words
+        self._split = len(default_words)
+
+    def __len__(self):
+        return self._split + len(self._user_words)
+
+    def __getitem__(self, position):
+        if position < self._split:
+            return self._default_words[position]
+        return self._user_words[position - self._split]
+
+    def find(self, word_id):
+        """Найти слово по word_id (None, если его нет в словаре пользователя)"""
+        word = self._default_words.by_id.get(word_id)
+        if word is None:
+            word = self._user_words.by_id.get(word_id)
+        return word
+
+    def find_answer(self, answer):
+        """Найти слово по нормализованному ответу (см. database/matching.py)"""
+        word = self._default_words.by_answer.get(answer)
+        if word is None:
+            word = self._user_words.by_answer.get(answer)
+        return word
+
+
+def sample_question(index, correct_word=None, options_count=OPTIONS_COUNT, rng=random, neighbour_ids=()):
+    """Выбрать правильное слово и неправильные варианты
+
+    Если correct_word не задан, правильное слово тоже выбирается случайно.
+    neighbour_ids - похожие на правильное слова (см. database/neighbours.py):
+    неправильные варианты сначала берутся из тех, что есть в словаре пользователя,
+    недостающие добираются случайно. random.sample по range не создает список
+    позиций, поэтому стоимость зависит только от options_count и числа соседей,
+    а не от размера словаря.
+    """
+    if len(index) < options_count:
+        return None  # Недостаточно слов для игры
+
+    if correct_word is None:
+        correct_word = index[rng.randrange(len(index))]
+
+    wrong_count = options_count - 1
+    wrong_options = [
+        word for word in map(index.find, neighbour_ids)
+        if word is not None and word['word_id'] != correct_word['word_id']
+    ]
+    if len(wrong_options) > wrong_count:
+        wrong_options = rng.sample(wrong_options, wrong_count)
+
+    if len(wrong_options) < wrong_count:
+        # Среди options_count случайных слов хотя бы недостающие не совпадут с уже выбранными
+        taken = {correct_word['word_id']}.union(word['word_id'] for word in wrong_options)
+        for position in rng.sample(range(len(index)), options_count):
+            word = index[position]
+            if word['word_id'] not in taken:
+                taken.add(word['word_id'])
+                wrong_options.append(word)
+                if len(wrong_options) == wrong_count:
+                    break
+
+    all_options = [correct_word] + wrong_options
+    rng.shuffle(all_options)
+
+    return {
+        'correct_word': correct_word,
+        'all_options': all_options,
+        'russian_word': correct_word['russian_word']
+    }
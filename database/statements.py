@@ -0,0 +1,111 @@
+"""
+Реестр подготовленных запросов (PREPARE/EXECUTE)
+
+Частые запросы из database.queries один раз на соединение подготавливаются
+на сервере, а дальше выполняются через EXECUTE: Postgres не разбирает и не
+планирует их текст заново на каждом вызове. Модели ничего не знают об этом -
+курсор пула (TimedCursor) сам заменяет текст запроса из реестра на EXECUTE.
+
+Какие запросы подготовлены, видно в STATEMENTS. Подготовленные имена хранятся
+на объекте соединения, поэтому после переподключения (новое соединение в пуле)
+запросы подготавливаются заново автоматически.
+"""
+import re
+
+from psycopg2 import extensions
+
+from database import queries
+
+_PARAMETER = re.compile(r'%\((\w+)\)s|%s|%%')
+
+
+class Statement:
+    """Запрос из database.queries с типами параметров для PREPARE"""
+
+    def __init__(self, query_name, types=()):
+        self.query_name = query_name
+        self.name = f"ec_{query_name.lower()}"
+        self.query = getattr(queries, query_name)
+
+        # %s / %(имя)s -> $1, $2, ...; именованный параметр получает один номер на все вхождения
+        self.names = []
+        positional = []
+
+        def replace(match):
+            if match.group(0) == '%%':
+                return '%'
+            name = match.group(1)
+            if name is None:
+                positional.append(len(positional))
+                return f"${len(positional)}"
+            if name not in self.names:
+                self.names.append(name)
+            return f"${self.names.index(name) + 1}"
+
+        sql = _PARAMETER.sub(replace, self.query)
+        if self.names and positional:
+            raise ValueError(f"{query_name}: нельзя смешивать %s и %(имя)s")
+        count = len(self.names) or len(positional)
+
+        if isinstance(types, dict):
+            types = [types[name] for name in self.names]
+        if len(types) != count:
+            raise ValueError(f"{query_name}: параметров {count}, а типов {len(types)}")
+
+        type_list = f" ({', '.join(types)})" if types else ''
+        self.prepare_sql = f"PREPARE {self.name}{type_list} AS {sql}"
+        self.execute_sql = f"EXECUTE {self.name}" + (f" ({', '.join(['%s'] * count)})" if count else '')
+
+    def arguments(self, params):
+        """Параметры вызова в порядке $1, $2, ..."""
+        if self.names:
+            return tuple(params[name] for name in self.names)
+        return tuple(params or ())
+
+
+# Параметры queries.personal_page_params
+_PAGE_TYPES = {
+    'user_id': 'bigint',
+    'prefix': 'text',
+    'prefix_end': 'text',
+    'anchor_id': 'integer',
+    'limit': 'integer'
+}
+
+# Все подготавливаемые запросы бота: текст запроса -> Statement
+STATEMENTS = {
+    statement.query: statement
+    for statement in (
+        Statement('SELECT_DEFAULT_WORDS'),
+        Statement('SELECT_USER_EXTRA_WORDS', ('bigint',)),
+        Statement('SELECT_PERSONAL_WORDS_AFTER', _PAGE_TYPES),
+        Statement('SELECT_PERSONAL_WORDS_BEFORE', _PAGE_TYPES),
+        Statement('ADD_USER_WORD', {'english_word': 'varchar', 'russian_word': 'varchar', 'user_id': 'bigint'}),
+        Statement('REMOVE_USER_WORD', {'user_id': 'bigint', 'word_id': 'integer'}),
+        Statement('SELECT_DUE_WORD', ('bigint',)),
+        Statement('SELECT_WORD_NEIGHBOURS', ('integer',)),
+        Statement('SELECT_USER_STATS', ('bigint',)),
+        Statement('SELECT_HARDEST_WORDS', ('bigint', 'integer')),
+        Statement('SELECT_BOT_STATE', ('bigint', 'bigint', 'double precision')),
+        Statement('UPSERT_REVIEW', {
+            'user_id': 'bigint',
+            'word_id': 'integer',
+            'correct': 'boolean',
+            'initial_ease': 'real',
+            'min_ease': 'real',
+            'ease_bonus': 'real',
+            'ease_penalty': 'real',
+            'first_interval': 'real',
+            'second_interval': 'real',
+            'relearn_minutes': 'real'
+        }),
+    )
+}
+
+
+class PreparingConnection(extensions.connection):
+    """Соединение psycopg2, помнящее, какие запросы на нем уже подготовлены"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
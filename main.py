@@ -1,12 +1,24 @@
 """
 Главный файл Telegram-бота для изучения английского языка
+
+Примеры:
+    python main.py            # запустить бота
+    python main.py --check    # проверить БД (таблицы, миграции) и выйти
+    python main.py --reminders  # запустить бота вместе с ежедневной рассылкой напоминаний
+
+Запуск быстрый: тяжелые модули (telebot, обработчики, драйвер БД) импортируются
+только при создании бота, а пул подключений и кэш общих слов прогреваются
+в фоне, пока бот уже принимает обновления.
 """
-import telebot
-from telebot import custom_filters
-from telebot.storage import StateMemoryStorage
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import sys
+import threading
 
-from config import BOT_TOKEN
-from bot.handlers import register_handlers
+from config import BOT_TOKEN, OUTBOX_ENABLED, BROADCAST_RATE
 import logging
 
 # Настройка логирования
@@ -17,40 +29,137 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def main():
-    """Основная функция запуска бота"""
+def create_bot(state_storage, threaded=True, outbox=None):
+    """Создать бота с обработчиками и фильтром состояний
+
+    С outbox исходящие сообщения отправляются через очередь (см. bot/outbox.py).
+    """
+    import telebot
+    from telebot import custom_filters
+    from bot.handlers import register_handlers
+    from bot.outbox import QueuedTeleBot
+    from metrics import instrument_handlers
+
+    if outbox is not None:
+        bot = QueuedTeleBot(BOT_TOKEN, state_storage=state_storage, threaded=threaded, outbox=outbox)
+    else:
+        bot = telebot.TeleBot(BOT_TOKEN, state_storage=state_storage, threaded=threaded)
+
+    # Регистрируем обработчики
+    register_handlers(bot)
+    instrument_handlers(bot)  # Замер времени каждого обработчика
+
+    # Добавляем фильтр состояний
+    bot.add_custom_filter(custom_filters.StateFilter(bot))
+    return bot
+
+
+def check():
+    """Диагностика БД: подключение, таблицы и непримененные миграции. Возвращает код выхода"""
+    from database.db_config import Database, close_pool
+    from database.migrations import pending_migrations
+
     try:
-        # Тест подключения к БД
         print("🔍 Проверяем подключение к базе данных...")
-        from database.db_config import Database
-        db = Database()
-        print("✅ База данных подключена успешно!")
+        with Database() as db:
+            print("✅ База данных подключена успешно!")
+
+            db.cursor.execute("SELECT tablename FROM pg_tables WHERE schemaname = 'public'")
+            tables = db.cursor.fetchall()
+            print(f"📊 Найдено таблиц: {len(tables)}")
+            for table in tables:
+                print(f"  - {table['tablename']}")
 
-        # Проверяем наличие таблиц
-        db.cursor.execute("SELECT tablename FROM pg_tables WHERE schemaname = 'public'")
-        tables = db.cursor.fetchall()
-        print(f"📊 Найдено таблиц: {len(tables)}")
-        for table in tables:
-            print(f"  - {table['tablename']}")
+        pending = pending_migrations()
+        if pending:
+            print(f"⏳ Не применено миграций: {len(pending)} - запустите python migrate.py")
+            return 1
+        print("✅ Схема актуальна")
+        return 0
+    except Exception as e:
+        print(f"❌ Ошибка проверки: {e}")
+        return 1
+    finally:
+        close_pool()
 
-        db.close()
 
-        # Создаем хранилище состояний
-        state_storage = StateMemoryStorage()
+def warm_up():
+    """Фоновый прогрев: открыть пул подключений и загрузить общие слова в кэш"""
+    def run():
+        started = time.perf_counter()
+        from database.models import WordManager
 
-        # Создаем бота
-        bot = telebot.TeleBot(BOT_TOKEN, state_storage=state_storage)
+        words = WordManager.get_default_words()  # Ошибку БД залогирует сама модель
+        logger.info(f"Прогрев: {len(words)} общих слов за {(time.perf_counter() - started) * 1000:.0f} мс")
 
-        # Регистрируем обработчики
-        register_handlers(bot)
+    threading.Thread(target=run, name='warm-up', daemon=True).start()
 
-        # Добавляем фильтр состояний
-        bot.add_custom_filter(custom_filters.StateFilter(bot))
 
-        logger.info("🤖 Бот запущен!")
+def start_reminders(outbox):
+    """Ежедневная рассылка напоминаний в фоне процесса бота (см. bot/broadcast.py)
+
+    Очередь рассылки делит общее ведро с очередью ответов outbox: вместе они не
+    превышают OUTBOX_GLOBAL_RATE, а 429 любой из них ставит на паузу обе.
+    Возвращает очередь рассылки, ее нужно закрыть при остановке.
+    """
+    import telebot
+    from bot.broadcast import Broadcaster
+    from bot.outbox import Outbox
+
+    reminders_outbox = Outbox(
+        global_rate=BROADCAST_RATE,
+        shared_bucket=outbox.global_bucket if outbox is not None else None
+    )
+    reminders_outbox.start()
+    broadcaster = Broadcaster(telebot.TeleBot(BOT_TOKEN, threaded=False), reminders_outbox)
+    threading.Thread(target=broadcaster.run_forever, name='reminders', daemon=True).start()
+    return reminders_outbox
+
+
+def main():
+    """Основная функция запуска бота"""
+    parser = argparse.ArgumentParser(description="EnglishCard бот (long polling)")
+    parser.add_argument('--check', action='store_true',
+                        help="проверить подключение к БД и миграции и выйти")
+    parser.add_argument('--reminders', action='store_true',
+                        help="рассылать напоминания из этого процесса (вместо broadcast_cli.py daemon)")
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(check())
+
+    state_storage = None
+    outbox = None
+    reminders_outbox = None
+    try:
+        warm_up()
+
+        bot_started = time.perf_counter()
+        from bot.outbox import Outbox
+        from bot.storage import create_state_storage
+        from metrics import start_metrics
+
+        # Создаем хранилище состояний (см. STATE_STORAGE в config.py)
+        state_storage = create_state_storage()
+
+        # Очередь исходящих сообщений: обработчики не ждут ответа Telegram
+        if OUTBOX_ENABLED:
+            outbox = Outbox()
+            outbox.start()
+
+        # Создаем бота
+        bot = create_bot(state_storage, outbox=outbox)
+        if args.reminders:
+            reminders_outbox = start_reminders(outbox)
+        ready = time.perf_counter()
+
+        logger.info(
+            f"🤖 Бот запущен за {(ready - _STARTED) * 1000:.0f} мс "
+            f"(из них импорт модулей и создание бота {(ready - bot_started) * 1000:.0f} мс)"
+        )
         print("🤖 EnglishCard бот запущен! Нажмите Ctrl+C для остановки.")
 
         # Запускаем бота
+        start_metrics()
         bot.infinity_polling(skip_pending=True)
 
     except Exception as e:
@@ -58,7 +167,21 @@ def main():
         print(f"❌ Подробная ошибка: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        from database.answers import answer_log
+        from database.db_config import close_pool
+        from database.registration import user_registry
+
+        if reminders_outbox is not None:
+            reminders_outbox.close()
+        if outbox is not None:
+            outbox.close()
+        if hasattr(state_storage, 'close'):
+            state_storage.close()
+        user_registry.close()
+        answer_log.close()
+        close_pool()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
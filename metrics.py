@@ -0,0 +1,376 @@
+"""
+Метрики бота: задержки обработчиков и запросов к БД, счетчики пула, кэша и Telegram API
+
+Все метрики живут в памяти процесса. Их можно забрать в формате Prometheus
+(GET /metrics на METRICS_HOST:METRICS_PORT) и раз в METRICS_LOG_INTERVAL секунд
+они сводкой (количество, p50, p99) пишутся в лог.
+
+Гистограммы - с фиксированными корзинами, как в Prometheus: память не растет
+с нагрузкой, а квантили оцениваются интерполяцией внутри корзины.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import functools
+import inspect
+import threading
+import time
+
+from config import METRICS_ENABLED, METRICS_HOST, METRICS_PORT, METRICS_LOG_INTERVAL
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограмм, в секундах
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+PREFIX = 'englishcard_'
+
+
+class Counter:
+    """Монотонный счетчик"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Гистограмма длительностей с корзинами BUCKETS"""
+
+    def __init__(self, buckets=BUCKETS):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        with self._lock:
+            for number, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    self.counts[number] += 1
+                    break
+            self.count += 1
+            self.sum += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.count, self.sum
+
+    def quantile(self, q):
+        """Оценка квантиля q (0..1) по корзинам"""
+        counts, count, _ = self.snapshot()
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        lower = 0.0
+        for bound, bucket_count in zip(self.buckets, counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if bound == float('inf'):
+                    return lower  # Больше последней конечной границы точнее не сказать
+                return lower + (bound - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+            if bound != float('inf'):
+                lower = bound
+        return lower
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}  # (имя, метки) -> Counter/Histogram
+        self._help = {}  # имя -> (тип, описание)
+        self._gauges = {}  # имя -> функция, возвращающая текущее значение
+
+    def counter(self, name, help_text='', **labels):
+        return self._get(name, 'counter', help_text, labels, Counter)
+
+    def histogram(self, name, help_text='', **labels):
+        return self._get(name, 'histogram', help_text, labels, Histogram)
+
+    def gauge_function(self, name, help_text, function, kind='gauge'):
+        """Значение, которое считается в момент выгрузки (например, счетчик из другого модуля)"""
+        with self._lock:
+            self._help[name] = (kind, help_text)
+            self._gauges[name] = function
+
+    def total(self, name):
+        """Сумма по всем меткам: число наблюдений гистограммы или значение счетчика"""
+        with self._lock:
+            metrics = [metric for (metric_name, _), metric in self._metrics.items() if metric_name == name]
+        return sum(metric.count if isinstance(metric, Histogram) else metric.value for metric in metrics)
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus"""
+        with self._lock:
+            metrics = sorted(self._metrics.items(), key=lambda item: item[0])
+            gauges = sorted(self._gauges.items())
+            help_texts = dict(self._help)
+
+        lines = []
+        described = set()
+        for (name, labels), metric in metrics:
+            if name not in described:
+                described.add(name)
+                kind, help_text = help_texts[name]
+                lines.append(f"# HELP {PREFIX}{name} {help_text}")
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            if isinstance(metric, Histogram):
+                counts, count, total = metric.snapshot()
+                cumulative = 0
+                for bound, bucket_count in zip(metric.buckets, counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {total}")
+                lines.append(f"{PREFIX}{name}_count{_labels(labels)} {count}")
+            else:
+                lines.append(f"{PREFIX}{name}{_labels(labels)} {metric.value}")
+
+        for name, function in gauges:
+            try:
+                value = function()
+            except Exception as e:
+                logger.error(f"Ошибка вычисления метрики {name}: {e}")
+                continue
+            kind, help_text = help_texts[name]
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            lines.append(f"{PREFIX}{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Строки сводки по гистограммам: количество, p50, p99"""
+        with self._lock:
+            histograms = sorted(
+                (key, metric) for key, metric in self._metrics.items() if isinstance(metric, Histogram)
+            )
+        lines = []
+        for (name, labels), histogram in histograms:
+            if not histogram.count:
+                continue
+            label_text = ','.join(f"{key}={value}" for key, value in labels)
+            lines.append(
+                f"{name}[{label_text}] n={histogram.count} "
+                f"p50={histogram.quantile(0.5) * 1000:.1f}ms p99={histogram.quantile(0.99) * 1000:.1f}ms"
+            )
+        return lines
+
+    def _get(self, name, kind, help_text, labels, factory):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is not None:
+            return metric
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = factory()
+                self._metrics[key] = metric
+                self._help.setdefault(name, (kind, help_text))
+            return metric
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+# Реестр процесса
+registry = MetricsRegistry()
+
+
+def timed_function(name):
+    """Декоратор: длительность вызова функции (обычной или async) в function_seconds"""
+
+    def decorator(function):
+        histogram = registry.histogram('function_seconds', "Длительность внутренних функций бота", function=name)
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+
+    return decorator
+
+
+def _wrap_handler(function):
+    name = function.__name__
+    histogram = registry.histogram('handler_seconds', "Длительность обработчиков бота", handler=name)
+    errors = registry.counter('handler_errors_total', "Исключения в обработчиках бота", handler=name)
+
+    if inspect.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return async_wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - started)
+    return wrapper
+
+
+def instrument_handlers(bot):
+    """Обернуть все уже зарегистрированные обработчики бота (TeleBot или AsyncTeleBot) замером времени"""
+    for attribute, handlers in vars(bot).items():
+        if not attribute.endswith('_handlers') or not isinstance(handlers, list):
+            continue
+        for handler in handlers:
+            if isinstance(handler, dict) and 'function' in handler:
+                if not getattr(handler['function'], '_metrics_wrapped', False):
+                    handler['function'] = _wrap_handler(handler['function'])
+                    handler['function']._metrics_wrapped = True
+
+
+_telegram_instrumented = False
+
+
+def instrument_telegram_api():
+    """Считать вызовы Telegram API по методам (синхронный и asyncio-клиент telebot)
+
+    Все методы telebot проходят через apihelper._make_request и
+    asyncio_helper._process_request, поэтому оборачиваются только они.
+    """
+    global _telegram_instrumented
+    if _telegram_instrumented:
+        return
+    _telegram_instrumented = True
+
+    from telebot import apihelper, asyncio_helper
+
+    make_request = apihelper._make_request
+
+    def timed_make_request(token, method_name, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return make_request(token, method_name, *args, **kwargs)
+        except Exception:
+            registry.counter('telegram_api_errors_total', "Ошибки вызовов Telegram API", method=method_name).inc()
+            raise
+        finally:
+            registry.histogram(
+                'telegram_api_seconds', "Длительность вызовов Telegram API", method=method_name
+            ).observe(time.perf_counter() - started)
+
+    process_request = asyncio_helper._process_request
+
+    async def timed_process_request(token, url, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await process_request(token, url, *args, **kwargs)
+        except Exception:
+            registry.counter('telegram_api_errors_total', "Ошибки вызовов Telegram API", method=url).inc()
+            raise
+        finally:
+            registry.histogram(
+                'telegram_api_seconds', "Длительность вызовов Telegram API", method=url
+            ).observe(time.perf_counter() - started)
+
+    apihelper._make_request = timed_make_request
+    asyncio_helper._process_request = timed_process_request
+
+
+def start_metrics_server(host, port):
+    """Фоновый HTTP-сервер с GET /metrics"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return server
+
+
+def start_log_summary(interval):
+    """Фоновый поток, пишущий сводку метрик в лог раз в interval секунд"""
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            lines = registry.summary()
+            if lines:
+                logger.info("Сводка метрик:\n  " + "\n  ".join(lines))
+
+    thread = threading.Thread(target=loop, name='metrics-summary', daemon=True)
+    thread.start()
+    return thread
+
+
+_started = False
+
+
+def start_metrics(serve=True, port=None):
+    """Включить метрики по настройкам METRICS_* (повторный вызов в процессе ничего не делает)
+
+    serve=False - только сводка в лог, без HTTP-сервера (их отдает webhook-сервер процесса);
+    port - свой порт эндпоинта вместо METRICS_PORT (процессы-воркеры webhook).
+    """
+    global _started
+    if not METRICS_ENABLED or _started:
+        return
+    _started = True
+    instrument_telegram_api()
+    port = METRICS_PORT if port is None else port
+    if serve and port:
+        try:
+            start_metrics_server(METRICS_HOST, port)
+        except OSError as e:
+            logger.error(f"Не удалось запустить сервер метрик: {e}")
+    if METRICS_LOG_INTERVAL:
+        start_log_summary(METRICS_LOG_INTERVAL)
@@ -0,0 +1,42 @@
+"""
+Применение миграций схемы БД (sql/migrations)
+
+Примеры:
+    python migrate.py              # применить все новые миграции
+    python migrate.py --status     # показать, какие миграции применены
+    python migrate.py --to 1       # применить миграции до версии 1 включительно
+"""
+import argparse
+
+from database.migrations import list_migrations, applied_versions, migrate
+from database.db_config import close_pool
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Миграции схемы БД EnglishCard")
+    parser.add_argument('--status', action='store_true', help="только показать состояние")
+    parser.add_argument('--to', type=int, default=None, help="применить миграции до этой версии")
+    args = parser.parse_args()
+
+    try:
+        if args.status:
+            applied = applied_versions()
+            for version, name, _ in list_migrations():
+                mark = '✅' if version in applied else '⏳'
+                print(f"{mark} {version:03d}_{name}")
+            return
+
+        done = migrate(args.to)
+        if done:
+            print(f"✅ Применено миграций: {len(done)}")
+        else:
+            print("✅ Схема уже актуальна")
+    finally:
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
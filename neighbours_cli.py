@@ -0,0 +1,41 @@
+"""
+Расчет похожих слов для неправильных вариантов ответа (см. database/neighbours.py)
+
+Примеры:
+    python neighbours_cli.py build      # пересчитать списки всех слов
+    python neighbours_cli.py update     # досчитать новые слова (например, из cron раз в несколько минут)
+
+Бот читает готовые списки из word_neighbours; пока их нет, варианты ответа случайные.
+"""
+import argparse
+import time
+
+from config import NEIGHBOURS_TOP_K, NEIGHBOURS_BLOCK_SIZE
+from database.db_config import close_pool
+from database.neighbours import build_all, update
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Похожие слова EnglishCard")
+    parser.add_argument('action', choices=['build', 'update'])
+    parser.add_argument('--top-k', type=int, default=NEIGHBOURS_TOP_K,
+                        help="сколько похожих слов хранить на слово")
+    parser.add_argument('--block-size', type=int, default=NEIGHBOURS_BLOCK_SIZE,
+                        help="сколько слов сравнивать со всем словарем за раз")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        if args.action == 'build':
+            rows = build_all(args.top_k, args.block_size)
+            print(f"✅ Записано строк: {rows}")
+        else:
+            words, rows = update(args.top_k, args.block_size)
+            print(f"✅ Новых слов: {words}, записано строк: {rows}")
+        print(f"⏱ {time.perf_counter() - started:.2f} с")
+    finally:
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -34,6 +34,30 @@ CREATE TABLE user_words (
     UNIQUE(user_id, word_id)                 -- Одно слово у пользователя только один раз
 );
 
+-- Состояние интервального повторения слов пользователем
+CREATE TABLE word_reviews (
+    user_id BIGINT NOT NULL,                 -- ID пользователя
+    word_id INTEGER NOT NULL,                -- ID слова
+    ease REAL NOT NULL DEFAULT 2.5,          -- Коэффициент легкости (SM-2)
+    interval_days REAL NOT NULL DEFAULT 0,   -- Текущий интервал повторения в днях
+    repetitions INTEGER NOT NULL DEFAULT 0,  -- Верных ответов подряд
+    due_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,  -- Когда слово пора повторить
+    last_reviewed_at TIMESTAMP,              -- Когда был последний ответ
+    PRIMARY KEY (user_id, word_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (word_id) REFERENCES words(word_id) ON DELETE CASCADE
+);
+
+-- Состояния диалогов бота (общие для всех процессов, см. bot/storage.py)
+CREATE TABLE bot_states (
+    chat_id BIGINT NOT NULL,                 -- ID чата
+    user_id BIGINT NOT NULL,                 -- ID пользователя
+    state VARCHAR(255),                      -- Текущее состояние (BotStates)
+    data TEXT NOT NULL DEFAULT '{}',         -- Данные сессии в компактном JSON
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,  -- Последнее изменение
+    PRIMARY KEY (chat_id, user_id)
+);
+
 -- Заполнение базовыми словами для всех пользователей
 INSERT INTO words (english_word, russian_word, is_default) VALUES
 ('Peace', 'Мир', TRUE),
@@ -56,4 +80,8 @@ ON CONFLICT (english_word) DO NOTHING;  -- ДОБАВЛЕНО для безоп
 -- Создание индексов для быстрой работы
 CREATE INDEX idx_user_words_user_id ON user_words(user_id);
 CREATE INDEX idx_words_is_default ON words(is_default);
-CREATE INDEX idx_words_created_by ON words(created_by);
\ No newline at end of file
+CREATE INDEX idx_words_created_by ON words(created_by);
+CREATE INDEX idx_word_reviews_due ON word_reviews(user_id, due_at);  -- Очередь слов к повторению
+CREATE INDEX idx_bot_states_updated_at ON bot_states(updated_at);    -- Удаление брошенных сессий
+
+-- Дальнейшие изменения схемы - в sql/migrations, применяются командой: python migrate.py
@@ -0,0 +1,52 @@
+-- Покрывающие и частичные индексы для загрузки словаря и очереди повторения
+--
+-- Общие слова и слова пользователя читаются двумя запросами (ветками UNION ALL,
+-- см. SELECT_AVAILABLE_WORDS в database/queries.py). Каждая ветка берет все
+-- нужные колонки прямо из своего частичного индекса (Index Only Scan),
+-- не заходя в таблицу words.
+
+-- Таблицы, которых нет в базах, созданных sql/init_db.sql до их появления:
+-- состояние интервального повторения и состояния диалогов бота.
+-- В новой базе они уже созданы init_db.sql - тогда здесь ничего не меняется.
+CREATE TABLE IF NOT EXISTS word_reviews (
+    user_id BIGINT NOT NULL,                 -- ID пользователя
+    word_id INTEGER NOT NULL,                -- ID слова
+    ease REAL NOT NULL DEFAULT 2.5,          -- Коэффициент легкости (SM-2)
+    interval_days REAL NOT NULL DEFAULT 0,   -- Текущий интервал повторения в днях
+    repetitions INTEGER NOT NULL DEFAULT 0,  -- Верных ответов подряд
+    due_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,  -- Когда слово пора повторить
+    last_reviewed_at TIMESTAMP,              -- Когда был последний ответ
+    PRIMARY KEY (user_id, word_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (word_id) REFERENCES words(word_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS bot_states (
+    chat_id BIGINT NOT NULL,                 -- ID чата
+    user_id BIGINT NOT NULL,                 -- ID пользователя
+    state VARCHAR(255),                      -- Текущее состояние (BotStates)
+    data TEXT NOT NULL DEFAULT '{}',         -- Данные сессии в компактном JSON
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,  -- Последнее изменение
+    PRIMARY KEY (chat_id, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_bot_states_updated_at ON bot_states (updated_at);  -- Удаление брошенных сессий
+
+-- Общие слова: SELECT_DEFAULT_WORDS
+CREATE INDEX IF NOT EXISTS idx_words_default_cover
+    ON words (word_id) INCLUDE (english_word, russian_word, is_default)
+    WHERE is_default = TRUE;
+
+-- Персональные слова для соединения с user_words: SELECT_USER_EXTRA_WORDS
+CREATE INDEX IF NOT EXISTS idx_words_personal_cover
+    ON words (word_id) INCLUDE (english_word, russian_word, is_default)
+    WHERE is_default = FALSE;
+
+-- Следующее слово к повторению: SELECT_DUE_WORD
+CREATE INDEX IF NOT EXISTS idx_word_reviews_due_cover
+    ON word_reviews (user_id, due_at) INCLUDE (word_id);
+
+-- Заменены индексами выше
+DROP INDEX IF EXISTS idx_words_is_default;     -- Почти не отбирает строк: TRUE/FALSE
+DROP INDEX IF EXISTS idx_word_reviews_due;
+DROP INDEX IF EXISTS idx_user_words_user_id;   -- Дублирует UNIQUE (user_id, word_id)
@@ -0,0 +1,9 @@
+-- Постраничный выбор слова для удаления (keyset по english_word)
+--
+-- SELECT_PERSONAL_WORDS_AFTER/BEFORE идут по этому индексу от якорного слова
+-- и останавливаются через LIMIT строк, поэтому страница и поиск по началу слова
+-- стоят одинаково при любом размере словаря. Порядок - побайтовый (COLLATE "C"),
+-- чтобы диапазон по префиксу был непрерывным.
+CREATE INDEX IF NOT EXISTS idx_words_personal_keyset
+    ON words (created_by, english_word COLLATE "C") INCLUDE (word_id, russian_word)
+    WHERE is_default = FALSE;
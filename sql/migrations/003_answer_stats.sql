@@ -0,0 +1,36 @@
+-- Журнал ответов и статистика для /stats (см. database/answers.py)
+--
+-- answers пишется только пачками из буфера AnswerLog. Таблица разбита на
+-- месячные секции по answered_at: старые месяцы удаляются DROP TABLE секции,
+-- а не DELETE. Секции на текущий и следующий месяц создает сам AnswerLog;
+-- answers_default ловит строки, для которых секции еще нет.
+-- Внешних ключей у журнала и агрегатов нет - запись пачкой не должна
+-- зависеть от того, успел ли пользователь попасть в users.
+CREATE TABLE IF NOT EXISTS answers (
+    user_id BIGINT NOT NULL,                 -- ID пользователя
+    word_id INTEGER NOT NULL,                -- ID слова
+    correct BOOLEAN NOT NULL,                -- Верный ли ответ
+    answered_at TIMESTAMP NOT NULL           -- Когда ответил
+) PARTITION BY RANGE (answered_at);
+
+CREATE TABLE IF NOT EXISTS answers_default PARTITION OF answers DEFAULT;
+
+-- Итоги пользователя: /stats читает одну строку по первичному ключу
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id BIGINT PRIMARY KEY,              -- ID пользователя
+    answers_total INTEGER NOT NULL DEFAULT 0,  -- Всего ответов
+    correct_total INTEGER NOT NULL DEFAULT 0,  -- Из них верных
+    current_streak INTEGER NOT NULL DEFAULT 0,  -- Верных ответов подряд сейчас
+    best_streak INTEGER NOT NULL DEFAULT 0,  -- Лучшая серия
+    last_answer_at TIMESTAMP                 -- Когда был последний ответ
+);
+
+-- Итоги по словам пользователя: самые трудные слова - по префиксу первичного ключа
+CREATE TABLE IF NOT EXISTS user_word_stats (
+    user_id BIGINT NOT NULL,                 -- ID пользователя
+    word_id INTEGER NOT NULL,                -- ID слова
+    answers INTEGER NOT NULL DEFAULT 0,      -- Всего ответов на слово
+    mistakes INTEGER NOT NULL DEFAULT 0,     -- Из них ошибок
+    last_answer_at TIMESTAMP,                -- Когда был последний ответ
+    PRIMARY KEY (user_id, word_id)
+);
@@ -0,0 +1,16 @@
+-- Похожие слова для неправильных вариантов ответа (см. database/neighbours.py)
+--
+-- Для каждого слова хранится NEIGHBOURS_TOP_K самых похожих по написанию слов.
+-- Таблицу заполняет только python neighbours_cli.py (build/update), бот ее
+-- лишь читает по префиксу первичного ключа. Удаленные слова уходят из списков
+-- каскадно; пустой список значит «соседи еще не посчитаны» - тогда варианты
+-- ответа выбираются случайно, как раньше.
+CREATE TABLE IF NOT EXISTS word_neighbours (
+    word_id INTEGER NOT NULL REFERENCES words(word_id) ON DELETE CASCADE,      -- ID слова
+    neighbour_id INTEGER NOT NULL REFERENCES words(word_id) ON DELETE CASCADE, -- ID похожего слова
+    score REAL NOT NULL,                     -- Похожесть от 0 до 1
+    PRIMARY KEY (word_id, neighbour_id)
+);
+
+-- Каскадное удаление слова ищет строки, где оно чужой сосед
+CREATE INDEX IF NOT EXISTS idx_word_neighbours_neighbour ON word_neighbours (neighbour_id);
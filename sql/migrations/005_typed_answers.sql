@@ -0,0 +1,4 @@
+-- Режим ответа пользователя (/typing): TRUE - пишет перевод сам, FALSE - выбирает из вариантов.
+-- Бот читает флаг один раз за сессию и дальше хранит его в данных состояния.
+-- Добавление столбца с постоянным значением по умолчанию не переписывает таблицу.
+ALTER TABLE users ADD COLUMN IF NOT EXISTS typed_answers BOOLEAN NOT NULL DEFAULT FALSE;
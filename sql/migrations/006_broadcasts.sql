@@ -0,0 +1,21 @@
+-- Ежедневные напоминания о словах к повторению (см. bot/broadcast.py)
+--
+-- users.reminders - согласие на напоминания (/reminders). Выключается само,
+-- если пользователь заблокировал бота.
+ALTER TABLE users ADD COLUMN IF NOT EXISTS reminders BOOLEAN NOT NULL DEFAULT TRUE;
+
+-- Одна строка на рассылку за день. last_user_id - контрольная точка: всем
+-- пользователям с user_id <= last_user_id сообщения уже отправлены, поэтому
+-- прерванная рассылка продолжается с этого места.
+CREATE TABLE IF NOT EXISTS broadcasts (
+    broadcast_id SERIAL PRIMARY KEY,         -- ID рассылки
+    kind VARCHAR(50) NOT NULL,               -- Вид рассылки, например 'due_reminder'
+    run_date DATE NOT NULL,                  -- За какой день
+    last_user_id BIGINT,                     -- Контрольная точка (NULL - еще никому)
+    sent INTEGER NOT NULL DEFAULT 0,         -- Отправлено сообщений
+    failed INTEGER NOT NULL DEFAULT 0,       -- Не удалось отправить
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,  -- Когда начата
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,  -- Когда сохранена контрольная точка
+    finished_at TIMESTAMP,                   -- Когда закончена (NULL - идет или прервана)
+    UNIQUE (kind, run_date)
+);
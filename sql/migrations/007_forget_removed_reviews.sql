@@ -0,0 +1,7 @@
+-- Состояния повторения слов, удаленных из словаря пользователя.
+-- Раньше REMOVE_USER_WORD удалял только связь в user_words, и если слово оставалось
+-- у других пользователей, его строка в word_reviews продолжала считаться в напоминаниях.
+-- Теперь строка удаляется вместе со связью; здесь убираются уже накопившиеся.
+DELETE FROM word_reviews r
+WHERE NOT EXISTS (SELECT 1 FROM user_words uw WHERE uw.user_id = r.user_id AND uw.word_id = r.word_id)
+  AND NOT EXISTS (SELECT 1 FROM words w WHERE w.word_id = r.word_id AND w.is_default = TRUE);
@@ -0,0 +1,6 @@
+-- Выбор слова для удаления идет по словарю пользователя (user_words), а не по автору
+-- слова: SELECT_PERSONAL_WORDS_AFTER/BEFORE читают связи по UNIQUE (user_id, word_id)
+-- и слова по idx_words_personal_cover. Индекс по (created_by, english_word) из
+-- миграции 002 не видел слов, добавленных в словарь раньше другими пользователями,
+-- и больше не используется.
+DROP INDEX IF EXISTS idx_words_personal_keyset;
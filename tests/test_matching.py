@@ -0,0 +1,124 @@
+"""
+Тесты проверки набранного ответа (database/matching.py)
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+import itertools
+import random
+
+import pytest
+
+from database.matching import (
+    EXACT, TYPO, OTHER_WORD, WRONG, normalize_answer, typo_limit, within_distance, check_answer
+)
+from database.sampling import WordIndex, WordList
+
+
+def word(word_id, english_word, russian_word='перевод'):
+    return {'word_id': word_id, 'english_word': english_word, 'russian_word': russian_word}
+
+
+def osa_distance(first, second):
+    """Полное расстояние Дамерау-Левенштейна (без повторных правок) для сверки"""
+    rows = [[0] * (len(second) + 1) for _ in range(len(first) + 1)]
+    for i in range(len(first) + 1):
+        rows[i][0] = i
+    for j in range(len(second) + 1):
+        rows[0][j] = j
+    for i in range(1, len(first) + 1):
+        for j in range(1, len(second) + 1):
+            rows[i][j] = min(
+                rows[i - 1][j] + 1,
+                rows[i][j - 1] + 1,
+                rows[i - 1][j - 1] + (first[i - 1] != second[j - 1])
+            )
+            if i > 1 and j > 1 and first[i - 1] == second[j - 2] and first[i - 2] == second[j - 1]:
+                rows[i][j] = min(rows[i][j], rows[i - 2][j - 2] + 1)
+    return rows[len(first)][len(second)]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Word', 'word'),
+    ('  ice   cream ', 'ice cream'),
+    ('café', 'cafe'),
+    ('naïve', 'naive'),
+    ('don’t', "don't"),
+    ('well‑known', 'well-known'),
+    ('Straße', 'strasse'),
+    ('word!', 'word'),
+    ('"word."', 'word'),
+    ('', ''),
+])
+def test_normalize_answer(text, expected):
+    assert normalize_answer(text) == expected
+
+
+@pytest.mark.parametrize('length, limit', [
+    (1, 0), (3, 0), (4, 1), (7, 1), (8, 2), (20, 2),
+])
+def test_typo_limit(length, limit):
+    assert typo_limit(length) == limit
+
+
+@pytest.mark.parametrize('first, second, limit, expected', [
+    ('word', 'word', 0, True),
+    ('word', 'ward', 0, False),
+    ('word', 'ward', 1, True),
+    ('word', 'wrod', 1, True),  # перестановка соседних букв - одна опечатка
+    ('word', 'words', 1, True),
+    ('word', 'wor', 1, True),
+    ('word', 'wo', 1, False),
+    ('elephant', 'elefant', 2, True),
+    ('elephant', 'elphnt', 2, True),
+    ('elephant', 'elfnt', 2, False),
+    ('', 'ab', 2, True),
+    ('', 'abc', 2, False),
+])
+def test_within_distance(first, second, limit, expected):
+    assert within_distance(first, second, limit) is expected
+    assert within_distance(second, first, limit) is expected
+
+
+def test_within_distance_matches_full_distance():
+    rng = random.Random(1)
+    for _ in range(2000):
+        first = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 7)))
+        second = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 7)))
+        distance = osa_distance(first, second)
+        for limit in range(3):
+            assert within_distance(first, second, limit) is (distance <= limit), (first, second, limit)
+
+
+def test_within_distance_all_transpositions():
+    for first in map(''.join, itertools.permutations('abcd')):
+        for limit in range(3):
+            assert within_distance(first, 'abcd', limit) is (osa_distance(first, 'abcd') <= limit)
+
+
+@pytest.fixture
+def index():
+    default_words = WordList([word(1, 'card'), word(2, 'cart'), word(3, 'ice cream'), word(4, 'cat')])
+    user_words = WordList([word(10, 'elephant'), word(11, 'Café')])
+    return WordIndex(default_words, user_words)
+
+
+@pytest.mark.parametrize('text, word_id, verdict, answer_id', [
+    ('card', 1, EXACT, 1),
+    (' CARD! ', 1, EXACT, 1),
+    ('cafe', 11, EXACT, 11),
+    ('Ice  Cream', 3, EXACT, 3),
+    ('cart', 1, OTHER_WORD, 2),  # другое слово словаря - ошибка, а не опечатка
+    ('crad', 1, TYPO, 1),
+    ('cta', 4, WRONG, 4),  # в словах до 3 букв опечатки не прощаются
+    ('elefant', 10, TYPO, 10),
+    ('elephnat', 10, TYPO, 10),
+    ('elfnt', 10, WRONG, 10),
+    ('ice creem', 3, TYPO, 3),
+    ('', 1, WRONG, 1),
+    (None, 1, WRONG, 1),
+])
+def test_check_answer(index, text, word_id, verdict, answer_id):
+    result, answer = check_answer(text, index.find(word_id), index)
+    assert result == verdict
+    assert answer['word_id'] == answer_id
@@ -0,0 +1,83 @@
+"""
+Импорт и экспорт словаря из командной строки
+
+Примеры:
+    python vocab_cli.py import words.csv                  # общие слова для всех
+    python vocab_cli.py import words.tsv --user 12345     # в словарь пользователя
+    python vocab_cli.py export backup.csv --user 12345
+
+Файл: две колонки - английское слово и перевод, первая строка - заголовок.
+
+Кэш словаря работающих ботов этот процесс не сбрасывает: новые общие слова
+они увидят через VOCAB_CACHE_DEFAULT_TTL, слова пользователя - через
+VOCAB_CACHE_USER_TTL (или сразу после перезапуска). Похожие слова для новых
+слов считает python neighbours_cli.py update.
+"""
+import argparse
+import os
+import sys
+import time
+
+from config import VOCAB_CACHE_DEFAULT_TTL, VOCAB_CACHE_USER_TTL
+from database.bulk import import_words, export_words, detect_format
+from database.db_config import close_pool
+
+
+def _progress_printer(total_bytes):
+    """Печать прогресса импорта не чаще раза в полсекунды"""
+    state = {'last': 0.0}
+
+    def progress(bytes_read):
+        now = time.monotonic()
+        if now - state['last'] < 0.5 and bytes_read < total_bytes:
+            return
+        state['last'] = now
+        percent = bytes_read * 100 // total_bytes if total_bytes else 100
+        print(f"\r📥 Загружено {bytes_read // 1024} КБ ({percent}%)", end='', file=sys.stderr)
+
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт/экспорт словаря EnglishCard")
+    parser.add_argument('action', choices=['import', 'export'])
+    parser.add_argument('path', help="путь к CSV/TSV файлу")
+    parser.add_argument('--user', type=int, default=None,
+                        help="ID пользователя Telegram (без него - общие слова)")
+    parser.add_argument('--format', choices=['csv', 'tsv'], default=None,
+                        help="формат файла (по умолчанию - по расширению)")
+    parser.add_argument('--no-header', action='store_true', help="в файле нет строки заголовка")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    started = time.perf_counter()
+    try:
+        if args.action == 'import':
+            total_bytes = os.path.getsize(args.path)
+            with open(args.path, 'rb') as source:
+                stats = import_words(
+                    source, args.user, fmt,
+                    header=not args.no_header,
+                    progress=_progress_printer(total_bytes)
+                )
+            print(file=sys.stderr)
+            print(
+                f"✅ Прочитано строк: {stats['rows_read']}, корректных: {stats['rows_valid']}, "
+                f"новых слов: {stats['words_added']}, добавлено в словарь: {stats['links_added']}"
+            )
+            cache_ttl = VOCAB_CACHE_USER_TTL if args.user is not None else VOCAB_CACHE_DEFAULT_TTL
+            print(
+                f"ℹ️ Работающие боты увидят слова в течение {cache_ttl} с (кэш словаря) или после перезапуска; "
+                f"похожие слова для новых слов: python neighbours_cli.py update"
+            )
+        else:
+            with open(args.path, 'wb') as target:
+                rows = export_words(target, args.user, fmt)
+            print(f"✅ Выгружено слов: {rows}")
+        print(f"⏱ {time.perf_counter() - started:.2f} с")
+    finally:
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Запуск бота в режиме webhook с параллельной обработкой обновлений
+
+Примеры:
+    python webhook_main.py                          # потоки, настройки из config.py
+    python webhook_main.py --mode processes -w 4    # 4 процесса на разных ядрах
+
+Для локальной проверки без Telegram можно отправить записанное обновление:
+    curl -X POST localhost:8443/webhook -H 'Content-Type: application/json' \\
+         -d @samples/update_start.json
+"""
+import argparse
+
+import telebot
+from telebot import types
+
+from config import (
+    BOT_TOKEN, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_URL,
+    WEBHOOK_SECRET, WEBHOOK_WORKERS, WEBHOOK_MODE, WEBHOOK_QUEUE_SIZE, OUTBOX_ENABLED, METRICS_PORT
+)
+from main import create_bot, warm_up
+from bot.outbox import Outbox
+from bot.storage import create_state_storage
+from bot.webhook import ChatDispatcher, create_webhook_server
+from database.db_config import close_pool
+from database.answers import answer_log
+from database.registration import user_registry
+from metrics import start_metrics
+import logging
+
+# Настройка логирования: main.py и database.db_config уже вызвали basicConfig
+# при импорте, поэтому формат с именем процесса ставится поверх (force=True)
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(processName)s - %(message)s',
+    force=True
+)
+logger = logging.getLogger(__name__)
+
+
+class BotUpdateHandler:
+    """Бот воркера: обрабатывает обновление прямо в потоке воркера, без своего пула потоков
+
+    number - номер процесса-воркера (режим 'processes'), в режиме 'threads' - None.
+    """
+
+    def __init__(self, number=None):
+        if number is None:
+            start_metrics(serve=False)  # Воркеры в процессе сервера: метрики отдает он сам (GET /metrics)
+        else:
+            # У процесса-воркера свой реестр метрик, поэтому и свой эндпоинт: METRICS_PORT + номер
+            start_metrics(port=METRICS_PORT + number if METRICS_PORT else 0)
+        warm_up()  # Пул и кэш общих слов - в фоне, воркер сразу берет обновления
+        self.state_storage = create_state_storage()
+        self.outbox = None
+        if OUTBOX_ENABLED:
+            # Обработчик один на процесс, поэтому и очередь с лимитами одна на процесс
+            self.outbox = Outbox()
+            self.outbox.start()
+        self.bot = create_bot(self.state_storage, threaded=False, outbox=self.outbox)
+
+    def __call__(self, raw_update):
+        self.bot.process_new_updates([types.Update.de_json(raw_update)])
+
+    def close(self):
+        if self.outbox is not None:
+            self.outbox.close()
+        if hasattr(self.state_storage, 'close'):
+            self.state_storage.close()
+        user_registry.close()
+        answer_log.close()
+        close_pool()
+
+
+def register_webhook():
+    """Сообщить Telegram адрес webhook"""
+    bot = telebot.TeleBot(BOT_TOKEN, threaded=False)
+    bot.remove_webhook()
+    bot.set_webhook(
+        url=WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET or None,
+        drop_pending_updates=True
+    )
+    logger.info(f"Webhook установлен: {WEBHOOK_URL}")
+
+
+def main():
+    """Запуск HTTP-сервера и воркеров"""
+    parser = argparse.ArgumentParser(description="EnglishCard бот в режиме webhook")
+    parser.add_argument('--host', default=WEBHOOK_HOST)
+    parser.add_argument('--port', type=int, default=WEBHOOK_PORT)
+    parser.add_argument('-w', '--workers', type=int, default=WEBHOOK_WORKERS)
+    parser.add_argument('--mode', choices=['threads', 'processes'], default=WEBHOOK_MODE)
+    parser.add_argument('--no-set-webhook', action='store_true',
+                        help="не регистрировать webhook в Telegram (локальная проверка)")
+    args = parser.parse_args()
+
+    dispatcher = ChatDispatcher(BotUpdateHandler, args.workers, WEBHOOK_QUEUE_SIZE, args.mode)
+    dispatcher.start()
+
+    if WEBHOOK_URL and not args.no_set_webhook:
+        register_webhook()
+
+    server = create_webhook_server(dispatcher, args.host, args.port, WEBHOOK_PATH, WEBHOOK_SECRET)
+    print(f"🤖 EnglishCard бот (webhook) слушает {args.host}:{args.port}{WEBHOOK_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        dispatcher.stop()
+
+
+if __name__ == "__main__":
+    main()